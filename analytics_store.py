@@ -0,0 +1,487 @@
+# analytics_store.py
+
+import atexit
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from prompt_budget import count_tokens
+from tracing import registry
+
+try:
+    import fcntl
+except ImportError:  # Windows: keep to one writing process per directory
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Every generated feedback is reduced to its scores, latency and token counts
+# and appended to one file per column under ANALYTICS_DIR. Readers memory-map
+# the columns, so aggregations over millions of rows are a few numpy passes.
+ANALYTICS_ENABLED = os.getenv("ANALYTICS_ENABLED", "1") == "1"
+ANALYTICS_DIR = os.getenv("ANALYTICS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "analytics"))
+# Write-behind: recording only queues the feedback; parsing and appending
+# happen on a background thread at most this often
+ANALYTICS_FLUSH_INTERVAL = float(os.getenv("ANALYTICS_FLUSH_INTERVAL", "1"))
+ANALYTICS_FLUSH_BATCH = int(os.getenv("ANALYTICS_FLUSH_BATCH", "1000"))
+# Feedback queued beyond this while the disk is unavailable is dropped
+ANALYTICS_MAX_BUFFER = int(os.getenv("ANALYTICS_MAX_BUFFER", "100000"))
+
+# One row per feedback, little-endian on disk; names are dictionary-encoded
+COLUMNS = {
+    "time": "<f8",
+    "role": "<i4",
+    "company": "<i4",
+    "overall": "<f4",
+    "relevance": "<f4",
+    "clarity": "<f4",
+    "technical": "<f4",
+    "latencyMs": "<f4",
+    "promptTokens": "<i4",
+    "responseTokens": "<i4",
+    "fallback": "u1",
+}
+# One row per (feedback, skill) pair
+LINK_COLUMNS = {
+    "skillRow": "<i4",
+    "skill": "<i4",
+}
+DICTIONARIES = ("role", "company", "skill")
+SCORES = ("overall", "relevance", "clarity", "technical")
+METRICS = SCORES + ("latencyMs", "promptTokens", "responseTokens")
+GROUPS = ("role", "company", "skill")
+DEFAULT_PERCENTILES = (50, 90, 99)
+# Scores are kept in half points, so their percentiles come from counts
+SCORE_STEPS = 2
+
+# Section headings in the feedback and the score names they map to
+_SECTIONS = {
+    "overall": r"overall(?: rating| score)?|(?:final )?(?:rating|score)",
+    "relevance": r"(?:content )?relevance(?: and completeness)?",
+    "clarity": r"(?:communication )?clarity",
+    "technical": r"technical accuracy",
+}
+_SECTION = re.compile(
+    r"(?im)^[\s#*>_\d.)-]*(?:" + "|".join(f"(?P<{name}>{pattern})" for name, pattern in _SECTIONS.items()) + r")\b"
+)
+# "4/5", "4.5 / 5", "4 out of 5", "8/10", or a bare "4" right after the heading
+_SCORE = re.compile(
+    r"^(?:\s*\(\s*1\s*-\s*5\s*\))?[\s*_:\-–]*(?:(?P<value>\d+(?:\.\d+)?)\s*(?:/|out of)\s*(?P<scale>5|10)\b"
+    r"|(?P<bare>[1-5](?:\.5)?)(?![\d.]*\s*(?:/|out of|%)))",
+    re.I,
+)
+
+rows_recorded = registry.counter("analytics_rows_total", "Feedback rows written to the analytics store")
+rows_dropped = registry.counter("analytics_dropped_total", "Feedback not recorded because the analytics buffer was full")
+flush_seconds = registry.histogram("analytics_flush_seconds", "Time to append a batch to the analytics store")
+query_seconds = registry.histogram("analytics_query_seconds", "Time to aggregate an analytics query")
+
+
+def extract_scores(feedback):
+    """
+    The overall and section ratings (1-5) in a feedback text, e.g.
+    "### Overall Rating: 4/5" or "5. Overall rating (1-5): 4". Missing or
+    N/A ratings are None.
+    """
+    scores = dict.fromkeys(_SECTIONS)
+    text = str(feedback or "")
+    for match in _SECTION.finditer(text):
+        name = match.lastgroup
+        if scores[name] is not None:
+            continue
+        # The rating follows on the heading line, or the next non-blank one
+        lines = text[match.end():match.end() + 120].split("\n")
+        after = lines[0] if lines[0].strip(" \t*_#:") else next((line for line in lines[1:] if line.strip()), "")
+        score = _SCORE.match(after)
+        if score is None:
+            continue
+        if score.group("bare"):
+            value = float(score.group("bare"))
+        else:
+            value = float(score.group("value")) * 5 / int(score.group("scale"))
+        if 0 < value <= 5:
+            scores[name] = value
+    return scores
+
+
+def normalize_name(name):
+    return " ".join(str(name or "").lower().split())
+
+
+def split_skills(skills):
+    if isinstance(skills, (list, tuple)):
+        skills = ",".join(str(skill) for skill in skills)
+    names = (normalize_name(skill) for skill in re.split(r"[,;\n|]+", str(skills or "")))
+    return sorted({name for name in names if name})
+
+
+def _percentile_ranks(counts, percentiles):
+    # Nearest rank: the smallest value with at least p% of the values at or below it
+    return [np.maximum(np.ceil(counts * p / 100.0).astype(np.int64) - 1, 0) for p in percentiles]
+
+
+class AnalyticsStore:
+    """
+    Append-only columnar store of feedback analytics in `path`: one raw
+    little-endian file per column, a JSON file of role, company and skill
+    names, and meta.json with the committed row counts. Appends are queued
+    in memory and written by a background thread; files past the committed
+    counts (an interrupted append) are cut back before the next one. Several
+    processes may share a directory where file locks are available.
+    """
+
+    def __init__(self, path=ANALYTICS_DIR, flush_interval=ANALYTICS_FLUSH_INTERVAL,
+                 flush_batch=ANALYTICS_FLUSH_BATCH, max_buffer=ANALYTICS_MAX_BUFFER):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self.max_buffer = max_buffer
+        os.makedirs(path, exist_ok=True)
+        self._buffer = []
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # Memory-mapped columns and names, replaced when the row counts change
+        self._view = None
+        self._view_lock = threading.Lock()
+        self._names = {name: [] for name in DICTIONARIES}
+        self._cache = {}
+        self._wake = threading.Event()
+        self._closed = False
+        self._flusher = threading.Thread(target=self._flush_loop, name="analytics-flush", daemon=True)
+        self._flusher.start()
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def record(self, feedback, role="", company="", skills="", latency=None, prompt=None, fallback=False):
+        """
+        Queues one generated feedback. Only appends to a list, so it can be
+        called on the request path; `latency` is in seconds and `prompt` is
+        the prompt text, whose tokens are counted later.
+        """
+        with self._buffer_lock:
+            if len(self._buffer) >= self.max_buffer:
+                rows_dropped.inc()
+                return False
+            self._buffer.append((time.time(), feedback, role, company, skills, latency, prompt, fallback))
+            pending = len(self._buffer)
+        if pending >= self.flush_batch:
+            self._wake.set()
+        return True
+
+    def pending(self):
+        with self._buffer_lock:
+            return len(self._buffer)
+
+    def _read_meta(self):
+        try:
+            with open(self._file("meta.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"rows": 0, "links": 0, "names": dict.fromkeys(DICTIONARIES, 0)}
+
+    def _read_names(self, meta):
+        """Role, company and skill names, reloaded only when meta.json says they grew."""
+        counts = meta["names"]
+        if all(len(self._names[name]) == counts[name] for name in DICTIONARIES):
+            return self._names
+        with open(self._file("names.json")) as f:
+            names = json.load(f)
+        # Names past the committed counts belong to an interrupted append
+        self._names = {name: names[name][:counts[name]] for name in DICTIONARIES}
+        return self._names
+
+    def _write_json(self, name, data):
+        temp = self._file(f".{name}.tmp")
+        with open(temp, "w") as f:
+            json.dump(data, f)
+        os.replace(temp, self._file(name))
+
+    def _write_columns(self, columns, rows):
+        for name, values in columns.items():
+            dtype = np.dtype(COLUMNS.get(name) or LINK_COLUMNS[name])
+            with open(self._file(f"{name}.bin"), "ab+") as f:
+                # Drop whatever an interrupted append left past the committed rows
+                if f.seek(0, os.SEEK_END) != rows * dtype.itemsize:
+                    f.truncate(rows * dtype.itemsize)
+                f.write(np.asarray(values, dtype=dtype).tobytes())
+
+    def _prepare(self, batch):
+        """Parses a batch off the request path: scores, token counts and normalized names."""
+        rows = []
+        for recorded, feedback, role, company, skills, latency, prompt, fallback in batch:
+            scores = extract_scores(feedback)
+            rows.append({
+                "time": recorded,
+                "role": normalize_name(role),
+                "company": normalize_name(company),
+                "skills": split_skills(skills),
+                **{name: math.nan if scores[name] is None else scores[name] for name in SCORES},
+                "latencyMs": math.nan if latency is None else latency * 1000,
+                "promptTokens": count_tokens(prompt) if prompt else 0,
+                "responseTokens": count_tokens(feedback),
+                "fallback": 1 if fallback else 0,
+            })
+        return rows
+
+    def _lock_file(self):
+        handle = open(self._file(".lock"), "a")
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        return handle
+
+    def append(self, rows):
+        """
+        Writes prepared rows, each a dict of the COLUMNS values with names
+        instead of ids and a "skills" list, e.g. to backfill old feedback.
+        Raises OSError if the files cannot be written.
+        """
+        with self._lock_file():
+            meta = self._read_meta()
+            names = {name: list(values) for name, values in self._read_names(meta).items()}
+            ids = {name: {value: index for index, value in enumerate(values)} for name, values in names.items()}
+
+            def encode(kind, value):
+                if value not in ids[kind]:
+                    ids[kind][value] = len(names[kind])
+                    names[kind].append(value)
+                return ids[kind][value]
+
+            columns = {name: [] for name in COLUMNS}
+            links = {name: [] for name in LINK_COLUMNS}
+            for offset, row in enumerate(rows):
+                for name in COLUMNS:
+                    columns[name].append(encode(name, row[name]) if name in DICTIONARIES else row[name])
+                for skill in row["skills"]:
+                    links["skillRow"].append(meta["rows"] + offset)
+                    links["skill"].append(encode("skill", skill))
+
+            if any(len(names[name]) != meta["names"][name] for name in DICTIONARIES):
+                self._write_json("names.json", names)
+            self._write_columns(columns, meta["rows"])
+            self._write_columns(links, meta["links"])
+            # The new rows count once meta.json says so
+            self._write_json("meta.json", {
+                "rows": meta["rows"] + len(rows),
+                "links": meta["links"] + len(links["skill"]),
+                "names": {name: len(values) for name, values in names.items()},
+            })
+            self._names = names
+        rows_recorded.inc(len(rows))
+
+    def flush(self):
+        with self._flush_lock:
+            with self._buffer_lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return
+            started = time.perf_counter()
+            try:
+                self.append(self._prepare(batch))
+            except OSError as e:
+                logger.error(f"Analytics flush failed, will retry: {str(e)}")
+                with self._buffer_lock:
+                    self._buffer = (batch + self._buffer)[-self.max_buffer:]
+                return
+            flush_seconds.observe(time.perf_counter() - started)
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Analytics flush failed: {str(e)}")
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        self._flusher.join(timeout=5)
+        self.flush()
+
+    def _map(self, name, dtype, length):
+        if length == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._file(f"{name}.bin"), dtype=dtype, mode="r", shape=(length,))
+
+    def snapshot(self):
+        """
+        Memory-mapped views of the committed columns and the names their ids
+        refer to, as {"rows", "columns", "links", "names"}.
+        """
+        meta = self._read_meta()
+        with self._view_lock:
+            view = self._view
+            if view is None or (view["rows"], view["links"]) != (meta["rows"], meta["links"]):
+                with self._lock_file():
+                    meta = self._read_meta()
+                    names = self._read_names(meta)
+                view = self._view = {
+                    "rows": meta["rows"],
+                    "links": meta["links"],
+                    "columns": {name: self._map(name, dtype, meta["rows"]) for name, dtype in COLUMNS.items()},
+                    "link": {name: self._map(name, dtype, meta["links"]) for name, dtype in LINK_COLUMNS.items()},
+                    "names": names,
+                }
+                self._cache = {}
+        return view
+
+    def query(self, group_by=None, metric="overall", role=None, company=None, skill=None, since=None,
+              include_fallback=False, percentiles=DEFAULT_PERCENTILES, min_count=1, limit=50):
+        """
+        Distribution of `metric` overall and per role, company or skill:
+        count, mean, min, max, percentiles and, for scores, how many rows
+        fall on each rating. Rows can be filtered by role, company, skill
+        and `since` (a Unix time). Fallback feedback, whose ratings are
+        placeholders, is left out unless `include_fallback`.
+        """
+        if group_by not in (None,) + GROUPS:
+            raise ValueError(f"groupBy must be one of {', '.join(GROUPS)}")
+        if metric not in METRICS:
+            raise ValueError(f"metric must be one of {', '.join(METRICS)}")
+        percentiles = tuple(float(p) for p in percentiles)
+        if not all(0 < p <= 100 for p in percentiles):
+            raise ValueError("percentiles must be between 0 and 100")
+
+        started = time.perf_counter()
+        view = self.snapshot()
+        key = (group_by, metric, role, company, skill, since, include_fallback, percentiles, min_count, limit)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        columns, link, names = view["columns"], view["link"], view["names"]
+        values = np.asarray(columns[metric], dtype=np.float64)
+        mask = ~np.isnan(values) if metric in SCORES or metric == "latencyMs" else np.ones(len(values), bool)
+        if not include_fallback:
+            mask &= columns["fallback"] == 0
+        if since is not None:
+            mask &= columns["time"] >= since
+        for kind, name in (("role", role), ("company", company)):
+            if name:
+                ids = {value: index for index, value in enumerate(names[kind])}
+                mask &= columns[kind] == ids.get(normalize_name(name), -1)
+        if skill:
+            ids = {value: index for index, value in enumerate(names["skill"])}
+            rows = link["skillRow"][link["skill"] == ids.get(normalize_name(skill), -1)]
+            has_skill = np.zeros(len(values), bool)
+            has_skill[rows] = True
+            mask &= has_skill
+
+        result = {
+            "metric": metric,
+            "groupBy": group_by,
+            "rows": int(mask.sum()),
+            "overall": self._describe(values[mask], np.zeros(int(mask.sum()), np.int64), 1, metric, percentiles)[0],
+        }
+        if group_by:
+            if group_by == "skill":
+                selected = mask[link["skillRow"]]
+                grouped = values[link["skillRow"][selected]]
+                groups = np.asarray(link["skill"][selected], dtype=np.int64)
+            else:
+                grouped = values[mask]
+                groups = np.asarray(columns[group_by][mask], dtype=np.int64)
+            stats = self._describe(grouped, groups, len(names[group_by]), metric, percentiles)
+            listed = [{"name": names[group_by][index], **stats[index]} for index in range(len(stats))
+                      if stats[index]["count"] >= max(1, min_count)]
+            listed.sort(key=lambda item: (-item["count"], item["name"]))
+            result["groups"] = listed[:limit]
+            result["groupCount"] = len(listed)
+        result["queryMs"] = round((time.perf_counter() - started) * 1000, 2)
+        query_seconds.observe(time.perf_counter() - started)
+        if len(self._cache) >= 64:
+            self._cache.clear()
+        self._cache[key] = result
+        return result
+
+    def _describe(self, values, groups, group_count, metric, percentiles):
+        """Per-group statistics of `values`, all groups in the same few vectorized passes."""
+        counts = np.bincount(groups, minlength=group_count)
+        sums = np.bincount(groups, weights=values, minlength=group_count)
+        means = np.divide(sums, counts, out=np.full(group_count, np.nan), where=counts > 0)
+        ranks = _percentile_ranks(counts, percentiles)
+        distribution = None
+
+        if metric in SCORES:
+            # Half-point scores: a count per group and step replaces sorting
+            steps = 5 * SCORE_STEPS + 1
+            levels = np.arange(steps) / SCORE_STEPS
+            buckets = np.clip(np.rint(values * SCORE_STEPS).astype(np.int64), 0, steps - 1)
+            histogram = np.bincount(groups * steps + buckets, minlength=group_count * steps).reshape(group_count, steps)
+            cumulative = np.cumsum(histogram, axis=1)
+            points = [levels[np.minimum((cumulative <= rank[:, None]).sum(axis=1), steps - 1)] for rank in ranks]
+            present = histogram > 0
+            lows = levels[present.argmax(axis=1)]
+            highs = levels[steps - 1 - present[:, ::-1].argmax(axis=1)]
+            # Rows per whole rating, half points rounded up
+            whole = np.floor(levels + 0.5).astype(np.int64)
+            distribution = histogram @ (whole[:, None] == np.arange(6)).astype(np.int64)
+        elif len(values):
+            # One plain sort orders every group's values: each group's values
+            # are shifted into a range of their own, then shifted back
+            low = values.min()
+            span = values.max() - low + 1
+            ordered = np.sort(groups * span + (values - low))
+            ordered -= np.repeat(np.arange(group_count) * span - low, counts)
+            starts = np.cumsum(counts) - counts
+            last = len(ordered) - 1
+            points = [ordered[np.minimum(starts + rank, last)] for rank in ranks]
+            lows = ordered[np.minimum(starts, last)]
+            highs = ordered[np.clip(starts + counts - 1, 0, last)]
+        else:
+            lows = highs = np.full(group_count, np.nan)
+            points = [lows] * len(ranks)
+
+        def number(value):
+            return None if value is None or not np.isfinite(value) else round(float(value), 2)
+
+        stats = []
+        for index in range(group_count):
+            count = int(counts[index])
+            item = {
+                "count": count,
+                "mean": number(means[index]) if count else None,
+                "min": number(lows[index]) if count else None,
+                "max": number(highs[index]) if count else None,
+                "percentiles": {f"p{p:g}": (number(point[index]) if count else None)
+                                for p, point in zip(percentiles, points)},
+            }
+            if distribution is not None:
+                item["distribution"] = {str(rating): int(distribution[index, rating]) for rating in range(1, 6)}
+            stats.append(item)
+        return stats
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_analytics_store():
+    """Returns the process-wide analytics store in ANALYTICS_DIR."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = AnalyticsStore()
+                # Queued feedback must reach disk on exit
+                atexit.register(_store.close)
+                logger.info(f"Analytics store ready ({ANALYTICS_DIR})")
+    return _store
+
+
+def record_feedback(feedback, role="", company="", skills="", latency=None, prompt=None, fallback=False):
+    """Queues feedback for the analytics store when ANALYTICS_ENABLED; never raises."""
+    if not ANALYTICS_ENABLED:
+        return
+    try:
+        get_analytics_store().record(feedback, role, company, skills, latency, prompt, fallback)
+    except Exception as e:
+        logger.error(f"Could not record feedback analytics: {str(e)}")
@@ -0,0 +1,180 @@
+# answer_metrics.py
+
+import re
+from collections import Counter
+
+# Local delivery and structure metrics for a transcribed answer. Everything
+# here is a handful of regex passes over the transcript, so it is returned
+# with the transcription instead of waiting for the model's feedback.
+
+# Comfortable interview pace in words per minute
+PACE_SLOW_WPM = 110
+PACE_FAST_WPM = 170
+
+# Target answer length in words: behavioural questions need room for a
+# full story, others a focused explanation
+BEHAVIORAL_WORDS = (150, 350)
+DEFAULT_WORDS = (60, 250)
+
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+FILLER_WORDS = frozenset(["um", "umm", "uh", "uhh", "er", "erm", "ah", "hmm", "basically", "literally", "actually"])
+# Phrases, and "like" only where it interrupts a clause ("it was, like, slow")
+_FILLER_PHRASES = re.compile(r"\b(?:you know|i mean|sort of|kind of|like)\b")
+_CLAUSE_BREAK = frozenset(",.;!?")
+_DETERMINERS = frozenset(["a", "the", "what", "which", "this", "that", "some", "any", "every", "one", "same"])
+
+# Keywords that signal each part of a STAR (Situation, Task, Action, Result) answer
+STAR_KEYWORDS = {
+    "situation": r"when i was|at my (?:last|previous|current) (?:job|company|role)|we were|there was|"
+                 r"the (?:project|team|company|client|situation)|background|context",
+    "task": r"my (?:role|task|job|responsibility|goal) was|i was (?:responsible|asked|tasked)|"
+            r"i needed to|i had to|we needed to|the goal was|objective|challenge was",
+    "action": r"i (?:decided|built|created|designed|implemented|led|wrote|worked|organized|proposed|"
+              r"reached out|set up|started|introduced|analy[sz]ed|refactored|talked|met|spoke|fixed)|"
+              r"so i|first,? i|then i|next,? i",
+    "result": r"as a result|in the end|result(?:ed)? (?:was|in)|we (?:reduced|increased|improved|shipped|"
+              r"delivered|saved|launched)|(?:reduced|increased|improved|cut) (?:\w+ ){0,3}by|"
+              r"\d+ ?(?:%|percent)|learned|outcome|ended up|which meant",
+}
+_STAR = re.compile("|".join(f"\\b(?P<{part}>{pattern})" for part, pattern in STAR_KEYWORDS.items()))
+
+_BEHAVIORAL = re.compile(
+    r"\b(?:tell me about a time|describe a (?:time|situation)|give (?:me )?an example|"
+    r"have you ever|walk me through a time|share an experience|how did you handle)\b"
+)
+
+# Common words that say nothing about what a question is about
+_STOPWORDS = frozenset(
+    "a an the and or but if of to in on for with at by from as is are was were be been being it its this that "
+    "these those you your yours i me my we our they them their he she his her what which who whom how why when "
+    "where do does did done have has had can could would should will shall may might must about into over than "
+    "then so not no yes all any some each tell describe explain walk through time give example".split()
+)
+
+
+def _stem(word):
+    # Just enough to match "projects" to "project" and "handled" to "handle"
+    for suffix in ("ing", "ed", "es", "s"):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def _content_words(words):
+    return {_stem(word) for word in set(words) - _STOPWORDS if len(word) > 2}
+
+
+def _is_filler(text, match):
+    start, end = match.span()
+    before = text[max(0, start - 40):start].rstrip()
+    if match.group() == "like":
+        return text[end:end + 1] == "," or not before or before[-1] in _CLAUSE_BREAK
+    # "what kind of database" asks about a kind, it is not a filler
+    return before[before.rfind(" ") + 1:] not in _DETERMINERS
+
+
+def is_behavioral(question):
+    return isinstance(question, str) and _BEHAVIORAL.search(question.lower()) is not None
+
+
+def analyze_answer(transcript, question=None, duration=None, speech_seconds=None):
+    """
+    Computes delivery and structure metrics for one answer. `duration` is
+    the recording length in seconds and `speech_seconds` the part of it with
+    speech; without them the pace metrics are None. A `question` that is
+    not a string is ignored.
+    """
+    if not isinstance(question, str):
+        question = None
+    text = str(transcript or "").lower()
+    words = _WORD.findall(text)
+    word_count = len(words)
+
+    fillers = Counter(word for word in words if word in FILLER_WORDS)
+    for match in _FILLER_PHRASES.finditer(text):
+        if _is_filler(text, match):
+            fillers[match.group()] += 1
+    filler_count = sum(fillers.values())
+
+    star = dict.fromkeys(STAR_KEYWORDS, 0)
+    for match in _STAR.finditer(text):
+        star[match.lastgroup] += 1
+
+    behavioral = is_behavioral(question)
+    low, high = BEHAVIORAL_WORDS if behavioral else DEFAULT_WORDS
+    if word_count < low:
+        length = "short"
+    elif word_count > high:
+        length = "long"
+    else:
+        length = "ok"
+
+    metrics = {
+        "wordCount": word_count,
+        "durationSeconds": round(duration, 2) if duration else None,
+        "wordsPerMinute": None,
+        "pace": None,
+        "speechRatio": None,
+        "fillerCount": filler_count,
+        "fillersPer100Words": round(100 * filler_count / word_count, 1) if word_count else 0.0,
+        "fillers": dict(fillers.most_common()),
+        "length": length,
+        "targetWords": [low, high],
+        "questionOverlap": None,
+        "behavioral": behavioral,
+        "star": {part: count > 0 for part, count in star.items()},
+        "starCoverage": round(sum(1 for count in star.values() if count) / len(star), 2),
+    }
+
+    if duration and duration > 0:
+        # Pace over the time actually spent speaking when it is known
+        speaking = speech_seconds if speech_seconds and speech_seconds > 0 else duration
+        wpm = word_count * 60 / speaking
+        metrics["wordsPerMinute"] = round(wpm, 1)
+        metrics["pace"] = "slow" if wpm < PACE_SLOW_WPM else "fast" if wpm > PACE_FAST_WPM else "good"
+        if speech_seconds is not None:
+            metrics["speechRatio"] = round(min(1.0, speech_seconds / duration), 2)
+
+    if question:
+        asked = _content_words(_WORD.findall(question.lower()))
+        if asked:
+            metrics["questionOverlap"] = round(len(asked & _content_words(words)) / len(asked), 2)
+    return metrics
+
+
+def analyze_answers(items):
+    """
+    Analyzes a batch of answers, e.g. a whole session. Each item is a dict
+    with "answer" and optionally "question", "duration" and "speechSeconds".
+    Returns (per-answer metrics, session summary).
+    """
+    results = [
+        analyze_answer(item.get("answer"), item.get("question"), item.get("duration"), item.get("speechSeconds"))
+        for item in items
+    ]
+    return results, summarize(results)
+
+
+def summarize(results):
+    """Session-level totals and averages over per-answer metrics."""
+    answered = [metrics for metrics in results if metrics["wordCount"]]
+    words = sum(metrics["wordCount"] for metrics in answered)
+    fillers = Counter()
+    for metrics in answered:
+        fillers.update(metrics["fillers"])
+    timed = [metrics for metrics in answered if metrics["wordsPerMinute"] is not None]
+    behavioral = [metrics for metrics in answered if metrics["behavioral"]]
+    return {
+        "answers": len(results),
+        "answered": len(answered),
+        "wordCount": words,
+        "averageWords": round(words / len(answered), 1) if answered else 0.0,
+        "wordsPerMinute": round(sum(m["wordsPerMinute"] for m in timed) / len(timed), 1) if timed else None,
+        "fillerCount": sum(fillers.values()),
+        "fillersPer100Words": round(100 * sum(fillers.values()) / words, 1) if words else 0.0,
+        "topFillers": dict(fillers.most_common(3)),
+        "lengths": dict(Counter(metrics["length"] for metrics in answered)),
+        "starCoverage": (round(sum(m["starCoverage"] for m in behavioral) / len(behavioral), 2)
+                         if behavioral else None),
+    }
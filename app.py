@@ -1,13 +1,22 @@
 import streamlit as st
-import cv2
-import numpy as np
-from transcriber import transcribe_audio
-from question_gen import get_interview_questions
-from feedback import evaluate_answer
-import tempfile
+from question_plan import (
+    INTERVIEW_QUESTION_COUNT, MAX_QUESTION_COUNT, QUESTION_BATCH_SIZE, ADAPTIVE_QUESTIONS,
+    next_batch_size, answer_history
+)
+from tracing import span, start_trace, finish_trace
+from session_store import get_session_store
 import os
-import time
 import io
+import uuid
+
+# Question generation, feedback, the camera and transcription (with the
+# model client, numpy and requests behind them) are imported on the
+# interview paths that use them, so the home page starts without them.
+# Python keeps modules imported, so reruns do not pay for them again.
+
+# Evaluate answers in the background while the candidate moves on to the
+# next question; "0" streams each answer's feedback before continuing
+PIPELINED_FEEDBACK = os.getenv("PIPELINED_FEEDBACK", "1") == "1"
 
 # Set page config - must be first Streamlit command
 st.set_page_config(page_title="Mock Interview App", layout="wide", page_icon="🎤", menu_items=None)
@@ -39,6 +48,39 @@ if 'audio_data' not in st.session_state:
     st.session_state.audio_data = None
 if 'interview_complete' not in st.session_state:
     st.session_state.interview_complete = False
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = None
+if 'camera_key' not in st.session_state:
+    st.session_state.camera_key = uuid.uuid4().hex
+if 'question_count' not in st.session_state:
+    st.session_state.question_count = INTERVIEW_QUESTION_COUNT
+if 'adaptive' not in st.session_state:
+    st.session_state.adaptive = ADAPTIVE_QUESTIONS
+
+def restore_session():
+    """Reloads an interview named by the ?session= query parameter after a refresh."""
+    if st.session_state.session_id or not hasattr(st, "query_params"):
+        return
+    session_id = st.query_params.get("session")
+    session = get_session_store().get(session_id) if session_id else None
+    if session is None:
+        return
+    st.session_state.session_id = session["id"]
+    st.session_state['company'] = session["company"]
+    st.session_state['role'] = session["role"]
+    st.session_state['job_desc'] = session["jobDescription"]
+    st.session_state['skills'] = session["skills"]
+    st.session_state.questions = session["questions"]
+    st.session_state.question_count = session.get("questionCount", len(session["questions"]))
+    st.session_state.adaptive = session.get("adaptive", False)
+    st.session_state.answers = session["answers"]
+    st.session_state.feedback = session["feedback"]
+    st.session_state.current_question_index = session["currentQuestionIndex"]
+    st.session_state.interview_complete = session["complete"]
+    st.session_state.presence = session.get("presence")
+    st.session_state.page = 'interview'
+
+restore_session()
 
 def show_home():
     st.title("🎤 AI Mock Interview")
@@ -49,6 +91,9 @@ def show_home():
         role = st.text_input("💼 Role", placeholder="e.g., Software Engineer")
         job_desc = st.text_area("📝 Job Description", height=150, placeholder="Paste the job description here...")
         skills = st.text_input("🛠️ Required Skills", placeholder="e.g., Python, Machine Learning, Communication")
+        question_count = st.number_input("🔢 Number of Questions", min_value=1, max_value=MAX_QUESTION_COUNT,
+                                         value=INTERVIEW_QUESTION_COUNT)
+        adaptive = st.checkbox("Adapt follow-up questions to my answers", value=ADAPTIVE_QUESTIONS)
 
         submitted = st.form_submit_button("Start Interview")
 
@@ -60,9 +105,155 @@ def show_home():
             st.session_state['role'] = role
             st.session_state['job_desc'] = job_desc
             st.session_state['skills'] = skills
+            st.session_state.question_count = int(question_count)
+            st.session_state.adaptive = adaptive
+            session = get_session_store().create(company, role, job_desc, skills, int(question_count), adaptive)
+            st.session_state.session_id = session["id"]
+            if hasattr(st, "query_params"):
+                st.query_params["session"] = session["id"]
             st.session_state.page = 'interview'
             st.experimental_rerun()
 
+def set_at(values, index, value):
+    """Stores `value` at `index`, padding with None so answers stay aligned with questions."""
+    while len(values) <= index:
+        values.append(None)
+    values[index] = value
+
+def value_at(values, index):
+    return values[index] if index < len(values) else None
+
+def submit_question_batch(company, role, job_desc, skills, force=False):
+    """
+    Starts generating the next batch of questions in the background once
+    the candidate is close to the last ready one (or whenever more are
+    missing, with `force`). The future is kept in the session, so a rerun
+    picks it up instead of starting another request.
+    """
+    if st.session_state.get('questions_future') is not None:
+        return
+    questions = st.session_state.questions
+    count = st.session_state.question_count
+    if force:
+        batch = min(QUESTION_BATCH_SIZE, count - len(questions))
+    else:
+        batch = next_batch_size(len(questions), count, st.session_state.current_question_index)
+    if batch <= 0:
+        return
+    from question_gen import submit_interview_questions
+
+    history = answer_history(questions, st.session_state.answers) if st.session_state.adaptive else ()
+    st.session_state.questions_future = submit_interview_questions(
+        company, role, job_desc, skills, count=batch, asked=questions, history=history
+    )
+
+def collect_questions(wait=False):
+    """Adds a finished batch of questions to the session; with `wait`, waits for the one in flight."""
+    future = st.session_state.get('questions_future')
+    if future is None or not (wait or future.done()):
+        return
+
+    try:
+        message = "Preparing your next question..." if st.session_state.questions else "Preparing your interview questions..."
+        with st.spinner(message), span("questions_generate"):
+            batch = future.result()
+    except Exception as e:
+        st.session_state.questions_future = None
+        st.error(f"Could not generate interview questions: {str(e)}")
+        if st.button("Try again"):
+            st.experimental_rerun()
+        st.stop()
+
+    st.session_state.questions_future = None
+    questions = st.session_state.questions
+    batch = [question for question in batch if question not in questions]
+    if not batch:
+        # Nothing new left to ask - end the interview with the questions it has
+        st.session_state.question_count = len(questions)
+    st.session_state.questions = (questions + batch)[:st.session_state.question_count]
+    if st.session_state.session_id:
+        get_session_store().update(
+            st.session_state.session_id,
+            questions=st.session_state.questions,
+            questionCount=st.session_state.question_count
+        )
+
+def ensure_questions(company, role, job_desc, skills):
+    """
+    Makes sure the current question exists, waiting for its batch only when
+    the candidate got there first, and starts the next batch ahead of need.
+    """
+    collect_questions()
+    index = st.session_state.current_question_index
+    if len(st.session_state.questions) <= index < st.session_state.question_count:
+        submit_question_batch(company, role, job_desc, skills, force=True)
+        collect_questions(wait=True)
+    submit_question_batch(company, role, job_desc, skills)
+
+def get_feedback_pipeline(role, skills, company=""):
+    """The session's background feedback pipeline, created on first use."""
+    if st.session_state.get('feedback_pipeline') is None:
+        from feedback import FeedbackPipeline
+
+        session_id = st.session_state.session_id
+
+        def save(index, feedback):
+            if session_id:
+                get_session_store().save_answer(session_id, index, feedback=feedback)
+
+        pipeline = st.session_state.feedback_pipeline = FeedbackPipeline(role, skills, on_result=save, company=company)
+        # Answers restored without feedback lost theirs to a restart - evaluate them again
+        for index, answer in enumerate(st.session_state.answers):
+            if answer and not value_at(st.session_state.feedback, index) and index < len(st.session_state.questions):
+                pipeline.submit(index, st.session_state.questions[index], answer)
+    return st.session_state.feedback_pipeline
+
+def merge_feedback():
+    """Copies feedback finished in the background into the session state."""
+    pipeline = st.session_state.get('feedback_pipeline')
+    if pipeline is None:
+        return
+    for index, feedback in pipeline.results().items():
+        set_at(st.session_state.feedback, index, feedback)
+
+def refresh_when_feedback_lands(pipeline):
+    """Reruns the page once another background evaluation finishes."""
+    fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+    if fragment is None:
+        st.button("Refresh feedback")
+        return
+    pending = pipeline.pending()
+
+    def watch():
+        if pipeline.pending() < pending:
+            st.rerun()
+
+    fragment(run_every=1.0)(watch)()
+
+def open_presence():
+    """The interview's presence tracker, fed by the camera, when PRESENCE_ENABLED (opt-in)."""
+    from presence import PRESENCE_ENABLED, open_tracker
+
+    if not PRESENCE_ENABLED:
+        return None
+    tracker = open_tracker(st.session_state.camera_key)
+    tracker.set_question(st.session_state.current_question_index)
+    return tracker
+
+def finish_presence():
+    """Stops presence analysis once the interview is over and saves its summary with the session."""
+    if st.session_state.get('presence') is None:
+        from presence import close_tracker
+
+        with st.spinner("Summarizing your camera presence..."):
+            tracker = close_tracker(st.session_state.camera_key, timeout=2)
+        if tracker is None:
+            return None
+        st.session_state.presence = tracker.summary()
+        if st.session_state.session_id:
+            get_session_store().update(st.session_state.session_id, presence=st.session_state.presence)
+    return st.session_state.presence
+
 def show_interview():
     # Get interview details from session state
     company = st.session_state.get('company', '')
@@ -70,12 +261,12 @@ def show_interview():
     job_desc = st.session_state.get('job_desc', '')
     skills = st.session_state.get('skills', '')
 
-    # Generate questions if not already done
-    if not st.session_state.questions:
-        st.session_state.questions = get_interview_questions(company, role, job_desc, skills)
-
     st.title("🎤 Interview Session")
     st.write(f"**Company:** {company} | **Role:** {role}")
+
+    ensure_questions(company, role, job_desc, skills)
+    pipeline = get_feedback_pipeline(role, skills, company) if PIPELINED_FEEDBACK else None
+    merge_feedback()
     
     # Layout
     camera_col, question_col = st.columns([1, 1])
@@ -88,19 +279,22 @@ def show_interview():
     with question_col:
         st.header("📝 Questions & Responses")
         
-        if not st.session_state.interview_complete and st.session_state.current_question_index < len(st.session_state.questions):
-            current_question = st.session_state.questions[st.session_state.current_question_index]
+        index = st.session_state.current_question_index
+        if not st.session_state.interview_complete and index < len(st.session_state.questions):
+            current_question = st.session_state.questions[index]
+            answered = value_at(st.session_state.answers, index) is not None
+            rendered = False
             
             question_display = st.empty()
-            question_display.subheader(f"Question {st.session_state.current_question_index + 1}/5")
+            question_display.subheader(f"Question {index + 1}/{st.session_state.question_count}")
             question_display.write(current_question)
             
-            # Audio recording section
-            if not st.session_state.recording:
+            # Audio recording section, until this question has an answer
+            if not answered and not st.session_state.recording:
                 if st.button("🎤 Record My Answer"):
                     st.session_state.recording = True
                     st.experimental_rerun()
-            else:
+            elif not answered:
                 # During recording
                 st.warning("🔴 Recording... Speak your answer clearly.")
                 if st.button("⏹️ Stop Recording"):
@@ -113,7 +307,7 @@ def show_interview():
                     st.experimental_rerun()
             
             # Process audio after recording is stopped
-            if not st.session_state.recording and st.session_state.audio_data is not None:
+            if not answered and not st.session_state.recording and st.session_state.audio_data is not None:
                 st.info("Processing your answer...")
                 
                 try:
@@ -121,56 +315,107 @@ def show_interview():
                     audio_file = io.BytesIO(st.session_state.audio_data)
                     
                     # For simulation, we'll use a simple text instead of actual transcription
-                    # In real app, you'd use: transcribed_text = transcribe_audio(audio_file)
+                    # In real app, you'd use (importing transcriber here, on first use):
+                    # transcribed_text = transcribe_audio(audio_file)
                     transcribed_text = "This is a simulated response to the interview question."
                     
-                    st.write("**Your Answer:**")
-                    st.write(transcribed_text)
-                    
-                    st.session_state.answers.append(transcribed_text)
+                    set_at(st.session_state.answers, index, transcribed_text)
+                    if st.session_state.session_id:
+                        get_session_store().save_answer(st.session_state.session_id, index, answer=transcribed_text)
                     
-                    # Get feedback
-                    st.write("**Generating feedback...**")
-                    feedback = evaluate_answer(
-                        current_question,
-                        transcribed_text,
-                        role,
-                        skills
-                    )
-                    st.session_state.feedback.append(feedback)
-                    
-                    st.write("**Feedback:**")
-                    st.write(feedback)
-                    
-                    # Clear audio data and move to next question
-                    st.session_state.audio_data = None
-                    
-                    # Next question button
-                    if st.button("Next Question"):
-                        st.session_state.current_question_index += 1
-                        if st.session_state.current_question_index >= len(st.session_state.questions):
-                            st.session_state.interview_complete = True
-                        st.experimental_rerun()
+                    if pipeline is not None:
+                        # Evaluated in the background while the candidate moves on
+                        pipeline.submit(index, current_question, transcribed_text)
+                    else:
+                        from feedback import evaluate_answer, stream_evaluate_answer
+
+                        st.write("**Your Answer:**")
+                        st.write(transcribed_text)
+                        
+                        # Get feedback, rendering it as it streams in when supported
+                        st.write("**Feedback:**")
+                        if hasattr(st, "write_stream"):
+                            with span("llm_call", operation="feedback"):
+                                feedback = st.write_stream(stream_evaluate_answer(
+                                    current_question,
+                                    transcribed_text,
+                                    role,
+                                    skills,
+                                    company
+                                ))
+                        else:
+                            with st.spinner("Generating feedback..."), span("llm_call", operation="feedback"):
+                                feedback = evaluate_answer(
+                                    current_question,
+                                    transcribed_text,
+                                    role,
+                                    skills,
+                                    company
+                                )
+                            st.write(feedback)
+                        set_at(st.session_state.feedback, index, feedback)
+                        if st.session_state.session_id:
+                            get_session_store().save_answer(st.session_state.session_id, index, feedback=feedback)
+                        rendered = True
+                    answered = True
                         
                 except Exception as e:
                     st.error(f"Error processing your answer: {str(e)}")
+                finally:
                     st.session_state.audio_data = None
+            
+            if answered:
+                if not rendered:
+                    st.write("**Your Answer:**")
+                    st.write(st.session_state.answers[index])
+                    st.write("**Feedback:**")
+                    feedback = value_at(st.session_state.feedback, index)
+                    if feedback is not None:
+                        st.write(feedback)
+                    else:
+                        st.caption("⏳ Feedback is being prepared in the background - "
+                                   "carry on, it will be in your interview summary.")
+                
+                # Next question button - shown on every rerun once the question is answered
+                if st.button("Next Question"):
+                    st.session_state.current_question_index += 1
+                    if st.session_state.current_question_index >= st.session_state.question_count:
+                        st.session_state.interview_complete = True
+                    if st.session_state.session_id:
+                        get_session_store().update(
+                            st.session_state.session_id,
+                            currentQuestionIndex=st.session_state.current_question_index,
+                            complete=st.session_state.interview_complete
+                        )
+                    st.experimental_rerun()
         
         # Show summary at the end
-        elif st.session_state.interview_complete or st.session_state.current_question_index >= len(st.session_state.questions):
+        elif st.session_state.interview_complete or index >= len(st.session_state.questions):
             st.session_state.interview_complete = True
             st.success("🎉 Interview Completed!")
             st.subheader("Interview Summary")
             
-            for i, (question, answer, feedback) in enumerate(zip(
-                st.session_state.questions,
-                st.session_state.answers,
-                st.session_state.feedback
-            )):
+            presence = finish_presence()
+            if presence is not None:
+                from presence import describe
+
+                st.write(f"**Camera presence:** {describe(presence['overall'])}")
+                presence = presence['questions']
+            
+            pending = pipeline.pending() if pipeline is not None else 0
+            if pending:
+                st.info(f"⏳ Feedback for {pending} answer(s) is still being generated and will appear below.")
+                refresh_when_feedback_lands(pipeline)
+            
+            for i, question in enumerate(st.session_state.questions):
+                answer = value_at(st.session_state.answers, i)
+                feedback = value_at(st.session_state.feedback, i)
                 with st.expander(f"Question {i+1}", expanded=False):
                     st.write(f"**Question:** {question}")
-                    st.write(f"**Your Answer:** {answer}")
-                    st.write(f"**Feedback:** {feedback}")
+                    st.write(f"**Your Answer:** {answer if answer is not None else '_No answer recorded_'}")
+                    st.write(f"**Feedback:** {feedback if feedback is not None else '_Still being generated..._'}")
+                    if presence and value_at(presence, i):
+                        st.write(f"**Presence:** {describe(presence[i])}")
             
             if st.button("Start New Interview"):
                 # Reset session state
@@ -182,22 +427,31 @@ def show_interview():
                 st.session_state.recording = False
                 st.session_state.audio_data = None
                 st.session_state.interview_complete = False
+                st.session_state.session_id = None
+                st.session_state.feedback_pipeline = None
+                st.session_state.questions_future = None
+                st.session_state.presence = None
+                if hasattr(st, "query_params"):
+                    st.query_params.clear()
                 st.experimental_rerun()
     
-    # Continuous camera feed
+    # Continuous camera feed, captured by a background thread for this session
+    from camera import render_feed, close_camera
+
     if not st.session_state.interview_complete:
-        cap = cv2.VideoCapture(0)
-        
-        # Run the camera in a loop
-        if cap.isOpened():
-            ret, frame = cap.read()
-            if ret:
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                camera_placeholder.image(frame, channels="RGB", use_column_width=True)
-            cap.release()
-
-# Main app logic
-if st.session_state.page == 'home':
-    show_home()
-else:
-    show_interview()
+        tracker = open_presence()
+        with camera_placeholder.container():
+            render_feed(st.session_state.camera_key, on_frame=tracker.offer if tracker else None)
+    else:
+        close_camera(st.session_state.camera_key)
+
+# Main app logic - each rerun is recorded as one trace
+trace = start_trace(f"streamlit {st.session_state.page}")
+try:
+    if st.session_state.page == 'home':
+        show_home()
+    else:
+        show_interview()
+finally:
+    finish_trace(trace, page=st.session_state.page)
+
@@ -0,0 +1,268 @@
+# audio_preprocess.py
+
+import io
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import wave
+
+import numpy as np
+
+from tracing import registry
+
+logger = logging.getLogger(__name__)
+
+# Target format for transcription: speech models work on mono 16 kHz
+SAMPLE_RATE = 16000
+
+# ffmpeg decodes WebM/Opus and re-encodes to Opus; without it only WAV input
+# is processed (and re-encoded as 16 kHz mono WAV)
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+FFMPEG_TIMEOUT = 30
+# Uploads are fed to ffmpeg in chunks of this size; non-seekable ones are
+# spooled to disk past SPOOL_MAX_MEMORY so they can be sent on unchanged
+CHUNK_SIZE = 64 * 1024
+SPOOL_MAX_MEMORY = 1024 * 1024
+OPUS_BITRATE = os.getenv("AUDIO_OPUS_BITRATE", "24k")
+
+# Voice activity detection: RMS energy over short frames, with a threshold
+# that adapts to the recording's noise floor
+VAD_FRAME_SECONDS = 0.03
+VAD_MIN_RMS = float(os.getenv("AUDIO_VAD_MIN_RMS", "300"))  # int16 units, about -40 dBFS
+VAD_NOISE_FACTOR = 3.0
+# Silence kept around the detected speech so word edges are not clipped
+VAD_PADDING_SECONDS = float(os.getenv("AUDIO_VAD_PADDING", "0.25"))
+# Recordings with less detected speech than this are rejected before upload
+MIN_SPEECH_SECONDS = float(os.getenv("AUDIO_MIN_SPEECH_SECONDS", "0.5"))
+
+bytes_in = registry.counter("audio_preprocess_input_bytes_total", "Audio bytes received for preprocessing")
+bytes_out = registry.counter("audio_preprocess_output_bytes_total", "Audio bytes sent on after preprocessing")
+rejections = registry.counter("audio_preprocess_rejected_total", "Recordings rejected before transcription")
+
+
+class AudioRejected(Exception):
+    """Raised for recordings that are not worth transcribing (silent, too short, undecodable)."""
+
+    def __init__(self, message, reason):
+        super().__init__(message)
+        self.reason = reason
+
+
+class ProcessedAudio:
+    def __init__(self, data, content_type, input_bytes, duration, speech_seconds):
+        self.data = data
+        self.content_type = content_type
+        self.input_bytes = input_bytes
+        self.duration = duration
+        self.speech_seconds = speech_seconds
+
+
+_ffmpeg_path = None
+
+
+def ffmpeg_path():
+    global _ffmpeg_path
+    if _ffmpeg_path is None:
+        _ffmpeg_path = shutil.which(FFMPEG_BINARY) or ""
+        if not _ffmpeg_path:
+            logger.warning("ffmpeg not found; only WAV recordings will be preprocessed")
+    return _ffmpeg_path
+
+
+def is_wav(data):
+    return data[:4] == b"RIFF" and data[8:12] == b"WAVE"
+
+
+def _feed(stdin, source):
+    try:
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            stdin.write(source)
+        else:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                stdin.write(chunk)
+    except OSError:
+        # ffmpeg exited early; its exit status reports why
+        pass
+    finally:
+        try:
+            stdin.close()
+        except OSError:
+            pass
+
+
+def _run_ffmpeg(args, source):
+    """Runs ffmpeg on `source` (bytes or a binary file read in chunks) and returns its output."""
+    with tempfile.TemporaryFile() as errors:
+        process = subprocess.Popen(
+            [ffmpeg_path(), "-hide_banner", "-loglevel", "error", *args],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=errors,
+        )
+        feeder = threading.Thread(target=_feed, args=(process.stdin, source), daemon=True)
+        feeder.start()
+        timed_out = threading.Event()
+
+        def kill():
+            timed_out.set()
+            process.kill()
+
+        timer = threading.Timer(FFMPEG_TIMEOUT, kill)
+        timer.start()
+        try:
+            output = process.stdout.read()
+            returncode = process.wait()
+        finally:
+            timer.cancel()
+            process.stdout.close()
+        feeder.join()
+        if timed_out.is_set():
+            raise subprocess.TimeoutExpired(process.args, FFMPEG_TIMEOUT)
+        if returncode != 0:
+            errors.seek(0)
+            message = errors.read().decode(errors="replace").strip() or f"ffmpeg exited with {returncode}"
+            raise AudioRejected(f"Could not decode audio: {message}", "undecodable")
+    return output
+
+
+def _decode_wav(file):
+    try:
+        with wave.open(file, "rb") as f:
+            channels, width, rate = f.getnchannels(), f.getsampwidth(), f.getframerate()
+            frames = f.readframes(f.getnframes())
+    except (wave.Error, EOFError) as e:
+        raise AudioRejected(f"Could not decode audio: {str(e)}", "undecodable")
+    if width not in (1, 2, 4):
+        raise AudioRejected(f"Unsupported WAV sample width: {width} bytes", "undecodable")
+
+    samples = np.frombuffer(frames, dtype={1: np.uint8, 2: np.int16, 4: np.int32}[width]).astype(np.float32)
+    if width == 1:
+        samples = (samples - 128) * 256
+    elif width == 4:
+        samples = samples / 65536
+    if channels > 1:
+        samples = samples[: len(samples) // channels * channels].reshape(-1, channels).mean(axis=1)
+    if rate != SAMPLE_RATE and len(samples):
+        # Linear interpolation is adequate for speech going to a 16 kHz model
+        positions = np.arange(0, len(samples), rate / SAMPLE_RATE)
+        samples = np.interp(positions, np.arange(len(samples)), samples)
+    return np.clip(samples, -32768, 32767).astype(np.int16)
+
+
+def decode(file):
+    """
+    Decodes any supported recording, a seekable binary file read from its
+    current position, to mono 16 kHz int16 samples, or returns None if it
+    cannot. Raises AudioRejected if ffmpeg cannot decode it.
+    """
+    if ffmpeg_path():
+        pcm = _run_ffmpeg(["-i", "pipe:0", "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"], file)
+        return np.frombuffer(pcm, dtype=np.int16)
+    start = file.tell()
+    header = file.read(12)
+    file.seek(start)
+    if is_wav(header):
+        return _decode_wav(file)
+    return None
+
+
+def speech_bounds(samples):
+    """
+    Returns (start, end, speech_seconds): the sample range spanning detected
+    speech plus padding, and how much of it was voiced.
+    """
+    frame = int(SAMPLE_RATE * VAD_FRAME_SECONDS)
+    count = len(samples) // frame
+    if count == 0:
+        return 0, 0, 0.0
+
+    frames = samples[: count * frame].astype(np.float32).reshape(count, frame)
+    energy = np.sqrt((frames ** 2).mean(axis=1))
+    # Quiet frames set the noise floor; never demand more than half of the loud frames' level
+    threshold = max(VAD_MIN_RMS, min(np.percentile(energy, 10) * VAD_NOISE_FACTOR, np.percentile(energy, 95) / 2))
+    voiced = energy > threshold
+    if not voiced.any():
+        return 0, 0, 0.0
+
+    padding = int(VAD_PADDING_SECONDS / VAD_FRAME_SECONDS)
+    first = max(0, int(np.argmax(voiced)) - padding)
+    last = min(count, count - int(np.argmax(voiced[::-1])) + padding)
+    return first * frame, last * frame, float(voiced.sum()) * VAD_FRAME_SECONDS
+
+
+def encode(samples):
+    """Encodes mono 16 kHz samples as Opus (with ffmpeg) or WAV. Returns (data, content_type)."""
+    if ffmpeg_path():
+        data = _run_ffmpeg([
+            "-f", "s16le", "-ar", str(SAMPLE_RATE), "-ac", "1", "-i", "pipe:0",
+            "-c:a", "libopus", "-b:a", OPUS_BITRATE, "-application", "voip", "-f", "ogg", "pipe:1",
+        ], memoryview(samples).cast("B"))
+        return data, "audio/ogg"
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(samples.tobytes())
+    return buffer.getvalue(), "audio/wav"
+
+
+def _seekable(file):
+    """The recording as a seekable binary file, without copying bytes or seekable uploads."""
+    if isinstance(file, (bytes, bytearray)):
+        return io.BytesIO(file)
+    if getattr(file, "seekable", lambda: False)():
+        return file
+    stream = getattr(file, "stream", None)
+    if stream is not None and getattr(stream, "seekable", lambda: False)():
+        # A Werkzeug FileStorage
+        return stream
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    shutil.copyfileobj(file, spool, CHUNK_SIZE)
+    spool.seek(0)
+    return spool
+
+
+def preprocess_audio(file):
+    """
+    Decodes a recording once, downmixes and resamples it to mono 16 kHz,
+    trims leading and trailing silence and re-encodes it compactly. The
+    upload is read in chunks, never copied whole into memory. Raises
+    AudioRejected for recordings without enough speech, and for ones
+    ffmpeg cannot decode. Without ffmpeg, recordings other than WAV are
+    passed on unchanged, as is any upload the re-encode would not shrink.
+    """
+    file = _seekable(file)
+    start = file.tell()
+    input_bytes = file.seek(0, os.SEEK_END) - start
+    file.seek(start)
+    bytes_in.inc(input_bytes)
+
+    samples = decode(file)
+    file.seek(start)
+    if samples is None:
+        bytes_out.inc(input_bytes)
+        return ProcessedAudio(file, "application/octet-stream", input_bytes, None, None)
+
+    duration = len(samples) / SAMPLE_RATE
+    start_sample, end_sample, speech_seconds = speech_bounds(samples)
+    if speech_seconds < MIN_SPEECH_SECONDS:
+        reason = "silent" if speech_seconds == 0 else "too_short"
+        rejections.inc(reason=reason)
+        raise AudioRejected(
+            f"Recording has {speech_seconds:.1f}s of speech, at least {MIN_SPEECH_SECONDS:.1f}s is needed", reason
+        )
+
+    encoded, content_type = encode(samples[start_sample:end_sample])
+    if len(encoded) >= input_bytes:
+        # Already compact (e.g. a short Opus upload) - trimming saved nothing worth the re-encode
+        bytes_out.inc(input_bytes)
+        return ProcessedAudio(file, "application/octet-stream", input_bytes, duration, speech_seconds)
+    bytes_out.inc(len(encoded))
+    logger.debug(f"Preprocessed audio: {input_bytes} -> {len(encoded)} bytes, "
+                 f"{duration:.1f}s -> {(end_sample - start_sample) / SAMPLE_RATE:.1f}s")
+    return ProcessedAudio(encoded, content_type, input_bytes, duration, speech_seconds)
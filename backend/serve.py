@@ -0,0 +1,75 @@
+# serve.py
+"""
+Production entry point for the Flask API:
+
+    python backend/serve.py
+
+Runs the app on Waitress (works on Windows and Linux) with a pool of worker
+threads, HTTP keep-alive, request size limits and graceful shutdown.
+"""
+
+import logging
+import os
+import signal
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from waitress import create_server
+
+from app import app, MAX_UPLOAD_MB, feedback_executor
+import transcriber
+
+logger = logging.getLogger(__name__)
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "5000"))
+# Handlers block on model and transcription calls, so size the pool for
+# concurrent interviews rather than CPU cores
+SERVER_THREADS = int(os.getenv("SERVER_THREADS", "64"))
+SERVER_CONNECTION_LIMIT = int(os.getenv("SERVER_CONNECTION_LIMIT", "200"))
+# Idle keep-alive connections are closed after this many seconds
+SERVER_CHANNEL_TIMEOUT = int(os.getenv("SERVER_CHANNEL_TIMEOUT", "120"))
+
+
+def build_server(wsgi_app=app, host=HOST, port=PORT, threads=SERVER_THREADS):
+    return create_server(
+        wsgi_app,
+        host=host,
+        port=port,
+        threads=threads,
+        connection_limit=SERVER_CONNECTION_LIMIT,
+        channel_timeout=SERVER_CHANNEL_TIMEOUT,
+        max_request_body_size=MAX_UPLOAD_MB * 1024 * 1024,
+        ident="mock-interview-api",
+    )
+
+
+def _handle_shutdown(signum, frame):
+    # Waitress catches SystemExit, stops accepting connections and lets
+    # in-flight requests finish before the worker threads exit
+    logger.info(f"Received signal {signum}, shutting down")
+    raise SystemExit(0)
+
+
+def main():
+    server = build_server()
+    signal.signal(signal.SIGTERM, _handle_shutdown)
+    signal.signal(signal.SIGINT, _handle_shutdown)
+
+    # Load the transcription backend (and a local model, if configured) before taking traffic
+    transcriber.get_backend()
+
+    logger.info(f"Serving on http://{HOST}:{server.effective_port} with {SERVER_THREADS} threads")
+    try:
+        server.run()
+    finally:
+        # Drain background work so queued transcriptions are not lost
+        transcriber.shutdown(wait=True)
+        feedback_executor.shutdown(wait=True)
+        server.close()
+        logger.info("Shutdown complete")
+
+
+if __name__ == '__main__':
+    main()
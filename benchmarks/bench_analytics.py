@@ -0,0 +1,215 @@
+# bench_analytics.py
+"""
+Ingestion cost and query latency of the feedback analytics store
+(analytics_store.py), in a temporary directory.
+
+1. Ingestion: /api/feedback is called through the Flask test client with
+   the fake model and no model latency, with the store enabled and
+   disabled, so the difference is what recording adds to a request. The
+   record() call itself is timed, and so is the background flush (score
+   parsing, token counting and appending) in rows per second.
+2. Queries: --rows synthetic feedback rows over many roles, companies and
+   skills are bulk-appended, then /api/analytics queries run per role,
+   company and skill for a score and for latency. Uncached times are the
+   first run after the data is mapped and repeated runs with the result
+   cache cleared; cached repeats are shown alongside.
+
+Exits non-zero if an uncached query exceeds --max-ms:
+
+    python benchmarks/bench_analytics.py --rows 1000000 --max-ms 1000
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+DATA_DIR = tempfile.mkdtemp(prefix="analytics-bench-")
+# Set before analytics_store.py and load_test.py are first imported
+os.environ["ANALYTICS_DIR"] = os.path.join(DATA_DIR, "requests")
+os.environ["ANALYTICS_ENABLED"] = "1"
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("FAKE_LLM_LATENCY", "0")
+os.environ.setdefault("SESSION_STORE", "memory")
+
+QUERIES = [
+    (None, "overall"),
+    ("role", "overall"),
+    ("company", "overall"),
+    ("skill", "overall"),
+    ("role", "latencyMs"),
+    ("skill", "latencyMs"),
+]
+
+
+def percentile(timings, share):
+    timings = sorted(timings)
+    return timings[min(len(timings) - 1, int(len(timings) * share))]
+
+
+def request_latency(client, requests, enabled):
+    import analytics_store
+
+    analytics_store.ANALYTICS_ENABLED = enabled
+    body = {"question": "How do you test code?", "answer": "I write unit tests first. " * 40,
+            "role": "Backend Engineer", "skills": "Python, SQL, Testing", "company": "Acme"}
+    timings = []
+    for i in range(requests):
+        started = time.perf_counter()
+        response = client.post("/api/feedback", json={**body, "question": f"{body['question']} ({i})"})
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.status_code
+    return timings
+
+
+def ingestion(requests):
+    from load_test import load_backend
+    import analytics_store
+
+    backend = load_backend()
+    client = backend.app.test_client()
+    request_latency(client, 50, True)
+    disabled = request_latency(client, requests, False)
+    enabled = request_latency(client, requests, True)
+    for name, timings in (("store disabled", disabled), ("store enabled", enabled)):
+        print(f"/api/feedback, {name}: p50 {statistics.median(timings):.2f} ms, p99 {percentile(timings, 0.99):.2f} ms")
+
+    store = analytics_store.get_analytics_store()
+    store.flush()
+    feedback = backend.fallback_feedback("Backend Engineer")
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        store.record(feedback, "Backend Engineer", "Acme", "Python, SQL", 0.8, "prompt " * 300)
+        timings.append((time.perf_counter() - started) * 1e6)
+    print(f"record(): p50 {statistics.median(timings):.1f} us, p99 {percentile(timings, 0.99):.1f} us")
+    started = time.perf_counter()
+    store.flush()
+    print(f"background flush: {requests / (time.perf_counter() - started):,.0f} rows/s (parse, count tokens, append)")
+    store.close()
+
+
+def synthetic_rows(rng, count, roles, companies, skills):
+    """Prepared rows as store.append takes them, built column-wise for speed."""
+    import numpy as np
+
+    role_names = [f"role {i}" for i in range(roles)]
+    company_names = [f"company {i}" for i in range(companies)]
+    skill_names = [f"skill {i}" for i in range(skills)]
+    # A few popular roles, companies and skills, and a long tail
+    role = np.minimum(rng.zipf(1.3, count) - 1, roles - 1).tolist()
+    company = np.minimum(rng.zipf(1.2, count) - 1, companies - 1).tolist()
+    skill_count = rng.integers(2, 7, count).tolist()
+    skill_ids = np.minimum(rng.zipf(1.2, (count, 6)) - 1, skills - 1).tolist()
+    overall = np.clip(np.rint(rng.normal(3.4, 0.9, count) * 2) / 2, 1, 5)
+    sections = np.clip(overall[:, None] + rng.choice([-1, -0.5, 0, 0.5, 1], (count, 3)), 1, 5)
+    # Technical accuracy is N/A for about a third of the answers
+    sections[rng.random(count) < 0.33, 2] = np.nan
+    latency = rng.lognormal(7.0, 0.5, count)
+    prompt = rng.integers(300, 1400, count)
+    response = rng.integers(150, 600, count)
+    fallback = (rng.random(count) < 0.02).astype(int)
+    now = time.time()
+    times = (now - rng.random(count) * 365 * 86400).tolist()
+    overall, sections = overall.tolist(), sections.tolist()
+    latency, prompt, response, fallback = latency.tolist(), prompt.tolist(), response.tolist(), fallback.tolist()
+    return [
+        {
+            "time": times[i],
+            "role": role_names[role[i]],
+            "company": company_names[company[i]],
+            "skills": sorted({skill_names[s] for s in skill_ids[i][:skill_count[i]]}),
+            "overall": overall[i],
+            "relevance": sections[i][0],
+            "clarity": sections[i][1],
+            "technical": sections[i][2],
+            "latencyMs": latency[i],
+            "promptTokens": prompt[i],
+            "responseTokens": response[i],
+            "fallback": fallback[i],
+        }
+        for i in range(count)
+    ]
+
+
+def queries(args):
+    import numpy as np
+    from analytics_store import AnalyticsStore
+
+    path = os.path.join(DATA_DIR, "rows")
+    store = AnalyticsStore(path, flush_interval=3600)
+    rng = np.random.default_rng(args.seed)
+    started = time.perf_counter()
+    for start in range(0, args.rows, 100000):
+        store.append(synthetic_rows(rng, min(100000, args.rows - start), args.roles, args.companies, args.skills))
+    elapsed = time.perf_counter() - started
+    size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    store.close()
+    print(f"\n{args.rows:,} rows bulk-appended in {elapsed:.1f}s, {size / 2 ** 20:.0f} MB on disk "
+          f"({size / args.rows:.0f} bytes per row)")
+
+    # A fresh store maps the files the way a restarted server would
+    store = AnalyticsStore(path, flush_interval=3600)
+    snapshot = store.snapshot()
+    print(f"{snapshot['rows']:,} rows, {snapshot['links']:,} skill links, "
+          f"{len(snapshot['names']['role'])} roles, {len(snapshot['names']['company'])} companies, "
+          f"{len(snapshot['names']['skill'])} skills\n")
+    print(f"{'query':<26}{'groups':>8}{'first':>10}{'p50':>10}{'max':>10}{'cached':>10}")
+    failures = []
+    for group_by, metric in QUERIES:
+        timings = []
+        for _ in range(args.repeat + 1):
+            # Time the aggregation itself, not the result cache
+            store._cache.clear()
+            started = time.perf_counter()
+            result = store.query(group_by=group_by, metric=metric)
+            timings.append((time.perf_counter() - started) * 1000)
+        started = time.perf_counter()
+        store.query(group_by=group_by, metric=metric)
+        cached = (time.perf_counter() - started) * 1000
+        name = f"{metric} by {group_by or 'all'}"
+        print(f"{name:<26}{result.get('groupCount', 1):>8}{timings[0]:>8.0f}ms{statistics.median(timings[1:]):>8.0f}ms"
+              f"{max(timings):>8.0f}ms{cached:>8.2f}ms")
+        if max(timings) > args.max_ms:
+            failures.append(f"{name}: {max(timings):.0f} ms > {args.max_ms:.0f} ms")
+
+    filtered = store.query(group_by="role", metric="overall", skill="skill 0", since=time.time() - 30 * 86400)
+    print(f"\nfiltered (skill 0, last 30 days, by role): {filtered['rows']:,} rows in {filtered['queryMs']:.0f} ms")
+    store.close()
+    return failures
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000, help="synthetic rows to query")
+    parser.add_argument("--roles", type=int, default=300)
+    parser.add_argument("--companies", type=int, default=2000)
+    parser.add_argument("--skills", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=500, help="feedback requests per ingestion run")
+    parser.add_argument("--repeat", type=int, default=5, help="uncached runs of each query after the first")
+    parser.add_argument("--max-ms", type=float, default=1000.0, help="fail if an uncached query is slower")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        ingestion(args.requests)
+        failures = queries(args)
+    finally:
+        shutil.rmtree(DATA_DIR, ignore_errors=True)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+# bench_answer_metrics.py
+"""
+Latency and throughput of the local answer metrics (answer_metrics.py).
+
+A corpus of synthetic transcripts is generated: interview answers from a
+few words to several minutes of speech, mixing plain sentences, STAR
+phrases and filler words at varying rates, each paired with a behavioural
+or technical question and a recording duration.
+
+1. Per answer: analyze_answer is timed on every transcript, as
+   /api/transcribe calls it, and on the longest answer of --long-words.
+2. Batch: analyze_answers runs over the corpus in session-sized batches,
+   as /api/metrics and /api/sessions/<id>/metrics do.
+
+Exits non-zero if the p99 or the long answer exceeds --max-ms:
+
+    python benchmarks/bench_answer_metrics.py --answers 20000 --max-ms 50
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+QUESTIONS = [
+    "Tell me about a time you had to meet a tight deadline.",
+    "Describe a situation where you disagreed with your manager.",
+    "Give me an example of a project you led from start to finish.",
+    "How would you design a rate limiter for a public API?",
+    "What is the difference between a process and a thread?",
+    "Explain how you would debug a slow database query.",
+]
+SENTENCES = [
+    "The service handled about two thousand requests per second at peak",
+    "we had three engineers and a product manager on the team",
+    "the database was the bottleneck because every request hit the same table",
+    "I think the main trade-off is between consistency and latency",
+    "caching the responses would have hidden the problem rather than fixed it",
+    "the client kept changing the requirements during the sprint",
+    "a queue in front of the workers smooths out the bursts",
+    "threads share memory while processes each get their own address space",
+]
+STAR = [
+    "When I was at my previous company",
+    "my role was to coordinate the release",
+    "so I set up a daily check-in with the other teams",
+    "then I wrote a script to replay the production traffic",
+    "as a result we shipped two days early",
+    "we reduced the error rate by 30 percent",
+    "I learned to raise risks much earlier",
+]
+FILLERS = ["um", "uh", "you know", "like,", "I mean", "basically", "sort of"]
+
+
+def make_answer(rng, words):
+    """A transcript of about `words` words."""
+    parts = []
+    count = 0
+    filler_rate = rng.choice([0.0, 0.02, 0.05, 0.1])
+    while count < words:
+        sentence = rng.choice(STAR if rng.random() < 0.3 else SENTENCES)
+        tokens = sentence.split()
+        out = []
+        for token in tokens:
+            if rng.random() < filler_rate:
+                out.append(rng.choice(FILLERS))
+            out.append(token)
+        parts.append(" ".join(out).capitalize() + ".")
+        count += len(out)
+    return " ".join(parts)
+
+
+def build_corpus(rng, answers):
+    corpus = []
+    for _ in range(answers):
+        # Mostly one to three minutes of speech, some very short or very long
+        words = int(min(2000, max(3, rng.lognormvariate(5.3, 0.6))))
+        wpm = rng.uniform(100, 180)
+        duration = words / wpm * 60 * rng.uniform(1.0, 1.3)
+        corpus.append({"question": rng.choice(QUESTIONS), "answer": make_answer(rng, words),
+                       "duration": duration, "speechSeconds": words / wpm * 60})
+    return corpus
+
+
+def percentile(timings, share):
+    return timings[min(len(timings) - 1, int(len(timings) * share))]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--answers", type=int, default=20000, help="transcripts in the corpus")
+    parser.add_argument("--session", type=int, default=10, help="answers per batch")
+    parser.add_argument("--long-words", type=int, default=10000, help="words in the longest answer timed")
+    parser.add_argument("--max-ms", type=float, default=50.0, help="fail if p99 or the long answer is slower")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    from answer_metrics import analyze_answer, analyze_answers
+
+    rng = random.Random(args.seed)
+    corpus = build_corpus(rng, args.answers)
+    words = sum(len(item["answer"].split()) for item in corpus)
+    print(f"{len(corpus)} answers, {words} words ({words / len(corpus):.0f} per answer on average)")
+
+    timings = []
+    for item in corpus:
+        started = time.perf_counter()
+        analyze_answer(item["answer"], item["question"], item["duration"], item["speechSeconds"])
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    p99 = percentile(timings, 0.99)
+    print(f"per answer: p50 {statistics.median(timings):.3f} ms, p95 {percentile(timings, 0.95):.3f} ms, "
+          f"p99 {p99:.3f} ms, max {timings[-1]:.3f} ms")
+
+    long_answer = make_answer(rng, args.long_words)
+    long_timings = []
+    for _ in range(5):
+        started = time.perf_counter()
+        analyze_answer(long_answer, QUESTIONS[0], args.long_words / 2.5)
+        long_timings.append((time.perf_counter() - started) * 1000)
+    long_ms = statistics.median(long_timings)
+    print(f"{args.long_words}-word answer: {long_ms:.2f} ms")
+
+    started = time.perf_counter()
+    for start in range(0, len(corpus), args.session):
+        analyze_answers(corpus[start:start + args.session])
+    elapsed = time.perf_counter() - started
+    print(f"batch of {args.session}: {len(corpus) / elapsed:,.0f} answers/s, {words / elapsed:,.0f} words/s "
+          f"({elapsed:.2f}s for the corpus)")
+
+    failures = []
+    if p99 > args.max_ms:
+        failures.append(f"p99 {p99:.2f} ms > {args.max_ms:.0f} ms")
+    if long_ms > args.max_ms:
+        failures.append(f"{args.long_words}-word answer {long_ms:.2f} ms > {args.max_ms:.0f} ms")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+# bench_fairness.py
+"""
+Per-client rate limiting and fair scheduling of model calls (rate_limit.py),
+against the Flask app in-process with a slow fake model.
+
+1. Rate limit: one client fires a burst of /api/feedback requests. Requests
+   beyond RATE_LIMIT_BURST must get 429 with a Retry-After header.
+2. Fair share: with rate limiting off, a noisy client queues many feedback
+   requests at once and a quiet client then sends one. With per-client
+   queues the quiet request waits for about one slot; with a single shared
+   queue (both clients under one address) it waits behind the whole burst.
+
+Exits non-zero if either check fails:
+
+    python benchmarks/bench_fairness.py --noisy 32 --slots 4 --latency 0.5
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+FEEDBACK = {"question": "Describe a challenging project.", "role": "Engineer", "skills": "Python"}
+
+
+def post_feedback(app, address, answer):
+    """Sends one /api/feedback request from `address`; returns (status, retry_after, seconds)."""
+    started = time.perf_counter()
+    response = app.test_client().post("/api/feedback", json={**FEEDBACK, "answer": answer},
+                                      environ_base={"REMOTE_ADDR": address})
+    return response.status_code, response.headers.get("Retry-After"), time.perf_counter() - started
+
+
+def check_rate_limit(backend, burst, extra):
+    import rate_limit
+    limiter = rate_limit.RateLimiter(rate_limit.MemoryBucketStore(), rate=0.5, burst=burst)
+    backend.get_rate_limiter = lambda: limiter
+    backend.RATE_LIMIT_ENABLED = True
+    results = [post_feedback(backend.app, "10.0.0.1", f"Answer {i}.") for i in range(burst + extra)]
+    allowed = sum(1 for status, _, _ in results if status == 200)
+    limited = [retry for status, retry, _ in results if status == 429]
+    other = post_feedback(backend.app, "10.0.0.2", "Another client.")[0]
+    print(f"rate limit: {allowed} allowed, {len(limited)} got 429 "
+          f"(Retry-After {limited[0] if limited else '-'}s), another client got {other}")
+    return allowed == burst and len(limited) == extra and all(limited) and other == 200
+
+
+def quiet_latency(backend, noisy, fair, latency):
+    """Seconds the quiet client's request takes while the noisy client's burst is queued."""
+    noisy_address, quiet_address = "10.0.0.1", ("10.0.0.2" if fair else "10.0.0.1")
+    threads = [threading.Thread(target=post_feedback, args=(backend.app, noisy_address, f"Noisy answer {i}."))
+               for i in range(noisy)]
+    for thread in threads:
+        thread.start()
+    time.sleep(latency / 5)
+    _, _, seconds = post_feedback(backend.app, quiet_address, "Quiet answer.")
+    for thread in threads:
+        thread.join()
+    return seconds
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--noisy", type=int, default=32, help="requests the noisy client queues at once")
+    parser.add_argument("--slots", type=int, default=4, help="concurrent model calls (LLM_MAX_CONCURRENCY)")
+    parser.add_argument("--latency", type=float, default=0.5, help="fake model latency (s)")
+    parser.add_argument("--burst", type=int, default=10, help="rate limit burst for the first check")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    os.environ.setdefault("SESSION_STORE", "memory")
+    from load_test import load_backend
+    from llm_client import LLMClient, FakeBackend
+
+    backend = load_backend()
+    fake = FakeBackend(latency=0.01)
+    backend.model = LLMClient(lambda: fake, single_flight=False)
+    limit_ok = check_rate_limit(backend, args.burst, 5)
+
+    backend.RATE_LIMIT_ENABLED = False
+    fake = FakeBackend(latency=args.latency)
+    backend.model = LLMClient(lambda: fake, max_concurrency=args.slots, single_flight=False)
+    shared = quiet_latency(backend, args.noisy, False, args.latency)
+    fair = quiet_latency(backend, args.noisy, True, args.latency)
+    burst_time = args.noisy / args.slots * args.latency
+    print(f"fair share: quiet request took {shared:.2f}s in a shared queue, {fair:.2f}s with per-client queues "
+          f"(noisy burst needs {burst_time:.2f}s)")
+    fair_ok = fair <= 2.5 * args.latency and shared > fair
+
+    if not (limit_ok and fair_ok):
+        print("FAILED")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# bench_feedback_batch.py
+"""
+Latency of evaluating a whole interview serially (one /api/feedback call per
+answer) versus a single /api/feedback/batch call, using a fake model with a
+configurable delay so no API key or network is needed:
+
+    python benchmarks/bench_feedback_batch.py --answers 5 --delay 1.5
+"""
+
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stubs import FakeModel
+
+
+def load_backend():
+    # backend/app.py shares its module name with the Streamlit app.py
+    spec = importlib.util.spec_from_file_location("backend_app", os.path.join(ROOT, "backend", "app.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--answers", type=int, default=5)
+    parser.add_argument("--delay", type=float, default=1.0, help="fake model latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.2)
+    args = parser.parse_args()
+
+    backend = load_backend()
+    logging.getLogger().setLevel(logging.WARNING)
+    backend.model = FakeModel(delay=args.delay, jitter=args.jitter)
+    client = backend.app.test_client()
+
+    items = [
+        {"question": f"Question {i + 1}?", "answer": f"My answer to question {i + 1}."}
+        for i in range(args.answers)
+    ]
+
+    started = time.perf_counter()
+    for item in items:
+        client.post("/api/feedback", json={**item, "role": "Engineer", "skills": "Python"})
+    serial = time.perf_counter() - started
+
+    started = time.perf_counter()
+    response = client.post("/api/feedback/batch", json={"items": items, "role": "Engineer", "skills": "Python"})
+    batch = time.perf_counter() - started
+    assert len(response.get_json()["results"]) == args.answers
+
+    started = time.perf_counter()
+    first = None
+    response = client.post(
+        "/api/feedback/batch?stream=1", json={"items": items, "role": "Engineer", "skills": "Python"}, buffered=False
+    )
+    for line in response.response:
+        if first is None and line.strip():
+            first = time.perf_counter() - started
+            json.loads(line)
+    streamed = time.perf_counter() - started
+
+    print(f"{args.answers} answers, model delay {args.delay:.2f}s +/- {args.jitter:.2f}s, "
+          f"{backend.FEEDBACK_WORKERS} workers")
+    print(f"  serial /api/feedback       {serial:6.2f} s")
+    print(f"  /api/feedback/batch        {batch:6.2f} s   ({serial / batch:.1f}x faster)")
+    print(f"  batch stream, first result {first:6.2f} s   (all results {streamed:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# bench_preprocess.py
+"""
+Measures the audio preprocessing stage in transcriber.transcribe_audio:
+bytes uploaded, provider round trips and end-to-end latency per recording,
+with preprocessing off (upload as recorded) and on (decode, mono 16 kHz,
+silence trimmed, re-encoded; silent/short takes rejected before upload).
+
+The corpus is synthetic 44.1 kHz stereo WAV, as browsers and st.audio_input
+produce, with silence around each answer and some accidental near-empty
+takes. Against the stub provider:
+
+    python benchmarks/bench_preprocess.py --recordings 10 --upload-kbps 4000
+
+With ffmpeg on PATH the output is Opus, otherwise 16 kHz mono WAV.
+"""
+
+import argparse
+import io
+import os
+import random
+import statistics
+import sys
+import time
+import wave
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stubs import StubAssemblyAI
+
+RATE = 44100
+
+
+def make_recording(rng, speech_seconds, silence_seconds):
+    """Voiced-sounding bursts (harmonics with syllable-rate gaps) padded with room noise."""
+    t = np.arange(int(speech_seconds * RATE)) / RATE
+    pitch = 120 + 30 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = (np.sin(2 * np.pi * 3 * t) > -0.3).astype(np.float32)
+    speech = 6000 * voice * envelope
+    noise = lambda seconds: rng.normal(0, 40, int(seconds * RATE))
+    mono = np.concatenate([noise(silence_seconds), speech + rng.normal(0, 40, len(t)), noise(silence_seconds)])
+    stereo = np.repeat(np.clip(mono, -32768, 32767).astype(np.int16)[:, None], 2, axis=1)
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(RATE)
+        f.writeframes(stereo.tobytes())
+    return buffer.getvalue()
+
+
+def build_corpus(args):
+    rng = np.random.default_rng(args.seed)
+    picker = random.Random(args.seed)
+    empty = set(picker.sample(range(args.recordings), round(args.recordings * args.empty_rate)))
+    corpus = []
+    for i in range(args.recordings):
+        if i in empty:
+            # Mis-click: a fraction of a second of sound, or nothing at all
+            corpus.append(make_recording(rng, picker.choice([0.0, 0.2]), picker.uniform(1, 3)))
+        else:
+            corpus.append(make_recording(rng, picker.uniform(*args.speech_seconds), picker.uniform(*args.silence_seconds)))
+    return corpus
+
+
+def run(transcriber, stub, corpus, preprocess):
+    from audio_preprocess import AudioRejected
+
+    uploaded = stub.uploaded_bytes
+    transcripts = stub.request_counts["transcript"]
+    latencies = []
+    rejected = 0
+    for recording in corpus:
+        started = time.perf_counter()
+        try:
+            transcriber.transcribe_audio(recording, preprocess=preprocess)
+        except AudioRejected:
+            rejected += 1
+        latencies.append(time.perf_counter() - started)
+    return {
+        "uploaded_kb": (stub.uploaded_bytes - uploaded) / 1024,
+        "round_trips": stub.request_counts["transcript"] - transcripts,
+        "rejected": rejected,
+        "median_s": statistics.median(latencies),
+        "total_s": sum(latencies),
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recordings", type=int, default=10)
+    parser.add_argument("--empty-rate", type=float, default=0.2, help="fraction of silent or near-empty takes")
+    parser.add_argument("--speech-seconds", type=float, nargs=2, default=(4.0, 10.0), metavar=("MIN", "MAX"))
+    parser.add_argument("--silence-seconds", type=float, nargs=2, default=(0.5, 2.5), metavar=("MIN", "MAX"))
+    parser.add_argument("--processing-time", type=float, default=1.0, help="fixed provider time per file (s)")
+    parser.add_argument("--processing-per-mb", type=float, default=0.0, help="provider time per MB (s)")
+    parser.add_argument("--upload-kbps", type=float, default=4000.0, help="link to the provider, 0 = unlimited")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    stub = StubAssemblyAI(
+        processing_time=args.processing_time,
+        processing_per_mb=args.processing_per_mb,
+        upload_bandwidth=int(args.upload_kbps * 1000 / 8),
+    ).start()
+    os.environ["ASSEMBLYAI_BASE_URL"] = stub.base_url
+    os.environ.setdefault("TRANSCRIBE_POLL_INITIAL_DELAY", "0.1")
+    os.environ.setdefault("TRANSCRIBE_POLL_MAX_DELAY", "0.25")
+
+    import transcriber
+    from audio_preprocess import ffmpeg_path
+
+    corpus = build_corpus(args)
+    print(f"{len(corpus)} recordings, {sum(len(r) for r in corpus) / 1024:.0f} KB as recorded; "
+          f"encoder {'opus (ffmpeg)' if ffmpeg_path() else 'wav (no ffmpeg)'}, upload link {args.upload_kbps:.0f} kbps")
+    print(f"{'mode':<14}{'uploaded':>11}{'round trips':>13}{'rejected':>10}{'median':>9}{'total':>9}")
+    try:
+        for label, preprocess in (("as recorded", False), ("preprocessed", True)):
+            stats = run(transcriber, stub, corpus, preprocess)
+            print(f"{label:<14}{stats['uploaded_kb']:>8.0f} KB{stats['round_trips']:>13}{stats['rejected']:>10}"
+                  f"{stats['median_s']:>8.2f}s{stats['total_s']:>8.2f}s")
+    finally:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+# bench_presence.py
+"""
+CPU cost of camera presence analysis (presence.py) per minute of interview.
+
+Frames come from a recorded video (--video) or are drawn: a cartoon face
+that drifts, turns away and leaves the frame now and then, which the
+OpenCV face and eye detectors pick up like a real one. A simulated
+interview of --minutes at the camera rate is fed to a PresenceTracker
+under each configuration, from analysing every full-size frame to
+sampling a few downscaled frames per second:
+
+1. CPU: seconds of pool CPU (and of the camera thread, which samples and
+   downscales) per interview minute, with each pool's start-up cost
+   measured and reported separately.
+2. Overload: frames are offered in real time faster than one worker can
+   analyse them. The queue must stay bounded, with frames dropped instead
+   of analysis falling behind.
+
+    python benchmarks/bench_presence.py --minutes 1 --workers 1
+    python benchmarks/bench_presence.py --video interview.mp4
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CAMERA_FPS = 15
+# name, sample fps (None: every camera frame), width (None: full size)
+CONFIGS = [
+    ("every frame, full size", None, None),
+    ("2 fps, full size", 2, None),
+    ("2 fps, 320 px", 2, 320),
+    ("1 fps, 320 px", 1, 320),
+]
+
+
+def draw_face(cv2, np, width, height, cx, cy, scale, turned):
+    frame = np.empty((height, width, 3), np.uint8)
+    frame[:] = (70, 80, 90)
+    if cx is not None:
+        s = scale
+        cv2.ellipse(frame, (cx, cy + int(2.3 * s)), (int(2.2 * s), int(1.2 * s)), 0, 0, 360, (60, 60, 140), -1)
+        cv2.ellipse(frame, (cx, cy), (int(0.8 * s), int(1.05 * s)), 0, 0, 360, (150, 175, 210), -1)
+        cv2.ellipse(frame, (cx, cy - int(0.95 * s)), (int(0.85 * s), int(0.4 * s)), 0, 180, 360, (30, 40, 50), -1)
+        # A turned head shows one eye, shifted to the side
+        eyes = (1,) if turned else (-1, 1)
+        for side in eyes:
+            ex, ey = cx + side * int(0.33 * s) + (int(0.3 * s) if turned else 0), cy - int(0.15 * s)
+            cv2.ellipse(frame, (ex, ey - int(0.17 * s)), (int(0.2 * s), int(0.05 * s)), 0, 180, 360, (40, 50, 60), -1)
+            cv2.ellipse(frame, (ex, ey), (int(0.16 * s), int(0.08 * s)), 0, 0, 360, (240, 240, 240), -1)
+            cv2.circle(frame, (ex, ey), int(0.07 * s), (30, 30, 30), -1)
+        cv2.ellipse(frame, (cx, cy + int(0.5 * s)), (int(0.28 * s), int(0.1 * s)), 0, 0, 360, (80, 80, 160), -1)
+    frame = cv2.GaussianBlur(frame, (7, 7), 0)
+    noise = np.random.default_rng(cx or 0).integers(0, 8, frame.shape, dtype=np.uint8)
+    return cv2.add(frame, noise)
+
+
+def synthetic_frames(count, width=1280, height=720):
+    """`count` distinct frames of a candidate who mostly faces the camera."""
+    import math
+    import cv2
+    import numpy as np
+
+    frames = []
+    for i in range(count):
+        phase = i / count
+        away = 0.8 <= phase < 0.85
+        turned = 0.6 <= phase < 0.7
+        cx = None if away else int(width / 2 + width * 0.08 * math.sin(2 * math.pi * phase * 3))
+        frames.append(draw_face(cv2, np, width, height, cx, int(height * 0.45), 150, turned))
+    return frames
+
+
+def video_frames(path, limit):
+    import cv2
+
+    capture = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < limit:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        frames.append(frame)
+    capture.release()
+    if not frames:
+        raise SystemExit(f"No frames could be read from {path}")
+    return frames
+
+
+def children_cpu():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def make_pool(workers):
+    from presence import _init_worker
+
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                               mp_context=multiprocessing.get_context("spawn"))
+
+
+def startup_cpu(workers):
+    """CPU a pool spends starting its workers and loading the detectors."""
+    before = children_cpu()
+    pool = make_pool(workers)
+    list(pool.map(abs, range(workers)))
+    pool.shutdown(wait=True)
+    return children_cpu() - before
+
+
+def simulate(frames, minutes, sample_fps, width, workers, batch):
+    """Feeds `minutes` of camera frames as fast as the pool keeps up; returns the CPU used and the summary."""
+    from presence import PresenceTracker
+
+    pool = make_pool(workers)
+    tracker = PresenceTracker(sample_fps=sample_fps or CAMERA_FPS, width=width or frames[0].shape[1],
+                              batch=batch, queue_frames=4 * batch, max_pending=10 ** 6, pool=pool)
+    before = children_cpu()
+    camera_cpu = 0.0
+    started = time.perf_counter()
+    total = int(minutes * 60 * CAMERA_FPS)
+    for i in range(total):
+        tracker.set_question(i * 5 // total)
+        thread_started = time.thread_time()
+        tracker.offer(frames[i % len(frames)], now=i / CAMERA_FPS)
+        camera_cpu += time.thread_time() - thread_started
+        # Never let the queue overflow here: this run measures cost, not dropping
+        while tracker.stats()["queued"] >= 3 * batch:
+            time.sleep(0.001)
+    tracker.drain(timeout=600)
+    elapsed = time.perf_counter() - started
+    pool.shutdown(wait=True)
+    return children_cpu() - before, camera_cpu, elapsed, tracker
+
+
+def overload(frames, seconds, sample_fps, batch):
+    """Offers full-size frames in real time to one worker; returns the tracker and its peak queue."""
+    from presence import PresenceTracker
+
+    pool = make_pool(1)
+    list(pool.map(abs, range(1)))
+    tracker = PresenceTracker(sample_fps=sample_fps, width=frames[0].shape[1], batch=batch,
+                              queue_frames=4 * batch, pool=pool)
+    peak = 0
+    interval = 1.0 / sample_fps
+    next_at = time.monotonic()
+    end = next_at + seconds
+    i = 0
+    while time.monotonic() < end:
+        tracker.offer(frames[i % len(frames)])
+        peak = max(peak, tracker.stats()["queued"])
+        i += 1
+        next_at += interval
+        time.sleep(max(0.0, next_at - time.monotonic()))
+    tracker.close()
+    drain_started = time.monotonic()
+    tracker.drain(timeout=60)
+    drain = time.monotonic() - drain_started
+    pool.shutdown(wait=True)
+    return tracker, peak, drain
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=1.0, help="simulated interview length")
+    parser.add_argument("--workers", type=int, default=1, help="pool processes")
+    parser.add_argument("--batch", type=int, default=8, help="frames per batch")
+    parser.add_argument("--video", help="recorded video to take frames from (default: drawn frames)")
+    parser.add_argument("--distinct", type=int, default=120, help="distinct frames to cycle through")
+    parser.add_argument("--overload-seconds", type=float, default=5.0, help="length of the real-time overload run")
+    parser.add_argument("--overload-fps", type=float, default=30.0, help="sample rate of the overload run")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    frames = video_frames(args.video, args.distinct) if args.video else synthetic_frames(args.distinct)
+    height, width = frames[0].shape[:2]
+    print(f"{len(frames)} distinct {width}x{height} frames from {args.video or 'drawings'}, "
+          f"camera at {CAMERA_FPS} fps, {args.minutes:g} min interview, {args.workers} worker(s)")
+    startup = startup_cpu(args.workers)
+    print(f"pool start-up: {startup:.2f} CPU s (once per process)\n")
+
+    print(f"{'configuration':<24}{'frames':>8}{'pool CPU/min':>14}{'camera CPU/min':>16}{'core share':>12}"
+          f"{'face found':>12}")
+    for name, sample_fps, size in CONFIGS:
+        pool_cpu, camera_cpu, elapsed, tracker = simulate(frames, args.minutes, sample_fps, size,
+                                                          args.workers, args.batch)
+        pool_cpu = max(0.0, pool_cpu - startup)
+        summary = tracker.summary()
+        per_minute = pool_cpu / args.minutes
+        camera_per_minute = camera_cpu / args.minutes
+        print(f"{name:<24}{summary['overall']['frames']:>8}{per_minute:>13.2f}s{camera_per_minute:>15.2f}s"
+              f"{(per_minute + camera_per_minute) / 60:>12.1%}{summary['overall']['facePresent'] or 0:>12.0%}")
+
+    tracker, peak, drain = overload(frames, args.overload_seconds, args.overload_fps, args.batch)
+    stats = tracker.stats()
+    limit = 4 * args.batch
+    print(f"\noverload: {stats['sampled']} full-size frames offered at {args.overload_fps:g} fps to 1 worker, "
+          f"{stats['analyzed']} analyzed, {stats['dropped']} dropped; queue peaked at {peak}/{limit}, "
+          f"drained {drain:.2f}s after the camera stopped")
+    if peak > limit:
+        print("FAILED: the queue grew past its bound")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
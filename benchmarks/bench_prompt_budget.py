@@ -0,0 +1,121 @@
+# bench_prompt_budget.py
+"""
+Prompt tokens with and without compaction (prompt_budget.py) for the
+question and feedback prompts, on a corpus of job postings and answers.
+
+job_postings.json holds postings laid out like real ones (company pitch,
+responsibilities, requirements, benefits and legal boilerplate, in bulleted,
+numbered and prose form) and long transcribed answers. For each posting the
+report shows the posting and profile sizes, how many of the posting's
+listed skills survive compaction, the question prompt before and after, and
+the compaction time.
+
+Latency is estimated from prompt size with a linear model (fixed cost plus
+a cost per 1k input tokens); pass --live to measure real Gemini calls
+instead (needs GOOGLE_API_KEY):
+
+    python benchmarks/bench_prompt_budget.py
+    python benchmarks/bench_prompt_budget.py --live --repeats 3
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "job_postings.json")
+
+
+def build_prompts(backend, posting, answers, compact):
+    import prompt_budget
+    prompt_budget.PROMPT_COMPACTION = compact
+    question = backend.build_questions_prompt(
+        posting["company"], posting["role"], posting["jobDescription"], posting["skills"]
+    )
+    feedback = [backend.build_feedback_prompt(a["question"], a["answer"], posting["role"], posting["skills"])
+                for a in answers]
+    return question, feedback
+
+
+def skill_coverage(posting, profile):
+    """Listed skills mentioned in the posting that the profile still mentions."""
+    skills = [s.strip() for s in posting["skills"].split(",") if s.strip()]
+    mentioned = [s for s in skills if re.search(re.escape(s), posting["jobDescription"], re.IGNORECASE)]
+    kept = [s for s in mentioned if re.search(re.escape(s), profile, re.IGNORECASE)]
+    return len(kept), len(mentioned)
+
+
+def live_latency(model, prompt, repeats):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        model.generate_content(prompt)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-latency", type=float, default=0.4, help="estimated fixed model latency (s)")
+    parser.add_argument("--per-1k-tokens", type=float, default=0.12, help="estimated latency per 1k prompt tokens (s)")
+    parser.add_argument("--live", action="store_true", help="time real model calls instead of estimating")
+    parser.add_argument("--repeats", type=int, default=3, help="calls per prompt with --live")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    os.environ.setdefault("SESSION_STORE", "memory")
+    with open(CORPUS, encoding="utf-8") as f:
+        corpus = json.load(f)
+    from load_test import load_backend
+    from prompt_budget import count_tokens, compact_job_description
+
+    backend = load_backend()
+    latency = (lambda prompt: live_latency(backend.model, prompt, args.repeats)) if args.live else \
+        (lambda prompt: args.base_latency + args.per_1k_tokens * count_tokens(prompt) / 1000)
+
+    print(f"{'posting':<26}{'posting':>9}{'profile':>9}{'skills':>8}{'q prompt':>10}{'compact':>9}"
+          f"{'saved':>7}{'latency':>9}{'compact':>9}{'ms':>7}")
+    totals = {"raw": 0, "compact": 0, "raw_latency": 0.0, "compact_latency": 0.0}
+    for posting in corpus["postings"]:
+        started = time.perf_counter()
+        profile = compact_job_description(posting["jobDescription"], posting["role"], posting["skills"])
+        compact_ms = (time.perf_counter() - started) * 1000
+        kept, mentioned = skill_coverage(posting, profile)
+
+        raw_prompt, _ = build_prompts(backend, posting, [], False)
+        compact_prompt, _ = build_prompts(backend, posting, [], True)
+        raw, compact = count_tokens(raw_prompt), count_tokens(compact_prompt)
+        raw_latency, compact_latency = latency(raw_prompt), latency(compact_prompt)
+        totals["raw"] += raw
+        totals["compact"] += compact
+        totals["raw_latency"] += raw_latency
+        totals["compact_latency"] += compact_latency
+        print(f"{posting['name']:<26}{count_tokens(posting['jobDescription']):>9}{count_tokens(profile):>9}"
+              f"{kept:>5}/{mentioned:<2}{raw:>10}{compact:>9}{1 - compact / raw:>7.0%}"
+              f"{raw_latency:>8.2f}s{compact_latency:>8.2f}s{compact_ms:>7.1f}")
+
+    print(f"\n{'answer':<26}{'answer':>9}{'f prompt':>10}{'compact':>9}{'saved':>7}{'latency':>9}{'compact':>9}")
+    posting = corpus["postings"][0]
+    for answer in corpus["answers"]:
+        (_, [raw_prompt]), (_, [compact_prompt]) = (build_prompts(backend, posting, [answer], flag) for flag in (False, True))
+        raw, compact = count_tokens(raw_prompt), count_tokens(compact_prompt)
+        print(f"{answer['name']:<26}{count_tokens(answer['answer']):>9}{raw:>10}{compact:>9}{1 - compact / raw:>7.0%}"
+              f"{latency(raw_prompt):>8.2f}s{latency(compact_prompt):>8.2f}s")
+
+    print(f"\nQuestion prompts: {totals['raw']} -> {totals['compact']} tokens "
+          f"({1 - totals['compact'] / totals['raw']:.0%} saved), latency "
+          f"{totals['raw_latency']:.2f}s -> {totals['compact_latency']:.2f}s"
+          f"{' (measured)' if args.live else ' (estimated)'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+# bench_question_bank.py
+"""
+Hit rate and retrieval latency of the question bank (question_bank.py).
+
+A stream of question requests is replayed against the bank the way
+/api/questions uses it: look up questions for the request's role and
+skills, let a fake model write only what is missing, and store its output.
+Requests draw from a set of base roles with a skewed popularity, each asked
+in variants ("Senior Backend Engineer" for "Backend Engineer", skills
+reordered, dropped or added), plus a share of roles the bank has never
+seen. The fake model rewords some of its questions slightly, as a real one
+does, which the bank should catch as duplicates.
+
+Reported: model calls and questions generated with the bank against an
+exact-match cache keyed on the normalized profile, how often a served
+question was written for the same base role (relevance), duplicates
+dropped, and find() latency as the bank grows:
+
+    python benchmarks/bench_question_bank.py --requests 1000 --count 5
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ROLES = {
+    "Backend Engineer": ["Python", "SQL", "AWS", "Docker", "REST APIs"],
+    "Frontend Developer": ["React", "TypeScript", "CSS", "Accessibility", "Webpack"],
+    "Data Scientist": ["Python", "Statistics", "Machine Learning", "SQL", "Pandas"],
+    "DevOps Engineer": ["Kubernetes", "Terraform", "AWS", "CI/CD", "Linux"],
+    "Product Manager": ["Roadmapping", "User Research", "Analytics", "Stakeholder Management", "Prioritization"],
+    "Mobile Developer": ["Swift", "Kotlin", "React Native", "App Store", "Offline Sync"],
+    "Data Engineer": ["Spark", "Airflow", "SQL", "Kafka", "Data Modeling"],
+    "Security Engineer": ["Threat Modeling", "Penetration Testing", "IAM", "Cryptography", "Incident Response"],
+    "QA Engineer": ["Test Automation", "Selenium", "API Testing", "Performance Testing", "Python"],
+    "UX Designer": ["Figma", "Prototyping", "User Research", "Design Systems", "Usability Testing"],
+}
+SENIORITY = ["", "Senior ", "Junior ", "Lead ", "Staff "]
+TEMPLATES = [
+    "How have you used {skill} in a {role} project, and what would you do differently?",
+    "Walk me through a hard problem you solved with {skill}.",
+    "What trade-offs do you weigh when choosing {skill} for a {role} task?",
+    "How do you keep your {skill} knowledge current as a {role}?",
+    "Describe a time {skill} failed you in production. What did you change?",
+    "How would you explain {skill} to a new teammate joining as a {role}?",
+    "What metrics tell you that your {skill} work is succeeding?",
+    "Tell me about a disagreement over {skill} and how it was resolved.",
+]
+REWORDINGS = [("How have you used", "How did you use"), ("Walk me through", "Talk me through"),
+              ("What trade-offs do you weigh", "Which trade-offs do you weigh"), ("Tell me about", "Tell me about")]
+
+
+def make_request(rng, popularity, unseen_rate):
+    """Returns (base role, role, skills) for one simulated candidate."""
+    if rng.random() < unseen_rate:
+        # A role the bank has not seen, with made-up skills
+        n = rng.randrange(10 ** 6)
+        return None, f"Specialist {n}", f"Tool{n}, Method{n}, Domain{n}"
+    base = rng.choices(list(ROLES), weights=popularity)[0]
+    skills = list(ROLES[base])
+    rng.shuffle(skills)
+    skills = skills[:rng.randint(3, len(skills))]
+    if rng.random() < 0.3:
+        skills.append(rng.choice(["Git", "Agile", "Communication", "Mentoring"]))
+    return base, rng.choice(SENIORITY) + base, ", ".join(skills)
+
+
+class FakeModel:
+    """Writes role-specific questions, occasionally rewording one it wrote before."""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.calls = 0
+        self.generated = 0
+        self.origin = {}
+        self._written = {}
+
+    def generate(self, base, role, skills, count, asked):
+        self.calls += 1
+        skills = [skill.strip() for skill in skills.split(",")]
+        written = self._written.setdefault(base or role, [])
+        questions = []
+        for _ in range(count * 20):
+            if len(questions) >= count:
+                break
+            if written and self.rng.random() < 0.2:
+                # A slight rewording of an earlier question
+                old, new = self.rng.choice(REWORDINGS)
+                question = self.rng.choice(written).replace(old, new).replace("?", " ?")
+            else:
+                question = self.rng.choice(TEMPLATES).format(skill=self.rng.choice(skills), role=base or role)
+            if question not in asked and question not in questions:
+                questions.append(question)
+        for question in questions:
+            # Questions that do not name the role can be written for several
+            self.origin.setdefault(question, set()).add(base)
+            written.append(question)
+        self.generated += len(questions)
+        return questions
+
+
+def replay(requests, count, bank=None, seed=0):
+    """Serves each request from `bank` (or an exact-match cache) and the fake model."""
+    from question_bank import profile_key
+
+    model = FakeModel(random.Random(seed))
+    cache = {}
+    served = relevant = from_store = 0
+    for base, role, skills in requests:
+        if bank is None:
+            questions = cache.get(profile_key(role, skills), [])[:count]
+        else:
+            questions = bank.find(role, skills, count)
+        from_store += len(questions)
+        served += len(questions)
+        relevant += sum(1 for question in questions if base in model.origin.get(question, {base}))
+        if len(questions) < count:
+            generated = model.generate(base, role, skills, count - len(questions), questions)
+            if bank is None:
+                cache[profile_key(role, skills)] = questions + generated
+            else:
+                bank.add(role, skills, generated)
+    return {"calls": model.calls, "generated": model.generated, "from_store": from_store,
+            "relevance": relevant / served if served else 1.0}
+
+
+def find_latency(bank, rng, lookups):
+    timings = []
+    for _ in range(lookups):
+        _, role, skills = make_request(rng, [1] * len(ROLES), 0.1)
+        started = time.perf_counter()
+        bank.find(role, skills, 5)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95)]
+
+
+def fill(bank, rng, target):
+    """Adds synthetic profiles with unique questions until the bank holds `target` questions."""
+    n = 0
+    while bank.stats()["size"] < target:
+        n += 1
+        base = rng.choice(list(ROLES))
+        questions = [f"Question {n}.{i} about {rng.choice(ROLES[base])} number {rng.randrange(10 ** 9)}"
+                     for i in range(10)]
+        bank.add(f"{base} {n % 97}", ", ".join(ROLES[base]), questions)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000, help="simulated question requests")
+    parser.add_argument("--count", type=int, default=5, help="questions per request")
+    parser.add_argument("--unseen", type=float, default=0.1, help="share of requests for roles never seen before")
+    parser.add_argument("--min-similarity", type=float, default=None, help="override QUESTION_BANK_MIN_SIMILARITY")
+    parser.add_argument("--model-latency", type=float, default=2.0, help="assumed model latency per call (s)")
+    parser.add_argument("--sizes", default="1000,5000", help="bank sizes for the latency measurement")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    from question_bank import QuestionBank, QUESTION_BANK_MIN_SIMILARITY
+
+    rng = random.Random(args.seed)
+    popularity = [1 / (rank + 1) for rank in range(len(ROLES))]
+    requests = [make_request(rng, popularity, args.unseen) for _ in range(args.requests)]
+    min_similarity = QUESTION_BANK_MIN_SIMILARITY if args.min_similarity is None else args.min_similarity
+
+    exact = replay(requests, args.count, seed=args.seed)
+    bank = QuestionBank(db_path="", min_similarity=min_similarity)
+    banked = replay(requests, args.count, bank, seed=args.seed)
+    stats = bank.stats()
+
+    print(f"{args.requests} requests for {args.count} questions, {args.unseen:.0%} for unseen roles, "
+          f"min similarity {min_similarity}")
+    print(f"{'':<20}{'model calls':>12}{'generated':>11}{'from store':>12}{'relevance':>11}{'model time':>12}")
+    for name, result in (("exact-match cache", exact), ("question bank", banked)):
+        print(f"{name:<20}{result['calls']:>12}{result['generated']:>11}{result['from_store']:>12}"
+              f"{result['relevance']:>11.1%}{result['calls'] * args.model_latency:>11.0f}s")
+    print(f"bank: {stats['hits']} full hits, {stats['partial_hits']} partial, {stats['misses']} misses; "
+          f"{stats['size']} questions in {stats['profiles']} profiles, {stats['duplicates']} duplicates dropped")
+
+    print(f"\n{'bank size':>10}{'find p50':>11}{'find p95':>11}")
+    for size in (int(size) for size in args.sizes.split(",")):
+        bank = QuestionBank(db_path="", max_questions=size * 2)
+        fill(bank, random.Random(args.seed), size)
+        bank.find("warm up", "index", 1)
+        p50, p95 = find_latency(bank, random.Random(args.seed), 200)
+        print(f"{bank.stats()['size']:>10}{p50:>9.2f}ms{p95:>9.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
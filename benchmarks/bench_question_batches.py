@@ -0,0 +1,129 @@
+# bench_question_batches.py
+"""
+Generating all of an interview's questions up front versus in batches as the
+candidate progresses: time to first question, time spent waiting for later
+questions, and questions generated but never asked when candidates quit
+early.
+
+The fake model's latency grows with the number of questions requested, like
+output tokens do:
+
+    python benchmarks/bench_question_batches.py --count 8 --candidates 10 --per-question 0.4
+
+Each candidate answers a random number of questions (some finish, some quit)
+and takes --answer-time seconds per answer, during which the next batch is
+generated in the background.
+"""
+
+import argparse
+import importlib
+import json
+import logging
+import os
+import random
+import re
+import statistics
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+class SizedModel:
+    """Answers question prompts with JSON after `base + per_question * n` seconds."""
+
+    def __init__(self, base, per_question):
+        self.base = base
+        self.per_question = per_question
+        self.generated = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, **kwargs):
+        match = re.search(r"generate only (\d+)|Generate (\d+)", prompt)
+        count = int(match.group(1) or match.group(2)) if match else 1
+        time.sleep(self.base + self.per_question * count)
+        with self._lock:
+            start = self.generated
+            self.generated += count
+
+        class Response:
+            text = json.dumps({"questions": [f"Generated interview question number {start + i}?" for i in range(count)]})
+        return Response()
+
+
+def run_mode(batch_size, args, plans):
+    os.environ["QUESTION_BATCH_SIZE"] = str(batch_size)
+    import question_plan
+    importlib.reload(question_plan)
+    from load_test import load_backend
+
+    backend = load_backend()
+    logging.getLogger().setLevel(logging.WARNING)
+    backend.model = SizedModel(args.base_latency, args.per_question)
+    client = backend.app.test_client()
+
+    first, stalls, asked = [], [], 0
+    for candidate, answered in enumerate(plans):
+        started = time.perf_counter()
+        payload = client.post("/api/questions", json={
+            "company": "Company", "role": "Engineer", "jobDescription": f"Posting {candidate}",
+            "skills": "Python", "questionCount": args.count, "fresh": True,
+        }).get_json()
+        first.append(time.perf_counter() - started)
+        session_id, questions = payload["sessionId"], payload["questions"]
+
+        for index in range(answered):
+            if index >= len(questions):
+                started = time.perf_counter()
+                questions = client.post(f"/api/sessions/{session_id}/questions", json={"needed": index + 1}).get_json()["questions"]
+                stalls.append(time.perf_counter() - started)
+            asked += 1
+            time.sleep(args.answer_time)
+            client.patch(f"/api/sessions/{session_id}", json={"currentQuestionIndex": index + 1})
+
+    # Let batches started for candidates who then quit finish, so they are counted
+    backend.question_executor.shutdown(wait=True)
+    return {
+        "first_p50": statistics.median(first),
+        "stall_total": sum(stalls),
+        "stall_max": max(stalls, default=0.0),
+        "generated": backend.model.generated,
+        "asked": asked,
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=8, help="questions per interview")
+    parser.add_argument("--batch", type=int, default=2, help="batch size for the lazy mode")
+    parser.add_argument("--candidates", type=int, default=10)
+    parser.add_argument("--quit-rate", type=float, default=0.4, help="fraction of candidates who stop early")
+    parser.add_argument("--base-latency", type=float, default=0.5, help="fixed model latency per call (s)")
+    parser.add_argument("--per-question", type=float, default=0.4, help="model latency per question requested (s)")
+    parser.add_argument("--answer-time", type=float, default=1.5, help="seconds a candidate spends per answer")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    os.environ.setdefault("SESSION_STORE", "memory")
+    os.environ.setdefault("QUESTIONS_REPAIR", "0")
+    rng = random.Random(args.seed)
+    plans = [rng.randint(1, args.count - 1) if rng.random() < args.quit_rate else args.count
+             for _ in range(args.candidates)]
+
+    print(f"{args.candidates} candidates, {args.count} questions each, "
+          f"{sum(p < args.count for p in plans)} quit early; {sum(plans)} questions asked")
+    print(f"{'mode':<14}{'first q p50':>13}{'waiting':>10}{'max wait':>10}{'generated':>11}{'unused':>8}")
+    for label, batch in (("up front", args.count), (f"batches of {args.batch}", args.batch)):
+        stats = run_mode(batch, args, plans)
+        print(f"{label:<14}{stats['first_p50']:>12.2f}s{stats['stall_total']:>9.2f}s{stats['stall_max']:>9.2f}s"
+              f"{stats['generated']:>11}{stats['generated'] - stats['asked']:>8}")
+
+
+if __name__ == "__main__":
+    main()
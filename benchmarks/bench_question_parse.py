@@ -0,0 +1,147 @@
+# bench_question_parse.py
+"""
+Parsing speed and accuracy for model question replies: the previous
+two-pass line parser versus question_parser.extract_questions.
+
+The corpus (question_outputs.json) holds reply shapes seen from real models:
+numbered and bulleted lists, Markdown emphasis and headings, category
+labels, wrapped lines, JSON (plain, fenced, truncated) and refusals, each
+with the questions a reader would take from it. A fuzz pass then mutates
+every case (line endings, preambles, list markers, labels, truncation) and
+checks the parser never fails and recovers the expected questions.
+
+    python benchmarks/bench_question_parse.py --iterations 2000 --fuzz 500
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "question_outputs.json")
+COUNT = 5
+
+
+def legacy_parse(response_text):
+    """The line parser backend/app.py used before question_parser, without default padding."""
+    questions = []
+    lines = response_text.split('\n')
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if (line[0].isdigit() and '. ' in line[:5]) or line.startswith('- '):
+            if line[0].isdigit() and '. ' in line[:5]:
+                question = line.split('. ', 1)[1]
+            else:
+                question = line[2:]
+            questions.append(question)
+    if len(questions) < COUNT:
+        questions = []
+        for line in lines:
+            line = line.strip()
+            if line and len(line) > 10:
+                if line[0].isdigit() and '. ' in line[:5]:
+                    line = line.split('. ', 1)[1]
+                questions.append(line)
+    return questions[:COUNT]
+
+
+def new_parse(response_text):
+    from question_parser import extract_questions
+    return extract_questions(response_text, COUNT)[0]
+
+
+PREAMBLES = ["", "Here are the questions:\n\n", "Sure! Based on the job description:\n", "## Questions\n\n"]
+MARKERS = ["{i}. ", "{i}) ", "**{i}.** ", "Q{i}: ", "Question {i}: ", "- ", "* ", "### {i}. "]
+LABELS = ["", "**Behavioral:** ", "**Technical:** ", "Situational: "]
+
+
+def mutate(case, rng):
+    """A random re-rendering of a case's expected questions, or a damaged copy of its output."""
+    expected = case["expected"][:COUNT]
+    if not expected or rng.random() < 0.2:
+        # Damage the original: CRLF, stray indentation, trailing junk
+        output = case["output"]
+        if rng.random() < 0.5:
+            output = output.replace("\n", "\r\n")
+        if rng.random() < 0.5:
+            output = "\n".join("  " + line for line in output.split("\n"))
+        return output + rng.choice(["", "\n", "\n\nLet me know if you need more!"]), expected
+
+    marker = rng.choice(MARKERS)
+    separator = rng.choice(["\n", "\n\n"])
+    lines = [marker.format(i=i) + rng.choice(LABELS) + q for i, q in enumerate(expected, 1)]
+    output = rng.choice(PREAMBLES) + separator.join(lines) + rng.choice(["", "\n\nGood luck!"])
+    if rng.random() < 0.15:
+        # Cut off mid-reply, as with a max-token limit
+        keep = rng.randint(1, len(expected) - 1) if len(expected) > 1 else 1
+        output = separator.join(lines[:keep])
+        expected = expected[:keep]
+    return output, expected
+
+
+def score(parse, cases):
+    exact = recovered = wanted = errors = 0
+    for output, expected in cases:
+        try:
+            got = parse(output)
+        except Exception:
+            errors += 1
+            continue
+        exact += got == expected
+        recovered += len(set(got) & set(expected))
+        wanted += len(expected)
+    return {"exact": exact, "recall": recovered / wanted if wanted else 1.0, "errors": errors}
+
+
+def timing(parse, outputs, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for output in outputs:
+            parse(output)
+    return (time.perf_counter() - started) / (iterations * len(outputs)) * 1e6
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000, help="passes over the corpus for timing")
+    parser.add_argument("--fuzz", type=int, default=500, help="mutated replies per corpus case")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--show-failures", action="store_true", help="print corpus cases the new parser misses")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    with open(CORPUS, encoding="utf-8") as f:
+        corpus = json.load(f)
+    cases = [(case["output"], case["expected"][:COUNT]) for case in corpus]
+    rng = random.Random(args.seed)
+    fuzzed = [mutate(case, rng) for case in corpus for _ in range(args.fuzz)]
+    outputs = [output for output, _ in cases]
+
+    print(f"{len(cases)} corpus replies, {len(fuzzed)} fuzzed")
+    print(f"{'parser':<10}{'corpus exact':>14}{'recall':>9}{'fuzz exact':>13}{'recall':>9}{'errors':>8}{'us/reply':>10}")
+    for label, parse in (("legacy", legacy_parse), ("new", new_parse)):
+        base = score(parse, cases)
+        fuzz = score(parse, fuzzed)
+        micros = timing(parse, outputs, args.iterations)
+        print(f"{label:<10}{base['exact']:>9}/{len(cases):<4}{base['recall']:>9.1%}"
+              f"{fuzz['exact'] / len(fuzzed):>13.1%}{fuzz['recall']:>9.1%}"
+              f"{base['errors'] + fuzz['errors']:>8}{micros:>10.1f}")
+
+    if args.show_failures:
+        for case in corpus:
+            got = new_parse(case["output"])
+            if got != case["expected"][:COUNT]:
+                print(f"\n{case['name']}:\n  got      {got}\n  expected {case['expected'][:COUNT]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# bench_singleflight.py
+"""
+Concurrency check for coalescing identical in-flight model calls
+(LLM_SINGLE_FLIGHT). Bursts of simultaneous requests are sent to the Flask
+app (in-process, one thread per request) backed by a slow fake model, with
+coalescing on and off:
+
+- identical /api/feedback requests (a double click, a StrictMode re-run)
+- identical /api/questions requests
+- /api/feedback requests with different answers, which must not be merged
+- identical requests while the model fails, which must all get the fallback
+
+With coalescing on, each burst of identical requests should reach the
+model once and every caller should get the same response. Exits non-zero
+if it does not, so it can gate changes to llm_client.py:
+
+    python benchmarks/bench_singleflight.py --burst 20 --latency 1.0
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def counting_backend(latency, fail=False):
+    from llm_client import FakeBackend
+
+    class CountingBackend(FakeBackend):
+        def __init__(self):
+            super().__init__(latency=latency)
+            self.calls = 0
+            self._count_lock = threading.Lock()
+
+        def generate(self, prompt, stream=False, timeout=None, **kwargs):
+            with self._count_lock:
+                self.calls += 1
+            if fail:
+                time.sleep(self.latency)
+                raise ValueError("Fake model rejected the request")
+            return super().generate(prompt, stream=stream, timeout=timeout or 30, **kwargs)
+
+    return CountingBackend()
+
+
+def burst(app, requests):
+    """Sends (path, body) requests at the same moment; returns the JSON responses and wall time."""
+    results = [None] * len(requests)
+    barrier = threading.Barrier(len(requests))
+
+    def send(index, path, body):
+        client = app.test_client()
+        barrier.wait()
+        results[index] = client.post(path, json=body).get_json()
+
+    threads = [threading.Thread(target=send, args=(i, path, body)) for i, (path, body) in enumerate(requests)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - started
+
+
+def scenarios(size):
+    feedback = {"question": "Describe a challenging project.", "answer": "I migrated our billing system.",
+                "role": "Engineer", "skills": "Python"}
+    questions = {"company": "Acme", "role": "Engineer", "jobDescription": "Build APIs.", "skills": "Python",
+                 "fresh": True, "questionCount": 2}
+    return [
+        # name, requests, model fails, expected model calls when coalescing
+        ("identical feedback", [("/api/feedback", feedback)] * size, False, 1),
+        ("identical questions", [("/api/questions", questions)] * size, False, 1),
+        ("distinct feedback", [("/api/feedback", {**feedback, "answer": f"Answer number {i}."}) for i in range(size)],
+         False, size),
+        ("identical, model down", [("/api/feedback", feedback)] * size, True, 1),
+    ]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--burst", type=int, default=20, help="simultaneous requests per scenario")
+    parser.add_argument("--latency", type=float, default=1.0, help="fake model latency (s)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    os.environ.setdefault("SESSION_STORE", "memory")
+    from load_test import load_backend
+    from llm_client import LLMClient
+
+    backend = load_backend()
+    failures = []
+    print(f"{'scenario':<24}{'coalescing':>11}{'model calls':>13}{'coalesced':>11}{'wall':>8}{'same result':>13}")
+    for name, requests, fail, expected in scenarios(args.burst):
+        for single_flight in (False, True):
+            fake = counting_backend(args.latency, fail)
+            backend.model = LLMClient(lambda: fake, max_retries=0,
+                                      breaker_threshold=args.burst * 2, single_flight=single_flight)
+            backend.get_question_cache().clear()
+            results, wall = burst(backend.app, requests)
+            key = "questions" if requests[0][0] == "/api/questions" else "feedback"
+            distinct = len({str(result.get(key)) for result in results})
+            same = distinct == 1
+            coalesced = backend.model.stats().get("coalesced", 0)
+            print(f"{name:<24}{'on' if single_flight else 'off':>11}{fake.calls:>13}{coalesced:>11}"
+                  f"{wall:>7.2f}s{'yes' if same else f'{distinct} kinds':>13}")
+            if single_flight:
+                identical = expected == 1
+                if fake.calls != expected or (identical and not same) or all("warning" in r for r in results) != fail:
+                    failures.append(name)
+
+    if failures:
+        print(f"\nFAILED: {', '.join(failures)}")
+        sys.exit(1)
+    print("\nOK: identical concurrent requests made one model call each burst")
+
+
+if __name__ == "__main__":
+    main()
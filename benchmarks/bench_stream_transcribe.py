@@ -0,0 +1,148 @@
+# bench_stream_transcribe.py
+"""
+Measures "stop-to-transcript" latency: the time from the candidate pressing
+stop to the transcript being available, for
+
+    upload     - the whole recording posted to /api/transcribe after stop
+    stream     - timesliced chunks posted to /api/transcribe/stream during
+                 recording, one segment, collected with .../finish
+    segmented  - as stream, but a new segment starts every --segment-seconds
+                 so earlier audio is transcribed while the candidate talks
+
+The stub provider charges a fixed processing time plus a per-MB cost and
+throttles uploads, so the overlap the incremental paths buy is visible:
+
+    python benchmarks/bench_stream_transcribe.py --answer-seconds 60 --runs 3
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import requests
+
+from stubs import StubAssemblyAI
+from load_test import load_backend, start_dev_server
+
+MODES = ("upload", "stream", "segmented")
+
+
+def record(args, on_chunk):
+    """Simulates a recording, handing each timeslice to `on_chunk(data, segment)`."""
+    chunk = os.urandom(int(args.bitrate_kbps * 1000 / 8 * args.timeslice))
+    slices = int(args.answer_seconds / args.timeslice)
+    per_segment = max(1, int(args.segment_seconds / args.timeslice))
+    for i in range(slices):
+        time.sleep(args.timeslice * args.time_scale)
+        on_chunk(chunk, i // per_segment)
+    return chunk * slices
+
+
+def run_upload(base_url, args):
+    audio = record(args, lambda data, segment: None)
+    stopped = time.perf_counter()
+    response = requests.post(
+        f"{base_url}/api/transcribe",
+        files={"audio": ("recording.webm", audio, "audio/webm")},
+        timeout=300,
+    )
+    response.raise_for_status()
+    return time.perf_counter() - stopped
+
+
+def run_stream(base_url, args, segmented):
+    session = requests.Session()
+    stream_id = session.post(f"{base_url}/api/transcribe/stream").json()["streamId"]
+    pending = []
+
+    def send(data, segment):
+        # Chunks go out in the background in order, like the browser's promise chain
+        previous = pending[-1] if pending else None
+
+        def post():
+            if previous is not None:
+                previous.join()
+            session.post(
+                f"{base_url}/api/transcribe/stream/{stream_id}/chunk",
+                params={"segment": segment if segmented else 0},
+                data=data,
+            ).raise_for_status()
+
+        thread = threading.Thread(target=post)
+        thread.start()
+        pending.append(thread)
+
+    record(args, send)
+    stopped = time.perf_counter()
+    if pending:
+        pending[-1].join()
+    response = session.post(f"{base_url}/api/transcribe/stream/{stream_id}/finish", timeout=300)
+    response.raise_for_status()
+    return time.perf_counter() - stopped
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=MODES, action="append", help="modes to run (default: all)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--answer-seconds", type=float, default=60.0, help="length of each recorded answer")
+    parser.add_argument("--bitrate-kbps", type=float, default=32.0, help="audio bitrate (Opus voice is ~32)")
+    parser.add_argument("--timeslice", type=float, default=1.0, help="seconds of audio per uploaded chunk")
+    parser.add_argument("--segment-seconds", type=float, default=15.0, help="segment length in segmented mode")
+    parser.add_argument("--time-scale", type=float, default=0.1,
+                        help="fraction of real time to spend recording (1 = real time)")
+    parser.add_argument("--processing-time", type=float, default=1.0, help="fixed provider time per file (s)")
+    parser.add_argument("--processing-per-mb", type=float, default=20.0, help="provider time per MB of audio (s)")
+    parser.add_argument("--upload-kbps", type=float, default=512.0, help="link to the provider, 0 = unlimited")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    modes = args.mode or list(MODES)
+
+    stub = StubAssemblyAI(
+        processing_time=args.processing_time,
+        processing_per_mb=args.processing_per_mb,
+        upload_bandwidth=int(args.upload_kbps * 1000 / 8),
+    ).start()
+    os.environ["ASSEMBLYAI_BASE_URL"] = stub.base_url
+    os.environ.setdefault("TRANSCRIBE_POLL_INITIAL_DELAY", "0.1")
+    os.environ.setdefault("TRANSCRIBE_POLL_MAX_DELAY", "0.25")
+    os.environ.setdefault("SESSION_STORE", "memory")
+    # The simulated recordings are random bytes, not decodable audio
+    os.environ.setdefault("AUDIO_PREPROCESS", "0")
+
+    backend = load_backend()
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    base_url, shutdown = start_dev_server(backend.app)
+
+    size_kb = args.answer_seconds * args.bitrate_kbps / 8
+    print(f"{args.answer_seconds:.0f}s answers ({size_kb:.0f} KB), provider {args.processing_time:.1f}s "
+          f"+ {args.processing_per_mb:.0f}s/MB, upload link {args.upload_kbps:.0f} kbps")
+    print(f"{'mode':<12}{'median':>10}{'min':>10}{'max':>10}")
+    try:
+        for mode in modes:
+            samples = []
+            for _ in range(args.runs):
+                if mode == "upload":
+                    samples.append(run_upload(base_url, args))
+                else:
+                    samples.append(run_stream(base_url, args, segmented=mode == "segmented"))
+            print(f"{mode:<12}{statistics.median(samples):>9.2f}s{min(samples):>9.2f}s{max(samples):>9.2f}s")
+    finally:
+        shutdown()
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
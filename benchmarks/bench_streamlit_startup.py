@@ -0,0 +1,178 @@
+# bench_streamlit_startup.py
+"""
+Cold start and rerun wall time of the Streamlit app.
+
+1. Startup imports: each script's top-level imports (what every process
+   pays before the first page renders) are timed in a fresh interpreter,
+   next to what they would cost if the imports deferred into functions
+   were eager too. Streamlit itself is timed separately.
+2. Runs: with Streamlit installed, app.py is driven by streamlit's AppTest
+   in a fresh process per scenario: the first run (cold, including
+   imports) and then --reruns reruns of the home page and of an interview.
+
+The model, camera and session store are replaced by the fake, synthetic
+and in-memory ones, so no keys or devices are needed. Use --max-startup-ms
+and --max-rerun-ms to turn a run into a regression gate (non-zero exit
+when exceeded), and --json to keep the report for comparison:
+
+    python benchmarks/bench_streamlit_startup.py --reruns 20
+    python benchmarks/bench_streamlit_startup.py --max-startup-ms 150 --max-rerun-ms 250
+"""
+
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPTS = {"app.py": os.path.join(ROOT, "app.py"),
+           "interview page": os.path.join(ROOT, "pages", "interview_page.py")}
+
+ENV = {"SESSION_STORE": "memory", "LLM_BACKEND": "fake", "FAKE_LLM_LATENCY": "0",
+       "CAMERA_SOURCE": "synthetic", "STREAMLIT_GLOBAL_SHOW_WARNING_ON_DIRECT_EXECUTION": "false"}
+
+INTERVIEW = {"page": "interview", "company": "Acme", "role": "Software Engineer",
+             "job_desc": "Build and operate Python APIs.", "skills": "Python, SQL", "question_count": 3}
+
+# name, script, session state before the first run
+SCENARIOS = {"home": ("app.py", {}), "interview": ("app.py", INTERVIEW)}
+
+
+def script_imports(path):
+    """(startup, deferred): top-level packages a script imports at module level and inside functions."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    startup, deferred = set(), set()
+    top_level = set(map(id, tree.body))
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and not node.level:
+            names = [node.module]
+        else:
+            continue
+        (startup if id(node) in top_level else deferred).update(name.split(".")[0] for name in names)
+    return startup - {"streamlit"}, deferred - startup - {"streamlit"}
+
+
+def child_env():
+    env = dict(os.environ)
+    for key, value in ENV.items():
+        env.setdefault(key, value)
+    return env
+
+
+def cold_import_ms(modules, repeats):
+    """Median time to import `modules` in a fresh interpreter."""
+    if not modules:
+        return 0.0
+    code = (f"import sys, time; sys.path.insert(0, {ROOT!r}); started = time.perf_counter(); "
+            f"import {', '.join(sorted(modules))}; print((time.perf_counter() - started) * 1000)")
+    timings = []
+    for _ in range(repeats):
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=child_env(), cwd=ROOT)
+        if result.returncode:
+            raise SystemExit(f"Importing {', '.join(sorted(modules))} failed:\n{result.stderr}")
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(timings)
+
+
+def run_scenario(name, reruns):
+    """Child process: drives one scenario with AppTest and prints its timings as JSON."""
+    from streamlit.testing.v1 import AppTest
+
+    script, state = SCENARIOS[name]
+    app = AppTest.from_file(SCRIPTS[script], default_timeout=60)
+    for key, value in state.items():
+        app.session_state[key] = value
+    started = time.perf_counter()
+    app.run()
+    first = (time.perf_counter() - started) * 1000
+    if app.exception:
+        raise SystemExit(f"{name}: {app.exception[0].message}")
+    timings = []
+    for _ in range(reruns):
+        started = time.perf_counter()
+        app.run()
+        timings.append((time.perf_counter() - started) * 1000)
+    print(json.dumps({"first": first, "reruns": timings}))
+
+
+def scenario_ms(name, reruns):
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", name, "--reruns", str(reruns)],
+                            capture_output=True, text=True, env=child_env(), cwd=ROOT)
+    if result.returncode:
+        raise SystemExit(f"Scenario {name} failed:\n{result.stdout}{result.stderr}")
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    timings = sorted(report["reruns"])
+    return {"first": report["first"], "p50": statistics.median(timings),
+            "p95": timings[min(len(timings) - 1, int(len(timings) * 0.95))]}
+
+
+def streamlit_installed():
+    return subprocess.run([sys.executable, "-c", "import streamlit"], capture_output=True).returncode == 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=5, help="fresh interpreters per import measurement")
+    parser.add_argument("--reruns", type=int, default=20, help="reruns timed per scenario")
+    parser.add_argument("--max-startup-ms", type=float, default=None,
+                        help="fail if app.py's startup imports take longer")
+    parser.add_argument("--max-rerun-ms", type=float, default=None, help="fail if any scenario's p95 rerun is slower")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--child", choices=sorted(SCENARIOS), help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.child:
+        run_scenario(args.child, args.reruns)
+        return 0
+
+    report = {"imports": {}, "runs": {}}
+    has_streamlit = streamlit_installed()
+    if has_streamlit:
+        report["imports"]["streamlit"] = {"startup": cold_import_ms({"streamlit"}, args.repeats)}
+    print(f"{'script':<16}{'startup ms':>12}{'if eager':>10}  deferred")
+    for name, path in SCRIPTS.items():
+        startup, deferred = script_imports(path)
+        eager = cold_import_ms(startup | deferred, args.repeats)
+        report["imports"][name] = {"startup": cold_import_ms(startup, args.repeats), "eager": eager,
+                                   "deferred": sorted(deferred)}
+        print(f"{name:<16}{report['imports'][name]['startup']:>12.1f}{eager:>10.1f}  {', '.join(sorted(deferred))}")
+    if has_streamlit:
+        print(f"(import streamlit: {report['imports']['streamlit']['startup']:.1f} ms, paid by every script)")
+
+        print(f"\n{'scenario':<16}{'first run ms':>14}{'rerun p50':>11}{'rerun p95':>11}")
+        for name in SCENARIOS:
+            runs = report["runs"][name] = scenario_ms(name, args.reruns)
+            print(f"{name:<16}{runs['first']:>14.1f}{runs['p50']:>11.1f}{runs['p95']:>11.1f}")
+    else:
+        print("\nStreamlit is not installed; skipping first-run and rerun timings")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), **report}, f, indent=2)
+
+    failures = []
+    startup = report["imports"]["app.py"]["startup"]
+    if args.max_startup_ms is not None and startup > args.max_startup_ms:
+        failures.append(f"app.py startup imports {startup:.1f} ms > {args.max_startup_ms:.1f} ms")
+    if args.max_rerun_ms is not None:
+        for name, runs in report["runs"].items():
+            if runs["p95"] > args.max_rerun_ms:
+                failures.append(f"{name} rerun p95 {runs['p95']:.1f} ms > {args.max_rerun_ms:.1f} ms")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
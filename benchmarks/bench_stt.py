@@ -0,0 +1,169 @@
+# bench_stt.py
+"""
+Compares transcription backends on the same audio corpus: model load time,
+real-time factor (wall time / audio duration, lower is better) and peak
+resident memory.
+
+    python benchmarks/bench_stt.py --corpus path/to/wavs
+    python benchmarks/bench_stt.py --backend whisper --concurrency 4
+
+Each backend runs in its own process so memory figures do not mix. The
+"assemblyai" backend uses the real API when ASSEMBLYAI_API_KEY is set and
+the stub server otherwise (its timings then reflect the stub settings, not
+the service). "whisper" needs the optional faster-whisper package and is
+skipped when it is missing. Without --corpus, synthetic WAV clips are
+generated; they are fine for timing but use real speech to judge output.
+"""
+
+import argparse
+import glob
+import json
+import math
+import os
+import random
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+BACKENDS = ("assemblyai", "whisper")
+SAMPLE_RATE = 16000
+
+
+def synthesize_corpus(directory, lengths, seed=0):
+    """Writes 16 kHz mono WAV clips of gliding tones and noise, one per length."""
+    rng = random.Random(seed)
+    paths = []
+    for i, seconds in enumerate(lengths):
+        path = os.path.join(directory, f"clip_{i:02d}_{seconds:g}s.wav")
+        frames = bytearray()
+        for n in range(int(seconds * SAMPLE_RATE)):
+            t = n / SAMPLE_RATE
+            pitch = 140 + 60 * math.sin(2 * math.pi * 0.7 * t)
+            sample = 0.3 * math.sin(2 * math.pi * pitch * t) + 0.05 * rng.uniform(-1, 1)
+            frames += struct.pack("<h", int(sample * 32767))
+        with wave.open(path, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(SAMPLE_RATE)
+            f.writeframes(bytes(frames))
+        paths.append(path)
+    return paths
+
+
+def audio_duration(path):
+    if path.lower().endswith(".wav"):
+        with wave.open(path, "rb") as f:
+            return f.getnframes() / f.getframerate()
+    from faster_whisper import decode_audio
+    return len(decode_audio(path, sampling_rate=SAMPLE_RATE)) / SAMPLE_RATE
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_child(backend, paths, concurrency):
+    """Benchmarks one backend in this process and prints a JSON result."""
+    stub = None
+    if backend == "assemblyai" and not os.getenv("ASSEMBLYAI_API_KEY"):
+        from stubs import StubAssemblyAI
+        stub = StubAssemblyAI(processing_time=1.0, processing_per_mb=20.0).start()
+        os.environ["ASSEMBLYAI_BASE_URL"] = stub.base_url
+        os.environ.setdefault("TRANSCRIBE_POLL_INITIAL_DELAY", "0.1")
+        os.environ.setdefault("TRANSCRIBE_POLL_MAX_DELAY", "0.5")
+    os.environ["TRANSCRIBE_BACKEND"] = backend
+
+    import transcriber
+
+    started = time.perf_counter()
+    engine = transcriber.get_backend()
+    load_time = time.perf_counter() - started
+    baseline_rss = peak_rss_mb()
+
+    def transcribe(path):
+        with open(path, "rb") as f:
+            begin = time.perf_counter()
+            engine.transcribe(f)
+            return time.perf_counter() - begin
+
+    # The first call pays one-off costs (thread pools, kernels), keep it out of the numbers
+    transcribe(paths[0])
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        elapsed = list(pool.map(transcribe, paths))
+    wall = time.perf_counter() - started
+
+    if stub is not None:
+        stub.stop()
+    print(json.dumps({
+        "backend": backend,
+        "stub": stub is not None,
+        "load_s": load_time,
+        "wall_s": wall,
+        "per_file_s": elapsed,
+        "rss_after_load_mb": baseline_rss,
+        "peak_rss_mb": peak_rss_mb(),
+    }))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=BACKENDS, action="append", help="backends to run (default: all)")
+    parser.add_argument("--corpus", help="directory of audio files (default: synthetic WAV clips)")
+    parser.add_argument("--lengths", default="5,15,30,60", help="synthetic clip lengths in seconds")
+    parser.add_argument("--concurrency", type=int, default=1, help="files transcribed at once")
+    parser.add_argument("--child", choices=BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument("--files", nargs="*", help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.child:
+        run_child(args.child, args.files, args.concurrency)
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.corpus:
+            paths = sorted(p for p in glob.glob(os.path.join(args.corpus, "*")) if os.path.isfile(p))
+        else:
+            paths = synthesize_corpus(tmp, [float(x) for x in args.lengths.split(",")])
+        if not paths:
+            raise SystemExit("No audio files found")
+        audio_seconds = sum(audio_duration(p) for p in paths)
+        print(f"{len(paths)} files, {audio_seconds:.0f}s of audio, concurrency {args.concurrency}")
+        print(f"{'backend':<18}{'load':>8}{'wall':>9}{'RTF':>8}{'RSS load':>10}{'RSS peak':>10}")
+
+        for backend in args.backend or BACKENDS:
+            command = [sys.executable, os.path.abspath(__file__), "--child", backend,
+                       "--concurrency", str(args.concurrency), "--files", *paths]
+            result = subprocess.run(command, capture_output=True, text=True)
+            if result.returncode != 0:
+                reason = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed"
+                print(f"{backend:<18}skipped: {reason}")
+                continue
+            stats = json.loads(result.stdout.strip().splitlines()[-1])
+            label = backend + (" (stub)" if stats["stub"] else "")
+            rss_load = f"{stats['rss_after_load_mb']:.0f}MB" if stats["rss_after_load_mb"] else "n/a"
+            rss_peak = f"{stats['peak_rss_mb']:.0f}MB" if stats["peak_rss_mb"] else "n/a"
+            print(f"{label:<18}{stats['load_s']:>7.2f}s{stats['wall_s']:>8.2f}s"
+                  f"{stats['wall_s'] / audio_seconds:>8.3f}{rss_load:>10}{rss_peak:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
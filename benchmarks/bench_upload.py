@@ -0,0 +1,95 @@
+# bench_upload.py
+"""
+Compares the legacy upload path (read into memory, write a temp file,
+re-open and post) against the streaming upload in transcriber.upload_audio.
+
+Reports peak Python heap (tracemalloc) and throughput for large WAV files,
+uploading to the local stub server so only our side is measured:
+
+    python benchmarks/bench_upload.py --sizes 10 50 200
+"""
+
+import argparse
+import math
+import os
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stubs import StubAssemblyAI
+
+
+def make_wav(path, size_mb, sample_rate=16000):
+    """Writes a mono 16-bit sine-wave WAV of roughly `size_mb` megabytes."""
+    frames = int(size_mb * 1024 * 1024 / 2)
+    block = b"".join(
+        struct.pack("<h", int(8000 * math.sin(2 * math.pi * 440 * i / sample_rate)))
+        for i in range(sample_rate)
+    )
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        written = 0
+        while written < frames:
+            n = min(sample_rate, frames - written)
+            wav.writeframes(block[: n * 2])
+            written += n
+
+
+def legacy_upload(file, base_url):
+    """The pre-streaming implementation: two disk copies plus a full in-memory copy."""
+    import requests
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
+        tmp.write(file.read())
+        tmp_path = tmp.name
+    try:
+        with open(tmp_path, "rb") as f:
+            response = requests.post(f"{base_url}/v2/upload", data=f)
+        return response.json()["upload_url"]
+    finally:
+        os.unlink(tmp_path)
+
+
+def measure(label, fn, path, size_bytes):
+    with open(path, "rb") as f:
+        tracemalloc.start()
+        started = time.perf_counter()
+        fn(f)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    mb = size_bytes / (1024 * 1024)
+    print(f"  {label:<10} peak heap {peak / (1024 * 1024):8.2f} MB   {elapsed:6.2f} s   {mb / elapsed:8.1f} MB/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=float, nargs="+", default=[10, 50, 200], help="WAV sizes in MB")
+    args = parser.parse_args()
+
+    with StubAssemblyAI() as stub:
+        os.environ["ASSEMBLYAI_BASE_URL"] = stub.base_url
+        import transcriber
+
+        transcriber.ASSEMBLYAI_BASE_URL = stub.base_url
+
+        for size_mb in args.sizes:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                path = os.path.join(tmpdir, "answer.wav")
+                make_wav(path, size_mb)
+                size_bytes = os.path.getsize(path)
+                print(f"{size_bytes / (1024 * 1024):.1f} MB WAV")
+                measure("legacy", lambda f: legacy_upload(f, stub.base_url), path, size_bytes)
+                measure("streaming", transcriber.upload_audio, path, size_bytes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+# load_test.py
+"""
+Drives the Flask API with N simulated candidates and reports per-endpoint
+latency percentiles, throughput, error and fallback rates.
+
+The model and transcription provider are replaced by in-process stubs with
+configurable latency and error distributions, so runs are repeatable and
+need no API keys:
+
+    python benchmarks/load_test.py --candidates 20 --questions 5
+
+The question stub answers in a mix of formats (numbered, bulleted, prose,
+truncated) so the parsing and fallback paths of generate_questions are
+exercised. Use the --max-p95 / --max-error-rate options to turn a run into a
+regression gate: the script exits non-zero when a threshold is exceeded.
+"""
+
+import argparse
+import importlib.util
+import json
+import logging
+import math
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Simulated candidates all come from one address, so they would share one
+# rate limit bucket. Set before rate_limit.py is first imported.
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+# Measure the model path; bench_question_bank.py measures the bank
+os.environ.setdefault("QUESTION_BANK_ENABLED", "0")
+# Keep simulated feedback out of the analytics store; bench_analytics.py measures it
+os.environ.setdefault("ANALYTICS_ENABLED", "0")
+
+import requests
+
+from stubs import StubAssemblyAI
+
+ENDPOINTS = ("questions", "more_questions", "transcribe", "feedback")
+
+# Shapes the question stub can answer in, with their relative weights
+QUESTION_FORMATS = {
+    "numbered": 0.6,
+    "bulleted": 0.15,
+    "prose": 0.15,
+    "truncated": 0.1,
+}
+
+
+class StubModelBackend:
+    """
+    Model backend for llm_client with log-normally distributed latency, a
+    transient error rate and a configurable mix of question output formats.
+    """
+
+    def __init__(self, median_latency, sigma, error_rate, seed=0):
+        from llm_client import FakeBackend
+
+        self._text = FakeBackend(latency=0)._text
+        self.median_latency = median_latency
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.formats = defaultdict(int)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _format_questions(self, text, shape):
+        questions = [line.split(". ", 1)[1] for line in text.splitlines()]
+        if shape == "bulleted":
+            return "Here are your questions:\n" + "\n".join(f"- {q}" for q in questions)
+        if shape == "prose":
+            return "Sure! Questions for this role:\n\n" + "\n\n".join(questions)
+        if shape == "truncated":
+            return "\n".join(f"{i + 1}. {q}" for i, q in enumerate(questions[:2]))
+        return text
+
+    def generate(self, prompt, stream=False, timeout=30, **kwargs):
+        with self._lock:
+            latency = self.median_latency * self._random.lognormvariate(0, self.sigma)
+            failed = self._random.random() < self.error_rate
+            shape = self._random.choices(list(QUESTION_FORMATS), weights=list(QUESTION_FORMATS.values()))[0]
+        time.sleep(min(latency, timeout))
+        if latency > timeout:
+            raise TimeoutError("Stub model timed out")
+        if failed:
+            raise ConnectionError("Stub model transient error")
+
+        text = self._text(prompt)
+        if "interview questions" in prompt:
+            with self._lock:
+                self.formats[shape] += 1
+            text = self._format_questions(text, shape)
+
+        from llm_client import FakeResponse
+        if stream:
+            return [FakeResponse(text[i:i + 40]) for i in range(0, len(text), 40)]
+        return FakeResponse(text)
+
+
+def load_backend():
+    # backend/app.py shares its module name with the Streamlit app.py
+    spec = importlib.util.spec_from_file_location("backend_app", os.path.join(ROOT, "backend", "app.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def start_dev_server(app, host="127.0.0.1", port=0):
+    from werkzeug.serving import make_server
+
+    server = make_server(host, port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://{host}:{server.server_port}", server.shutdown
+
+
+def start_waitress_server(app, host="127.0.0.1", port=0):
+    sys.path.insert(0, os.path.join(ROOT, "backend"))
+    from serve import build_server
+
+    server = build_server(app, host=host, port=port)
+    threading.Thread(target=server.run, daemon=True).start()
+
+    def shutdown():
+        server.task_dispatcher.shutdown()
+        server.close()
+
+    return f"http://{host}:{server.effective_port}", shutdown
+
+
+SERVERS = {"dev": start_dev_server, "waitress": start_waitress_server}
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.fallbacks = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, elapsed, ok, fallback=False):
+        with self._lock:
+            self.samples[endpoint].append(elapsed)
+            if not ok:
+                self.errors[endpoint] += 1
+            if fallback:
+                self.fallbacks[endpoint] += 1
+
+    def summary(self, duration):
+        report = {}
+        for endpoint in ENDPOINTS:
+            values = sorted(self.samples[endpoint])
+            count = len(values)
+            report[endpoint] = {
+                "requests": count,
+                "throughput_rps": count / duration if duration else 0.0,
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+                "error_rate": self.errors[endpoint] / count if count else 0.0,
+                "fallback_rate": self.fallbacks[endpoint] / count if count else 0.0,
+            }
+        return report
+
+
+def timed(recorder, endpoint, call):
+    started = time.perf_counter()
+    try:
+        response = call()
+        ok = response.status_code < 400
+        payload = response.json() if ok else {}
+    except requests.RequestException:
+        ok, payload = False, {}
+    recorder.record(endpoint, time.perf_counter() - started, ok, fallback=bool(payload.get("warning")))
+    return payload
+
+
+def run_candidate(base_url, candidate_id, args, recorder, audio):
+    session = requests.Session()
+    posting = candidate_id % args.postings if args.postings else candidate_id
+    payload = timed(recorder, "questions", lambda: session.post(f"{base_url}/api/questions", json={
+        "company": f"Company {posting}",
+        "role": "Software Engineer",
+        "jobDescription": f"Posting {posting}: build and operate backend services in Python.",
+        "skills": "Python, SQL, Communication",
+        "questionCount": args.questions,
+    }, timeout=args.request_timeout))
+    questions = payload.get("questions") or ["Tell me about yourself."]
+    session_id = payload.get("sessionId")
+
+    for index in range(args.questions):
+        if index >= len(questions) and session_id:
+            # Later questions are generated in batches as the interview progresses
+            more = timed(recorder, "more_questions", lambda: session.post(
+                f"{base_url}/api/sessions/{session_id}/questions", json={"needed": index + 1},
+                timeout=args.request_timeout,
+            ))
+            questions = more.get("questions") or questions
+        if index >= len(questions):
+            break
+        question = questions[index]
+        transcript = timed(recorder, "transcribe", lambda: session.post(
+            f"{base_url}/api/transcribe",
+            files={"audio": ("recording.webm", audio, "audio/webm")},
+            timeout=args.request_timeout,
+        ))
+        answer = transcript.get("transcription", "")
+        timed(recorder, "feedback", lambda: session.post(f"{base_url}/api/feedback", json={
+            "question": question,
+            "answer": answer,
+            "role": "Software Engineer",
+            "skills": "Python, SQL, Communication",
+            "sessionId": session_id,
+            "index": index,
+        }, timeout=args.request_timeout))
+        if session_id:
+            # Moving on is what lets the server start the next batch ahead of need
+            try:
+                session.patch(f"{base_url}/api/sessions/{session_id}", json={"currentQuestionIndex": index + 1},
+                              timeout=args.request_timeout)
+            except requests.RequestException:
+                pass
+        if args.think_time:
+            time.sleep(args.think_time)
+
+
+def parse_thresholds(values):
+    thresholds = {}
+    for value in values or []:
+        endpoint, _, seconds = value.partition("=")
+        if endpoint not in ENDPOINTS or not seconds:
+            raise SystemExit(f"Invalid threshold {value!r}, expected e.g. feedback=2.5")
+        thresholds[endpoint] = float(seconds)
+    return thresholds
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--server", choices=sorted(SERVERS), default="dev",
+                        help="dev = threaded Werkzeug server, waitress = production server from backend/serve.py")
+    parser.add_argument("--candidates", type=int, default=10, help="concurrent simulated candidates")
+    parser.add_argument("--questions", type=int, default=5, help="answers recorded per candidate")
+    parser.add_argument("--postings", type=int, default=0,
+                        help="draw job postings from this many distinct ones (0 = unique per candidate)")
+    parser.add_argument("--model-latency", type=float, default=0.5, help="median stub model latency (s)")
+    parser.add_argument("--model-sigma", type=float, default=0.4, help="log-normal spread of model latency")
+    parser.add_argument("--model-error-rate", type=float, default=0.02)
+    parser.add_argument("--transcribe-latency", type=float, default=1.0, help="stub transcription time (s)")
+    parser.add_argument("--transcribe-error-rate", type=float, default=0.0)
+    parser.add_argument("--audio-kb", type=int, default=64, help="size of each uploaded answer")
+    parser.add_argument("--think-time", type=float, default=0.0, help="pause between answers (s)")
+    parser.add_argument("--request-timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-p95", action="append", metavar="ENDPOINT=SECONDS",
+                        help="fail if an endpoint's p95 exceeds SECONDS (repeatable)")
+    parser.add_argument("--max-error-rate", type=float, default=None, help="fail if any endpoint exceeds this")
+    parser.add_argument("--json", help="also write the report to this file")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    thresholds = parse_thresholds(args.max_p95)
+    random.seed(args.seed)
+
+    stub = StubAssemblyAI(processing_time=args.transcribe_latency, error_rate=args.transcribe_error_rate).start()
+    os.environ["ASSEMBLYAI_BASE_URL"] = stub.base_url
+    os.environ.setdefault("TRANSCRIBE_POLL_INITIAL_DELAY", "0.1")
+    os.environ.setdefault("TRANSCRIBE_POLL_MAX_DELAY", "0.5")
+    # Simulated interviews should not end up in the real session database
+    os.environ.setdefault("SESSION_STORE", "memory")
+    # The uploaded answers are random bytes, not decodable audio
+    os.environ.setdefault("AUDIO_PREPROCESS", "0")
+
+    backend = load_backend()
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    from llm_client import LLMClient
+    model_backend = StubModelBackend(args.model_latency, args.model_sigma, args.model_error_rate, args.seed)
+    backend.model = LLMClient(lambda: model_backend, max_concurrency=max(8, args.candidates))
+
+    base_url, shutdown = SERVERS[args.server](backend.app)
+    recorder = Recorder()
+    audio = os.urandom(args.audio_kb * 1024)
+
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=run_candidate, args=(base_url, i, args, recorder, audio))
+        for i in range(args.candidates)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - started
+
+    shutdown()
+    stub.stop()
+
+    report = recorder.summary(duration)
+    print(f"{args.server} server: {args.candidates} candidates x {args.questions} answers in {duration:.1f}s "
+          f"(model ~{args.model_latency:.2f}s, transcription ~{args.transcribe_latency:.2f}s)")
+    print(f"{'endpoint':<16}{'requests':>9}{'rps':>8}{'p50':>8}{'p95':>8}{'p99':>8}{'errors':>9}{'fallback':>10}")
+    for endpoint, stats in report.items():
+        print(f"{endpoint:<16}{stats['requests']:>9}{stats['throughput_rps']:>8.2f}"
+              f"{stats['p50']:>8.2f}{stats['p95']:>8.2f}{stats['p99']:>8.2f}"
+              f"{stats['error_rate']:>9.1%}{stats['fallback_rate']:>10.1%}")
+    print("question formats served: " + ", ".join(f"{k}={v}" for k, v in sorted(model_backend.formats.items())))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"duration": duration, "args": vars(args), "endpoints": report}, f, indent=2)
+
+    failures = []
+    for endpoint, limit in thresholds.items():
+        if report[endpoint]["p95"] > limit:
+            failures.append(f"{endpoint} p95 {report[endpoint]['p95']:.2f}s > {limit:.2f}s")
+    if args.max_error_rate is not None:
+        for endpoint, stats in report.items():
+            if stats["error_rate"] > args.max_error_rate:
+                failures.append(f"{endpoint} error rate {stats['error_rate']:.1%} > {args.max_error_rate:.1%}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+# stubs.py
+"""
+Local stand-ins for the external services so the pipeline can be exercised
+and benchmarked without network access.
+
+Run standalone to get a stub AssemblyAI server, then point the app at it:
+
+    python benchmarks/stubs.py --port 8765
+    ASSEMBLYAI_BASE_URL=http://127.0.0.1:8765 python backend/app.py
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _StubServer(ThreadingHTTPServer):
+    # Load tests open many connections at once; the default backlog of 5 drops some
+    request_queue_size = 256
+
+
+class StubAssemblyAI:
+    """
+    Minimal implementation of the AssemblyAI upload/transcript endpoints.
+
+    Transcripts report "processing" until `processing_time` seconds (plus
+    `processing_per_mb` for every MB of audio) have passed, then "completed"
+    (or "error" with probability `error_rate`). `upload_bandwidth` (bytes per
+    second, 0 = unlimited) throttles uploads to model a slower link.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, processing_time=1.0, error_rate=0.0,
+                 processing_per_mb=0.0, upload_bandwidth=0):
+        self.processing_time = processing_time
+        self.processing_per_mb = processing_per_mb
+        self.upload_bandwidth = upload_bandwidth
+        self.error_rate = error_rate
+        self.uploads = {}
+        self.transcripts = {}
+        self.request_counts = {"upload": 0, "transcript": 0, "poll": 0}
+        self.uploaded_bytes = 0
+        self._lock = threading.Lock()
+        self.server = _StubServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _read(self, size):
+                data = self.rfile.read(size)
+                if stub.upload_bandwidth:
+                    time.sleep(len(data) / stub.upload_bandwidth)
+                return data
+
+            def _read_body(self):
+                # Accept both Content-Length and chunked transfer encoding
+                if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                    size = 0
+                    while True:
+                        line = self.rfile.readline().strip()
+                        if not line:
+                            # Client gave up mid-upload
+                            break
+                        chunk_size = int(line.split(b";")[0], 16)
+                        if chunk_size == 0:
+                            self.rfile.readline()
+                            break
+                        size += len(self._read(chunk_size))
+                        self.rfile.readline()
+                    return size
+                length = int(self.headers.get("Content-Length", 0))
+                remaining = length
+                while remaining > 0:
+                    remaining -= len(self._read(min(remaining, 64 * 1024)))
+                return length
+
+            def _send_json(self, payload, status=200):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                if self.path == "/v2/upload":
+                    size = self._read_body()
+                    upload_id = uuid.uuid4().hex
+                    with stub._lock:
+                        stub.request_counts["upload"] += 1
+                        stub.uploaded_bytes += size
+                        stub.uploads[upload_id] = size
+                    self._send_json({"upload_url": f"{stub.base_url}/files/{upload_id}"})
+                elif self.path == "/v2/transcript":
+                    length = int(self.headers.get("Content-Length", 0))
+                    audio_url = json.loads(self.rfile.read(length) or b"{}").get("audio_url", "")
+                    transcript_id = uuid.uuid4().hex
+                    failed = random.random() < stub.error_rate
+                    with stub._lock:
+                        stub.request_counts["transcript"] += 1
+                        size = stub.uploads.get(audio_url.rsplit("/", 1)[-1], 0)
+                        stub.transcripts[transcript_id] = (time.monotonic(), size, failed)
+                    self._send_json({"id": transcript_id, "status": "queued"})
+                else:
+                    self._send_json({"error": "not found"}, 404)
+
+            def do_GET(self):
+                if not self.path.startswith("/v2/transcript/"):
+                    self._send_json({"error": "not found"}, 404)
+                    return
+                transcript_id = self.path.rsplit("/", 1)[-1]
+                with stub._lock:
+                    stub.request_counts["poll"] += 1
+                    entry = stub.transcripts.get(transcript_id)
+                if entry is None:
+                    self._send_json({"error": "transcript not found"}, 404)
+                    return
+                started, size, failed = entry
+                processing_time = stub.processing_time + stub.processing_per_mb * size / (1024 * 1024)
+                if time.monotonic() - started < processing_time:
+                    self._send_json({"id": transcript_id, "status": "processing"})
+                elif failed:
+                    self._send_json({"id": transcript_id, "status": "error", "error": "Stub transcription failure"})
+                else:
+                    self._send_json({
+                        "id": transcript_id,
+                        "status": "completed",
+                        "text": f"Stub transcript for {size} bytes of audio.",
+                    })
+
+        return Handler
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """
+    Drop-in replacement for a GenerativeModel that sleeps for a configurable
+    latency and returns canned text, optionally failing at `error_rate`.
+    """
+
+    def __init__(self, delay=1.0, jitter=0.0, error_rate=0.0, text=None):
+        self.delay = delay
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.text = text or (
+            "## Feedback\n\n### Content Relevance: 4/5\nGood use of a concrete example.\n\n"
+            "### Overall Rating: 4/5\nA clear, well-structured answer."
+        )
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(max(0.0, self.delay + random.uniform(-self.jitter, self.jitter)))
+        if random.random() < self.error_rate:
+            raise RuntimeError("Fake model error")
+        return FakeResponse(self.text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a stub AssemblyAI server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--processing-time", type=float, default=1.0)
+    parser.add_argument("--processing-per-mb", type=float, default=0.0)
+    parser.add_argument("--upload-bandwidth", type=int, default=0, help="bytes per second, 0 = unlimited")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stub = StubAssemblyAI(args.host, args.port, args.processing_time, args.error_rate,
+                          args.processing_per_mb, args.upload_bandwidth)
+    print(f"Stub AssemblyAI listening on {stub.base_url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
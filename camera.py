@@ -0,0 +1,261 @@
+# camera.py
+
+import atexit
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# "device" reads a webcam through OpenCV; "synthetic" generates moving test
+# frames so the pipeline runs without a camera (CI, servers, demos)
+CAMERA_SOURCE = os.getenv("CAMERA_SOURCE", "device")
+CAMERA_INDEX = int(os.getenv("CAMERA_INDEX", "0"))
+CAMERA_FPS = float(os.getenv("CAMERA_FPS", "15"))
+# Frames are downscaled to this width before JPEG encoding
+CAMERA_MAX_WIDTH = int(os.getenv("CAMERA_MAX_WIDTH", "640"))
+CAMERA_JPEG_QUALITY = int(os.getenv("CAMERA_JPEG_QUALITY", "75"))
+# A feed nobody has looked at for this long is stopped and the device released
+CAMERA_IDLE_TIMEOUT = float(os.getenv("CAMERA_IDLE_TIMEOUT", "30"))
+# Consecutive failed reads before the feed gives up on the device
+CAMERA_MAX_READ_FAILURES = 30
+
+
+class DeviceSource:
+    """Webcam frames (BGR) via cv2.VideoCapture, opened once and kept open."""
+
+    def __init__(self, index=CAMERA_INDEX):
+        import cv2
+
+        self._capture = cv2.VideoCapture(index)
+        # Keep only the newest frame in the driver so reads are never stale
+        self._capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        if not self._capture.isOpened():
+            logger.warning(f"Could not open camera {index}")
+
+    def read(self):
+        ok, frame = self._capture.read()
+        return frame if ok else None
+
+    def release(self):
+        self._capture.release()
+
+
+class SyntheticSource:
+    """Moving colour bars at a fixed resolution, in place of a real device."""
+
+    def __init__(self, width=1280, height=720):
+        import numpy as np
+
+        x = np.linspace(0, 255, width, dtype=np.float32)
+        self._base = np.stack([
+            np.tile(x, (height, 1)),
+            np.tile(x[::-1], (height, 1)),
+            np.full((height, width), 128, dtype=np.float32),
+        ], axis=2).astype(np.uint8)
+        self._offset = 0
+
+    def read(self):
+        import numpy as np
+
+        self._offset = (self._offset + 16) % self._base.shape[1]
+        return np.roll(self._base, self._offset, axis=1)
+
+    def release(self):
+        pass
+
+
+def make_source():
+    if CAMERA_SOURCE == "synthetic":
+        return SyntheticSource()
+    return DeviceSource()
+
+
+def encode_jpeg(frame, max_width=CAMERA_MAX_WIDTH, quality=CAMERA_JPEG_QUALITY):
+    """Downscales a BGR frame to `max_width` and returns it as JPEG bytes."""
+    import cv2
+
+    height, width = frame.shape[:2]
+    if width > max_width:
+        frame = cv2.resize(frame, (max_width, int(height * max_width / width)), interpolation=cv2.INTER_AREA)
+    ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer.tobytes() if ok else None
+
+
+class Frame:
+    def __init__(self, jpeg, seq, captured):
+        self.jpeg = jpeg
+        self.seq = seq
+        self.captured = captured
+
+
+class CameraStream:
+    """
+    Reads a frame source on a background thread at `fps`, encoding each
+    frame off the UI thread. Only the newest frame is kept, so readers never
+    block and never see a backlog; frames nobody fetched are counted as
+    dropped. The thread stops itself after `idle_timeout` seconds without a
+    reader, releasing the device when a browser tab is simply closed.
+    `on_frame(frame)`, if given, is called on the camera thread with each raw
+    frame and must return quickly (e.g. presence.PresenceTracker.offer).
+    """
+
+    def __init__(self, source_factory=make_source, fps=CAMERA_FPS, encode=encode_jpeg,
+                 idle_timeout=CAMERA_IDLE_TIMEOUT, on_frame=None):
+        self.fps = fps
+        self.idle_timeout = idle_timeout
+        self.error = None
+        self._source_factory = source_factory
+        self._encode = encode
+        self._on_frame = on_frame
+        self._latest = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._last_read = time.monotonic()
+        self._served_seq = 0
+        self._stats = {"captured": 0, "served": 0, "dropped": 0}
+        self._thread = threading.Thread(target=self._run, name="camera", daemon=True)
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            # Opened on the reader thread so a slow device never blocks a rerun
+            source = self._source_factory()
+        except Exception as e:
+            self.error = f"Camera unavailable: {str(e)}"
+            logger.warning(self.error)
+            return
+
+        interval = 1.0 / self.fps
+        next_at = time.monotonic()
+        failures = 0
+        seq = 0
+        try:
+            while not self._stop.is_set():
+                if time.monotonic() - self._last_read > self.idle_timeout:
+                    logger.info("Camera feed idle, stopping")
+                    break
+
+                frame = source.read()
+                if frame is None:
+                    failures += 1
+                    if failures >= CAMERA_MAX_READ_FAILURES:
+                        self.error = "Camera unavailable: no frames received"
+                        logger.warning(self.error)
+                        break
+                else:
+                    failures = 0
+                    if self._on_frame is not None:
+                        try:
+                            self._on_frame(frame)
+                        except Exception as e:
+                            logger.warning(f"Frame callback failed, disabling it: {str(e)}")
+                            self._on_frame = None
+                    jpeg = self._encode(frame)
+                    if jpeg is not None:
+                        seq += 1
+                        with self._lock:
+                            if self._latest is not None and self._latest.seq > self._served_seq:
+                                self._stats["dropped"] += 1
+                            self._latest = Frame(jpeg, seq, time.time())
+                            self._stats["captured"] += 1
+
+                # Pace to the target rate; after a slow frame, resume without catching up
+                next_at += interval
+                delay = next_at - time.monotonic()
+                if delay > 0:
+                    self._stop.wait(delay)
+                else:
+                    next_at = time.monotonic()
+        finally:
+            source.release()
+
+    def latest(self):
+        """Returns the newest Frame without blocking, or None before the first one."""
+        self._last_read = time.monotonic()
+        with self._lock:
+            frame = self._latest
+            if frame is not None and frame.seq > self._served_seq:
+                self._stats["served"] += 1
+                self._served_seq = frame.seq
+        return frame
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["running"] = self.running
+        return stats
+
+    def stop(self, timeout=2):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+
+_cameras = {}
+_cameras_lock = threading.Lock()
+
+
+def open_camera(key, **kwargs):
+    """
+    Returns the camera feed for `key` (e.g. a Streamlit session), starting
+    one if there is none or the previous one went idle. A feed that failed
+    keeps its error until closed, rather than retrying the device on
+    every rerun.
+    """
+    with _cameras_lock:
+        camera = _cameras.get(key)
+        if camera is None or not (camera.running or camera.error):
+            camera = _cameras[key] = CameraStream(**kwargs).start()
+        return camera
+
+
+def close_camera(key):
+    with _cameras_lock:
+        camera = _cameras.pop(key, None)
+    if camera is not None:
+        camera.stop()
+
+
+@atexit.register
+def close_all():
+    with _cameras_lock:
+        cameras = list(_cameras.values())
+        _cameras.clear()
+    for camera in cameras:
+        camera.stop()
+
+
+def render_feed(key, fps=None, on_frame=None):
+    """
+    Draws the camera feed for `key` in Streamlit. Where fragments are
+    available the image refreshes on its own without rerunning the page;
+    older versions show the newest frame on each rerun. `on_frame` is
+    passed to a newly started feed.
+    """
+    import streamlit as st
+
+    camera = open_camera(key, on_frame=on_frame)
+    fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+
+    def draw():
+        frame = camera.latest()
+        if camera.error:
+            st.info(camera.error)
+        elif frame is None:
+            st.caption("Starting camera...")
+        else:
+            st.image(frame.jpeg, use_column_width=True)
+
+    if fragment is None:
+        draw()
+    else:
+        fragment(run_every=1.0 / (fps or camera.fps))(draw)()
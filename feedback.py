@@ -1,10 +1,25 @@
-import google.generativeai as genai
+import logging
+import os
+import threading
+import time
+from analytics_store import record_feedback
+from llm_client import get_client
+from prompt_budget import FEEDBACK_PROMPT_TOKENS, fit_prompt, compact_skills, truncate_answer
+from concurrent.futures import ThreadPoolExecutor
 
-genai.configure(api_key="PLACE YOUR OWN KEY HERE")
-model = genai.GenerativeModel("gemini-2.0-flash")
+logger = logging.getLogger(__name__)
+
+model = get_client()
+
+# Shared by every session's background evaluations; the model client caps
+# concurrent calls anyway
+FEEDBACK_PIPELINE_WORKERS = int(os.getenv("FEEDBACK_PIPELINE_WORKERS", "8"))
+_pipeline_executor = ThreadPoolExecutor(max_workers=FEEDBACK_PIPELINE_WORKERS, thread_name_prefix="feedback")
 
 def generate_feedback_prompt(question, answer, role, skills):
-    return f"""
+    skills = compact_skills(skills)
+    def build(answer):
+        return f"""
 You are an experienced interviewer evaluating a candidate's response for the role of {role}.
 The candidate was asked: "{question}"
 Their response was: "{answer}"
@@ -20,8 +35,72 @@ Please provide constructive feedback on:
 
 Keep the feedback professional and actionable.
 """
+    return fit_prompt("feedback", FEEDBACK_PROMPT_TOKENS, build, answer=truncate_answer(answer))
 
-def evaluate_answer(question, answer, role, skills):
+def evaluate_answer(question, answer, role, skills, company=""):
     prompt = generate_feedback_prompt(question, answer, role, skills)
+    started = time.perf_counter()
     response = model.generate_content(prompt)
+    record_feedback(response.text, role, company, skills, time.perf_counter() - started, prompt)
     return response.text
+
+def stream_evaluate_answer(question, answer, role, skills, company=""):
+    """
+    Yields the feedback text in chunks as the model generates it. Falls back
+    to a single non-streaming call if streaming fails before any output.
+    """
+    prompt = generate_feedback_prompt(question, answer, role, skills)
+    started = time.perf_counter()
+    parts = []
+    try:
+        for chunk in model.generate_content(prompt, stream=True):
+            if chunk.text:
+                parts.append(chunk.text)
+                yield chunk.text
+    except Exception:
+        if parts:
+            raise
+        yield evaluate_answer(question, answer, role, skills, company)
+        return
+    record_feedback("".join(parts), role, company, skills, time.perf_counter() - started, prompt)
+
+class FeedbackPipeline:
+    """
+    Evaluates a session's answers in the background so the candidate can
+    move on to the next question while feedback for the last one is
+    generated. Finished feedback is collected by question index on the
+    next rerun; `on_result(index, feedback)` is called from the worker
+    thread as each one lands (e.g. to persist it).
+    """
+
+    def __init__(self, role, skills, on_result=None, company=""):
+        self.role = role
+        self.skills = skills
+        self.company = company
+        self._on_result = on_result
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def _evaluate(self, index, question, answer):
+        try:
+            feedback = evaluate_answer(question, answer, self.role, self.skills, self.company)
+        except Exception as e:
+            logger.error(f"Background feedback for question {index + 1} failed: {str(e)}")
+            feedback = f"Feedback could not be generated for this answer ({str(e)})."
+        if self._on_result is not None:
+            self._on_result(index, feedback)
+        return feedback
+
+    def submit(self, index, question, answer):
+        with self._lock:
+            self._futures[index] = _pipeline_executor.submit(self._evaluate, index, question, answer)
+
+    def results(self):
+        """Returns {index: feedback} for every evaluation that has finished."""
+        with self._lock:
+            futures = dict(self._futures)
+        return {index: future.result() for index, future in futures.items() if future.done()}
+
+    def pending(self):
+        with self._lock:
+            return sum(1 for future in self._futures.values() if not future.done())
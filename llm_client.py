@@ -0,0 +1,376 @@
+# llm_client.py
+
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+from rate_limit import FairScheduler, current_client
+from singleflight import SingleFlight, request_key
+
+logger = logging.getLogger(__name__)
+
+# Backend selection: "gemini" talks to Google, "fake" is a deterministic
+# in-process stand-in for load testing without network access
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini-2.0-flash")
+
+# Resilience settings
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_RATE_LIMIT = float(os.getenv("LLM_RATE_LIMIT", "0"))  # calls per second, 0 disables
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+# Identical requests made while one is in flight share its response
+LLM_SINGLE_FLIGHT = os.getenv("LLM_SINGLE_FLIGHT", "1") == "1"
+
+# Fake backend behaviour
+FAKE_LLM_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0.2"))
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+
+# Provider errors worth retrying, matched by class name so google.api_core
+# does not have to be importable
+TRANSIENT_ERRORS = {
+    "DeadlineExceeded",
+    "InternalServerError",
+    "ResourceExhausted",
+    "ServiceUnavailable",
+    "TooManyRequests",
+}
+
+
+class LLMError(Exception):
+    """Base class for errors raised by the client layer."""
+
+
+class LLMUnavailable(LLMError):
+    """Raised without calling the provider when the circuit is open or limits are saturated."""
+
+
+def is_transient(error):
+    return isinstance(error, (TimeoutError, ConnectionError)) or type(error).__name__ in TRANSIENT_ERRORS
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout):
+        """Takes one token, waiting up to `timeout` seconds. Returns False on timeout."""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures so callers fail fast for
+    `cooldown` seconds, then lets a single trial call through (half-open).
+    """
+
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.cooldown:
+                return "half_open"
+            return "open"
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def release_trial(self):
+        """Gives back a half-open trial call that never reached the model."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+
+
+class GeminiBackend:
+    """Google Gemini via google-generativeai, configured on first use."""
+
+    def __init__(self, model_name=LLM_MODEL, api_key=None):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key or os.getenv("GOOGLE_API_KEY", ""))
+        self._model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt, stream=False, timeout=LLM_TIMEOUT, **kwargs):
+        return self._model.generate_content(
+            prompt, stream=stream, request_options={"timeout": timeout}, **kwargs
+        )
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeBackend:
+    """
+    Deterministic offline backend: the same prompt always yields the same
+    text. Question prompts get a numbered list (or JSON when a JSON
+    response is requested), everything else gets Markdown feedback.
+    """
+
+    QUESTIONS = [
+        "Tell me about a project where you had to learn a new technology quickly.",
+        "How would you design a service that handles a sudden tenfold increase in traffic?",
+        "Describe a time you disagreed with a teammate and how you resolved it.",
+        "Walk me through how you would debug a memory leak in production.",
+        "What trade-offs do you consider when choosing between SQL and NoSQL storage?",
+        "Describe a time you delivered a feature under a tight deadline.",
+        "How do you make sure the code you ship is well tested?",
+        "Tell me about a mistake you made at work and what you learned from it.",
+    ]
+
+    def __init__(self, latency=FAKE_LLM_LATENCY, error_rate=FAKE_LLM_ERROR_RATE, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _text(self, prompt):
+        digest = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest(), 16)
+        if "interview questions" in prompt:
+            start = digest % len(self.QUESTIONS)
+            picked = [self.QUESTIONS[(start + i) % len(self.QUESTIONS)] for i in range(5)]
+            return "\n".join(f"{i + 1}. {q}" for i, q in enumerate(picked))
+        rating = 2 + digest % 4
+        return (
+            "## Feedback\n\n"
+            f"### Content Relevance: {rating}/5\nThe answer addresses the question with some detail.\n\n"
+            f"### Communication Clarity: {rating}/5\nThe answer is clear and reasonably concise.\n\n"
+            "### Areas for Improvement:\n- Add a concrete, measurable result\n\n"
+            f"### Overall Rating: {rating}/5\n"
+        )
+
+    def generate(self, prompt, stream=False, timeout=LLM_TIMEOUT, **kwargs):
+        with self._lock:
+            failed = self._random.random() < self.error_rate
+        if self.latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Fake model exceeded the {timeout:.1f}s timeout")
+        time.sleep(self.latency)
+        if failed:
+            raise ConnectionError("Fake model transient error")
+
+        text = self._text(prompt)
+        config = kwargs.get("generation_config") or {}
+        if config.get("response_mime_type") == "application/json" and "interview questions" in prompt:
+            text = json.dumps({"questions": [line.split(". ", 1)[1] for line in text.splitlines()]})
+        if stream:
+            return [FakeResponse(text[i:i + 40]) for i in range(0, len(text), 40)]
+        return FakeResponse(text)
+
+
+class LLMClient:
+    """
+    Shared entry point for model calls. Exposes `generate_content` like a
+    GenerativeModel, adding a timeout, jittered retries on transient errors,
+    a concurrency limit shared fairly between clients, an optional rate
+    limit and a circuit breaker. Concurrent identical non-streaming requests (double clicks, reruns,
+    duplicated effects) are coalesced into one provider call.
+    """
+
+    def __init__(self, backend_factory, timeout=LLM_TIMEOUT, max_retries=LLM_MAX_RETRIES,
+                 max_concurrency=LLM_MAX_CONCURRENCY, rate_limit=LLM_RATE_LIMIT,
+                 breaker_threshold=LLM_BREAKER_THRESHOLD, breaker_cooldown=LLM_BREAKER_COOLDOWN,
+                 single_flight=LLM_SINGLE_FLIGHT):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_concurrency = max_concurrency
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_cooldown)
+        self._backend_factory = backend_factory
+        self._backend = None
+        self._backend_lock = threading.Lock()
+        # Slots go round-robin to waiting clients, so one busy client
+        # cannot hold every call in the queue
+        self._scheduler = FairScheduler("llm", max_concurrency)
+        self._bucket = TokenBucket(rate_limit) if rate_limit > 0 else None
+        self._flights = SingleFlight() if single_flight else None
+        self._stats_lock = threading.Lock()
+        self._stats = {"calls": 0, "failures": 0, "retries": 0, "rejected": 0, "in_flight": 0}
+
+    @property
+    def backend(self):
+        # Built lazily so importing a module never touches the provider SDK
+        if self._backend is None:
+            with self._backend_lock:
+                if self._backend is None:
+                    self._backend = self._backend_factory()
+        return self._backend
+
+    def _count(self, name, delta=1):
+        with self._stats_lock:
+            self._stats[name] += delta
+
+    def _admit(self):
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise LLMUnavailable("Model circuit is open after repeated failures")
+        try:
+            if self._bucket is not None and not self._bucket.acquire(self.timeout):
+                raise LLMUnavailable("Model rate limit exceeded")
+            if not self._scheduler.acquire(current_client(), timeout=self.timeout):
+                raise LLMUnavailable("Too many concurrent model calls")
+        except BaseException:
+            # Otherwise a half-open breaker would wait forever for this trial
+            self.breaker.release_trial()
+            self._count("rejected")
+            raise
+        self._count("in_flight")
+
+    def _release(self):
+        self._count("in_flight", -1)
+        self._scheduler.release()
+
+    def _call(self, prompt, stream, kwargs):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.backend.generate(prompt, stream=stream, timeout=self.timeout, **kwargs)
+            except Exception as e:
+                if attempt == self.max_retries or not is_transient(e):
+                    raise
+                delay = LLM_RETRY_BASE_DELAY * (2 ** attempt) * random.uniform(0.5, 1.5)
+                logger.warning(f"Transient model error ({type(e).__name__}), retrying in {delay:.2f}s")
+                self._count("retries")
+                time.sleep(delay)
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        """
+        Returns the model response (an object with `.text`), or an iterator
+        of chunks when `stream=True`.
+        """
+        if stream:
+            return self._stream(prompt, kwargs)
+        if self._flights is None:
+            return self._generate(prompt, kwargs)
+        # Followers hold no concurrency slot and wait on the leader's call,
+        # which its own timeouts and retries already bound
+        response, _ = self._flights.do(request_key(prompt, kwargs), lambda: self._generate(prompt, kwargs))
+        return response
+
+    def _generate(self, prompt, kwargs):
+        self._admit()
+        self._count("calls")
+        try:
+            response = self._call(prompt, False, kwargs)
+            # Accessing .text surfaces blocked/empty responses as errors here
+            response.text
+        except Exception:
+            self._count("failures")
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.release_trial()
+            raise
+        else:
+            self.breaker.record_success()
+            return response
+        finally:
+            self._release()
+
+    def _stream(self, prompt, kwargs):
+        # Admission happens on first iteration so an unconsumed stream never
+        # holds a slot; retries only cover opening the stream
+        self._admit()
+        self._count("calls")
+        try:
+            for chunk in self._call(prompt, True, kwargs):
+                yield chunk
+        except Exception:
+            self._count("failures")
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # GeneratorExit: the consumer abandoned the stream (a closed SSE
+            # connection, an interrupted rerun), which says nothing about the
+            # model, but a half-open trial must not stay in flight forever
+            self.breaker.release_trial()
+            raise
+        else:
+            self.breaker.record_success()
+        finally:
+            self._release()
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        if self._flights is not None:
+            stats["coalesced"] = self._flights.stats()["shared"]
+        stats["circuit"] = self.breaker.state
+        stats["max_concurrency"] = self.max_concurrency
+        stats["queued"] = self._scheduler.stats()["waiting"]
+        return stats
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client(api_key=None):
+    """
+    Returns the process-wide model client. `api_key` only applies when the
+    client is first created.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                if LLM_BACKEND == "fake":
+                    factory = FakeBackend
+                else:
+                    factory = lambda: GeminiBackend(LLM_MODEL, api_key)
+                _client = LLMClient(factory)
+                logger.info(f"Model client ready (backend={LLM_BACKEND}, timeout={LLM_TIMEOUT:.0f}s, "
+                            f"concurrency={LLM_MAX_CONCURRENCY})")
+    return _client
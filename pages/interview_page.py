@@ -1,11 +1,10 @@
 import streamlit as st
-import cv2
-import numpy as np
-from transcriber import transcribe_audio
-from question_gen import get_interview_questions
-from feedback import evaluate_answer
-import tempfile
-import os
+import uuid
+from question_plan import INTERVIEW_QUESTION_COUNT, QUESTION_BATCH_SIZE, ADAPTIVE_QUESTIONS, answer_history
+from tracing import span
+
+# Heavy modules (transcriber, question_gen, feedback, camera, presence) are imported
+# where they are first needed, not each time the page script is loaded
 
 def show_interview():
     # Initialize session state variables if they don't exist
@@ -17,6 +16,10 @@ def show_interview():
         st.session_state.answers = []
     if 'feedback' not in st.session_state:
         st.session_state.feedback = []
+    if 'question_count' not in st.session_state:
+        st.session_state.question_count = INTERVIEW_QUESTION_COUNT
+    if 'adaptive' not in st.session_state:
+        st.session_state.adaptive = ADAPTIVE_QUESTIONS
 
     # Get interview details from session state
     company = st.session_state.get('company', '')
@@ -24,9 +27,24 @@ def show_interview():
     job_desc = st.session_state.get('job_desc', '')
     skills = st.session_state.get('skills', '')
 
-    # Generate questions if not already done
-    if not st.session_state.questions:
-        st.session_state.questions = get_interview_questions(company, role, job_desc, skills)
+    # Generate questions a batch at a time, when the candidate reaches them
+    questions = st.session_state.questions
+    index = st.session_state.current_question_index
+    if len(questions) <= index < st.session_state.question_count:
+        from question_gen import get_interview_questions
+
+        history = answer_history(questions, st.session_state.answers) if st.session_state.adaptive else ()
+        with st.spinner("Preparing your next question..."), span("questions_generate"):
+            batch = get_interview_questions(
+                company, role, job_desc, skills,
+                count=min(QUESTION_BATCH_SIZE, st.session_state.question_count - len(questions)),
+                asked=questions, history=history
+            )
+        batch = [question for question in batch if question not in questions]
+        if not batch:
+            # Nothing new left to ask - end the interview with the questions it has
+            st.session_state.question_count = len(questions)
+        st.session_state.questions = questions + batch
 
     # Layout
     col1, col2 = st.columns([2, 1])
@@ -36,9 +54,10 @@ def show_interview():
         st.write(f"**Company:** {company}")
         st.write(f"**Role:** {role}")
         
-        # Camera feed
-        stframe = st.empty()
-        cap = cv2.VideoCapture(0)
+        # Camera feed, captured by a background thread for this session
+        if 'camera_key' not in st.session_state:
+            st.session_state.camera_key = uuid.uuid4().hex
+        camera_placeholder = st.empty()
         
         # Audio recording
         audio_bytes = st.audio_input("Record your answer", key=f"audio_{st.session_state.current_question_index}")
@@ -48,27 +67,32 @@ def show_interview():
         
         if st.session_state.current_question_index < len(st.session_state.questions):
             current_question = st.session_state.questions[st.session_state.current_question_index]
-            st.subheader(f"Question {st.session_state.current_question_index + 1}/5")
+            st.subheader(f"Question {st.session_state.current_question_index + 1}/{st.session_state.question_count}")
             st.write(current_question)
             
             if audio_bytes:
-                # Transcribe audio
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-                    tmp.write(audio_bytes)
-                    tmp_path = tmp.name
-                
-                transcribed_text = transcribe_audio(open(tmp_path, 'rb'))
-                os.unlink(tmp_path)
+                from transcriber import transcribe_audio
+                from audio_preprocess import AudioRejected
+                from feedback import evaluate_answer
+
+                # Transcribe audio - silent or very short recordings are rejected before upload
+                try:
+                    transcribed_text = transcribe_audio(audio_bytes)
+                except AudioRejected as e:
+                    st.warning(f"We couldn't hear an answer in that recording ({str(e)}). Please record again.")
+                    st.stop()
                 
                 st.session_state.answers.append(transcribed_text)
                 
                 # Get feedback
-                feedback = evaluate_answer(
-                    current_question,
-                    transcribed_text,
-                    role,
-                    skills
-                )
+                with span("llm_call", operation="feedback"):
+                    feedback = evaluate_answer(
+                        current_question,
+                        transcribed_text,
+                        role,
+                        skills,
+                        company
+                    )
                 st.session_state.feedback.append(feedback)
                 
                 # Move to next question
@@ -78,6 +102,16 @@ def show_interview():
             st.success("🎉 Interview Completed!")
             st.subheader("Your Answers and Feedback")
             
+            # Presence analysis of the camera feed, when PRESENCE_ENABLED
+            from presence import close_tracker, describe
+
+            tracker = close_tracker(st.session_state.camera_key, timeout=2)
+            if tracker is not None:
+                st.session_state.presence = tracker.summary()
+            presence = st.session_state.get('presence')
+            if presence is not None:
+                st.write(f"**Camera presence:** {describe(presence['overall'])}")
+            
             for i, (question, answer, feedback) in enumerate(zip(
                 st.session_state.questions,
                 st.session_state.answers,
@@ -87,11 +121,21 @@ def show_interview():
                     st.write(f"**Question:** {question}")
                     st.write(f"**Your Answer:** {answer}")
                     st.write(f"**Feedback:** {feedback}")
+                    if presence is not None and i < len(presence['questions']) and presence['questions'][i]:
+                        st.write(f"**Presence:** {describe(presence['questions'][i])}")
+
+    # Display camera feed until the interview is over
+    from camera import render_feed, close_camera
+
+    if st.session_state.current_question_index < len(st.session_state.questions):
+        from presence import PRESENCE_ENABLED, open_tracker
 
-    # Display camera feed
-    if cap.isOpened():
-        ret, frame = cap.read()
-        if ret:
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            stframe.image(frame, channels="RGB")
-        cap.release() 
\ No newline at end of file
+        on_frame = None
+        if PRESENCE_ENABLED:
+            tracker = open_tracker(st.session_state.camera_key)
+            tracker.set_question(st.session_state.current_question_index)
+            on_frame = tracker.offer
+        with camera_placeholder.container():
+            render_feed(st.session_state.camera_key, on_frame=on_frame)
+    else:
+        close_camera(st.session_state.camera_key)
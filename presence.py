@@ -0,0 +1,400 @@
+# presence.py
+
+import atexit
+import logging
+import math
+import os
+import sys
+import threading
+import time
+import types
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from tracing import registry
+
+logger = logging.getLogger(__name__)
+
+# Opt-in analysis of the camera feed: frames are sampled at a low fixed
+# rate, downscaled, and run through face and eye detection in batches on
+# a process pool, so neither the UI nor the camera thread waits on it
+PRESENCE_ENABLED = os.getenv("PRESENCE_ENABLED", "0") == "1"
+PRESENCE_SAMPLE_FPS = float(os.getenv("PRESENCE_SAMPLE_FPS", "2"))
+# Sampled frames are converted to grayscale at this width
+PRESENCE_WIDTH = int(os.getenv("PRESENCE_WIDTH", "320"))
+PRESENCE_BATCH = int(os.getenv("PRESENCE_BATCH", "8"))
+PRESENCE_WORKERS = int(os.getenv("PRESENCE_WORKERS", str(max(1, min(2, (os.cpu_count() or 1) - 1)))))
+# Frames a session may have waiting for the pool; the oldest are dropped
+# beyond this, so analysis skips ahead under load instead of falling behind
+PRESENCE_QUEUE_FRAMES = int(os.getenv("PRESENCE_QUEUE_FRAMES", str(4 * PRESENCE_BATCH)))
+# Batches in the pool at once, across all sessions
+PRESENCE_MAX_PENDING = int(os.getenv("PRESENCE_MAX_PENDING", str(2 * PRESENCE_WORKERS)))
+
+# A face centred within this share of the frame counts as centred
+CENTER_TOLERANCE = 0.2
+# Face height as a share of the frame height for a well-framed candidate
+FACE_SIZE_RANGE = (0.15, 0.7)
+# Faces smaller than this (pixels) are too small to find eyes in; larger
+# ones are scaled to EYE_FACE_WIDTH, where eyes fit the 20 px eye detector
+MIN_EYE_FACE = 40
+EYE_FACE_WIDTH = 120
+# Eye line tilt (degrees) beyond which the head counts as tilted
+MAX_TILT_DEGREES = 15
+
+frames_counter = registry.counter("presence_frames_total", "Sampled camera frames, by result")
+batch_seconds = registry.histogram("presence_batch_seconds", "Time to analyze one batch of frames")
+
+
+# Worker side: runs in the pool processes
+
+_detectors = None
+
+
+def _init_worker():
+    global _detectors
+    import cv2
+
+    # One core per worker; the pool size sets the total
+    cv2.setNumThreads(1)
+    path = cv2.data.haarcascades
+    _detectors = tuple(cv2.CascadeClassifier(os.path.join(path, name)) for name in (
+        "haarcascade_frontalface_default.xml", "haarcascade_profileface.xml", "haarcascade_eye.xml"
+    ))
+
+
+def _observe(gray):
+    """Presence observations for one grayscale frame."""
+    import cv2
+
+    frontal, profile, eyes = _detectors
+    height, width = gray.shape
+    min_size = (width // 10, width // 10)
+    faces = frontal.detectMultiScale(gray, scaleFactor=1.15, minNeighbors=5, minSize=min_size)
+    facing = len(faces) > 0
+    if not facing:
+        # A turned head is still in the frame, but not facing the camera
+        faces = profile.detectMultiScale(gray, scaleFactor=1.15, minNeighbors=5, minSize=min_size)
+    if len(faces) == 0:
+        return {"faces": 0}
+
+    x, y, w, h = max(faces, key=lambda face: face[2] * face[3])
+    observation = {"faces": len(faces), "facing": facing, "x": float(x + w / 2) / width,
+                   "y": float(y + h / 2) / height, "size": float(h) / height, "eyes": None, "tilt": None}
+    if facing and w >= MIN_EYE_FACE:
+        # Eyes are looked for in the upper part of the face only
+        face = gray[y:y + h * 3 // 5, x:x + w]
+        if w < EYE_FACE_WIDTH:
+            face = cv2.resize(face, (EYE_FACE_WIDTH, EYE_FACE_WIDTH * face.shape[0] // w),
+                              interpolation=cv2.INTER_LINEAR)
+        found = eyes.detectMultiScale(face, scaleFactor=1.1, minNeighbors=5)
+        observation["eyes"] = len(found)
+        if len(found) >= 2:
+            # Head tilt from the line through the two largest eyes
+            (x1, y1, w1, h1), (x2, y2, w2, h2) = sorted(found, key=lambda eye: eye[2] * eye[3])[-2:]
+            angle = abs(math.degrees(math.atan2(float(y2 + h2 / 2 - y1 - h1 / 2), float(x2 + w2 / 2 - x1 - w1 / 2))))
+            observation["tilt"] = min(angle, 180 - angle)
+    return observation
+
+
+def analyze_batch(frames):
+    """Observations for a batch of grayscale frames (run in a pool process)."""
+    if _detectors is None:
+        _init_worker()
+    return [_observe(frame) for frame in frames]
+
+
+# Process side
+
+def downscale(frame, width=PRESENCE_WIDTH):
+    """A BGR frame as grayscale, downscaled to `width` pixels wide."""
+    import cv2
+
+    height = frame.shape[0] * width // frame.shape[1]
+    if frame.shape[1] > width:
+        frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+def get_pool():
+    """Returns the process-wide analysis pool, started on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                import multiprocessing
+
+                # Spawned, not forked: the parent runs camera and request threads
+                pool = ProcessPoolExecutor(max_workers=PRESENCE_WORKERS, initializer=_init_worker,
+                                           mp_context=multiprocessing.get_context("spawn"))
+                # Spawned children import the parent's __main__ again, and
+                # Streamlit runs the page script as __main__ with its folder
+                # on sys.path only while the script runs. Start every worker
+                # now, with an empty module standing in for __main__ and this
+                # module's folder importable.
+                main, path = sys.modules["__main__"], list(sys.path)
+                sys.modules["__main__"] = types.ModuleType("__main__")
+                sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+                try:
+                    for _ in range(PRESENCE_WORKERS):
+                        pool.submit(os.getpid)
+                finally:
+                    sys.modules["__main__"] = main
+                    sys.path[:] = path
+                _pool = pool
+                logger.info(f"Presence analysis pool ready ({PRESENCE_WORKERS} workers)")
+    return _pool
+
+
+def _reserve(limit):
+    global _pending
+    with _pending_lock:
+        if _pending >= limit:
+            return False
+        _pending += 1
+        return True
+
+
+def _release():
+    global _pending
+    with _pending_lock:
+        _pending -= 1
+
+
+class _Aggregate:
+    """Running presence totals for one question."""
+
+    def __init__(self):
+        self.frames = 0
+        self.present = 0
+        self.facing = 0
+        self.centered = 0
+        self.framed = 0
+        self.upright = 0
+        self.multiple = 0
+        self.eyes_checked = 0
+        self.eye_contact = 0
+        self.moves = []
+        self._last = None
+
+    def add(self, observation):
+        self.frames += 1
+        if not observation["faces"]:
+            self._last = None
+            return
+        self.present += 1
+        self.multiple += observation["faces"] > 1
+        self.facing += observation["facing"]
+        x, y, size = observation["x"], observation["y"], observation["size"]
+        centered = abs(x - 0.5) <= CENTER_TOLERANCE
+        self.centered += centered
+        self.framed += FACE_SIZE_RANGE[0] <= size <= FACE_SIZE_RANGE[1]
+        # Slouching drops the face towards the bottom of the frame
+        tilt = observation["tilt"]
+        self.upright += y <= 0.6 and (tilt is None or tilt <= MAX_TILT_DEGREES)
+        if observation["eyes"] is not None:
+            self.eyes_checked += 1
+            self.eye_contact += observation["facing"] and centered and observation["eyes"] >= 2
+        if self._last is not None:
+            self.moves.append(math.hypot(x - self._last[0], y - self._last[1]))
+        self._last = (x, y)
+
+    def metrics(self):
+        def share(count, total):
+            return round(count / total, 2) if total else None
+
+        return {
+            "frames": self.frames,
+            "facePresent": share(self.present, self.frames),
+            "facingCamera": share(self.facing, self.present),
+            "eyeContact": share(self.eye_contact, self.eyes_checked),
+            "centered": share(self.centered, self.present),
+            "wellFramed": share(self.framed, self.present),
+            "upright": share(self.upright, self.present),
+            "multipleFaces": share(self.multiple, self.present),
+            # Mean move of the face between samples, as a share of the frame
+            "movement": round(sum(self.moves) / len(self.moves), 3) if self.moves else None,
+        }
+
+
+class PresenceTracker:
+    """
+    Presence metrics for one interview. `offer(frame)` is called by the
+    camera thread with every frame; it keeps one every 1/`sample_fps`
+    seconds, downscaled, and hands them to the pool `batch` at a time.
+    Frames beyond `queue_frames` waiting for the pool are dropped, oldest
+    first. Observations are kept per question, as set by `set_question`.
+    """
+
+    def __init__(self, sample_fps=PRESENCE_SAMPLE_FPS, width=PRESENCE_WIDTH, batch=PRESENCE_BATCH,
+                 queue_frames=PRESENCE_QUEUE_FRAMES, max_pending=PRESENCE_MAX_PENDING, pool=None):
+        self.sample_fps = sample_fps
+        self.width = width
+        self.batch = batch
+        self.max_pending = max_pending
+        self.error = None
+        self._pool = pool
+        self._queue = deque(maxlen=queue_frames)
+        self._question = 0
+        self._next_sample = 0.0
+        self._in_flight = 0
+        self._closed = False
+        self._aggregates = {}
+        self._stats = {"sampled": 0, "analyzed": 0, "dropped": 0, "batches": 0}
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    def set_question(self, index):
+        """Frames sampled from now on count towards question `index`."""
+        self._question = index
+
+    def offer(self, frame, now=None):
+        """Takes a BGR frame from the camera; returns at once."""
+        now = time.monotonic() if now is None else now
+        if self._closed or now < self._next_sample:
+            return
+        # Fixed rate; after a gap, resume without catching up
+        self._next_sample = max(self._next_sample + 1.0 / self.sample_fps, now)
+        small = downscale(frame, self.width)
+        with self._lock:
+            self._stats["sampled"] += 1
+            if len(self._queue) == self._queue.maxlen:
+                self._stats["dropped"] += 1
+                frames_counter.inc(result="dropped")
+            self._queue.append((self._question, small))
+        self._dispatch()
+
+    def _dispatch(self, flush=False):
+        with self._lock:
+            # One batch at a time per interview keeps observations in order
+            if self.error or self._in_flight or not self._queue or (len(self._queue) < self.batch and not flush):
+                return
+            if not _reserve(self.max_pending):
+                # The pool is busy; frames wait (and the oldest drop) until it catches up
+                return
+            items = [self._queue.popleft() for _ in range(min(self.batch, len(self._queue)))]
+            self._in_flight += 1
+        try:
+            future = (self._pool or get_pool()).submit(analyze_batch, [frame for _, frame in items])
+        except (BrokenProcessPool, RuntimeError) as e:
+            _release()
+            with self._lock:
+                self._in_flight -= 1
+                self.error = f"Presence analysis unavailable: {str(e)}"
+                self._idle.notify_all()
+            logger.warning(self.error)
+            return
+        questions = [question for question, _ in items]
+        started = time.monotonic()
+        future.add_done_callback(lambda future: self._collect(future, questions, started))
+
+    def _collect(self, future, questions, started):
+        _release()
+        try:
+            observations = future.result()
+        except Exception as e:
+            observations = None
+            logger.warning(f"Presence batch failed: {str(e)}")
+        batch_seconds.observe(time.monotonic() - started)
+        with self._lock:
+            self._in_flight -= 1
+            if observations is not None:
+                for question, observation in zip(questions, observations):
+                    self._aggregates.setdefault(question, _Aggregate()).add(observation)
+                self._stats["analyzed"] += len(observations)
+                self._stats["batches"] += 1
+                frames_counter.inc(len(observations), result="analyzed")
+            self._idle.notify_all()
+        # Frames that queued up meanwhile go next, without waiting for the camera
+        self._dispatch()
+
+    def drain(self, timeout=5):
+        """Sends the frames still queued and waits up to `timeout` seconds for every batch."""
+        deadline = time.monotonic() + timeout
+        while True:
+            self._dispatch(flush=True)
+            with self._lock:
+                if not self._in_flight and (not self._queue or self.error):
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._idle.wait(min(remaining, 0.1))
+
+    def close(self):
+        """Stops taking frames; batches already sent still finish."""
+        self._closed = True
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, "queued": len(self._queue), "inFlight": self._in_flight}
+
+    def summary(self):
+        """Presence metrics per question index and for the whole interview."""
+        with self._lock:
+            aggregates = dict(self._aggregates)
+            stats = dict(self._stats)
+        overall = _Aggregate()
+        for aggregate in aggregates.values():
+            for name in ("frames", "present", "facing", "centered", "framed", "upright", "multiple",
+                         "eyes_checked", "eye_contact"):
+                setattr(overall, name, getattr(overall, name) + getattr(aggregate, name))
+            overall.moves.extend(aggregate.moves)
+        questions = [None] * (max(aggregates) + 1 if aggregates else 0)
+        for index, aggregate in aggregates.items():
+            questions[index] = aggregate.metrics()
+        return {"questions": questions, "overall": overall.metrics(), "sampled": stats["sampled"],
+                "dropped": stats["dropped"], "error": self.error}
+
+
+def describe(metrics):
+    """A one-line summary of presence metrics for display."""
+    if not metrics or not metrics["frames"]:
+        return "No camera frames analyzed"
+    if not metrics["facePresent"]:
+        return "No face detected in the camera feed"
+    parts = [f"face in frame {metrics['facePresent']:.0%}", f"facing the camera {metrics['facingCamera']:.0%}"]
+    if metrics["eyeContact"] is not None:
+        parts.append(f"eye contact {metrics['eyeContact']:.0%}")
+    parts.append(f"upright {metrics['upright']:.0%}")
+    if metrics["multipleFaces"]:
+        parts.append(f"another face {metrics['multipleFaces']:.0%} of the time")
+    return ", ".join(parts)
+
+
+_trackers = {}
+_trackers_lock = threading.Lock()
+
+
+def open_tracker(key, **kwargs):
+    """Returns the presence tracker for `key` (e.g. a Streamlit session), starting one if needed."""
+    with _trackers_lock:
+        tracker = _trackers.get(key)
+        if tracker is None:
+            tracker = _trackers[key] = PresenceTracker(**kwargs)
+        return tracker
+
+
+def close_tracker(key, timeout=5):
+    """Stops the tracker for `key` and returns it once its frames are analyzed (None if there was none)."""
+    with _trackers_lock:
+        tracker = _trackers.pop(key, None)
+    if tracker is not None:
+        tracker.close()
+        tracker.drain(timeout)
+    return tracker
+
+
+@atexit.register
+def shutdown():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,276 @@
+# prompt_budget.py
+
+import logging
+import os
+import re
+from functools import lru_cache
+
+from tracing import registry
+
+logger = logging.getLogger(__name__)
+
+# Job descriptions are condensed to a profile of responsibilities and
+# requirements, overlong answers are cut, and whole prompts are kept under a
+# per-prompt token budget. PROMPT_COMPACTION=0 sends everything verbatim
+PROMPT_COMPACTION = os.getenv("PROMPT_COMPACTION", "1") == "1"
+JOB_PROFILE_TOKENS = int(os.getenv("JOB_PROFILE_TOKENS", "350"))
+SKILLS_MAX_TOKENS = int(os.getenv("SKILLS_MAX_TOKENS", "80"))
+ANSWER_MAX_TOKENS = int(os.getenv("ANSWER_MAX_TOKENS", "800"))
+QUESTION_PROMPT_TOKENS = int(os.getenv("QUESTION_PROMPT_TOKENS", "1200"))
+FEEDBACK_PROMPT_TOKENS = int(os.getenv("FEEDBACK_PROMPT_TOKENS", "1400"))
+JOB_PROFILE_CACHE_SIZE = 256
+
+# Token counts in powers of two, sized for prompts
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+prompt_tokens = registry.histogram("prompt_tokens", "Estimated prompt tokens sent, by operation", TOKEN_BUCKETS)
+tokens_saved = registry.counter("prompt_tokens_saved_total", "Estimated prompt tokens removed, by prompt part")
+
+# Words and single punctuation marks; long words cost one token per ~4
+# characters, roughly as subword tokenizers split them
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+_OMITTED = " [...] "
+_OMITTED_TOKENS = 5  # "[", three dots and "]"
+
+_BULLET = re.compile(r"^\s*(?:[-*•·▪◦]|\d{1,2}[.)])\s+")
+_SENTENCE = re.compile(r"(?<=[.!?])\s+(?=[A-Z(\"'])")
+_HEADING_MARKUP = re.compile(r"^[#*_\s]+|[*_:\s]+$")
+# Sections worth keeping and sections that never matter for an interview
+_KEEP_SECTION = re.compile(
+    r"responsib|what you(?:'ll| will)? do|you(?:'ll| will)\b|dut(?:y|ies)|(?:the|this|your) role|job description|"
+    r"overview|summary|position|opportunity|day to day|requirement|qualif|skills|"
+    r"experience|what you(?:'ll| will)? bring|must.have|nice.to.have|bonus|preferred|looking for|"
+    r"(?:tech|technology) stack|you (?:have|are|bring)|about you|ideal candidate",
+    re.IGNORECASE,
+)
+_DROP_SECTION = re.compile(
+    r"about (?:us|the company|the team|(?!you\b)\w+$)|company (?:description|overview)|who we are|benefits|perks|what we offer|compensation|"
+    r"salary|pay range|equal (?:employment )?opportunit|\beeo\b|diversity|inclusion|how to apply|"
+    r"(?:application|interview|hiring) process|our values|culture|why join|locations?$|accommodation|privacy",
+    re.IGNORECASE,
+)
+_BOILERPLATE = re.compile(
+    r"equal opportunity|regardless of|without regard to|reasonable accommodation|apply (?:now|today)|"
+    r"competitive (?:salary|compensation|pay)|401\(?k|health(?:care)? insurance|dental|paid time off|"
+    r"\bpto\b|parental leave|(?:interview|hiring) process|visa sponsorship|background check|e-?verify|salary range|\$\d",
+    re.IGNORECASE,
+)
+_ACTION = re.compile(
+    r"\b(?:build|design|develop|lead|own|maintain|implement|deploy|collaborate|mentor|drive|architect|"
+    r"optimi[sz]e|analy[sz]e|manage|scale|ship|write|test|review|debug|automate|partner|deliver)\w*",
+    re.IGNORECASE,
+)
+_SKILL_SEPARATORS = re.compile(r"[,;\n|•]+")
+_STOP_WORDS = {"and", "the", "for", "with", "senior", "junior", "lead", "staff", "principal", "intern"}
+
+
+def count_tokens(text):
+    """
+    Estimated token count of `text`. Local and fast enough to call on every
+    prompt; close to subword tokenizer counts for English, so budgets should
+    keep some headroom.
+    """
+    return sum(1 + (len(word) - 1) // 4 for word in _TOKEN.findall(text or ""))
+
+
+def truncate_tokens(text, max_tokens, tail=0.0):
+    """
+    Cuts `text` to about `max_tokens` on word boundaries, marking the cut.
+    With `tail` > 0 that share of the budget keeps the end of the text and
+    the middle is dropped instead.
+    """
+    text = text or ""
+    if max_tokens <= 0:
+        return ""
+    spans = [(m.start(), m.end(), 1 + (m.end() - m.start() - 1) // 4) for m in _TOKEN.finditer(text)]
+    if sum(cost for _, _, cost in spans) <= max_tokens:
+        return text
+    room = max(1, max_tokens - _OMITTED_TOKENS)
+    head_room = room - int(room * tail)
+
+    head_end, used = 0, 0
+    for _, end, cost in spans:
+        if used + cost > head_room:
+            break
+        used += cost
+        head_end = end
+    tail_start, used = len(text), 0
+    for start, _, cost in reversed(spans):
+        if used + cost > room - head_room or start < head_end:
+            break
+        used += cost
+        tail_start = start
+    return (text[:head_end].rstrip() + _OMITTED + text[tail_start:].lstrip()).strip()
+
+
+def _heading(line):
+    """The section title if `line` is a heading, else None."""
+    title = _HEADING_MARKUP.sub("", line)
+    words = len(title.split())
+    if not title or words > 10 or title.endswith((".", "?", "!")):
+        return None
+    marked = line.rstrip().endswith(":") or line.lstrip().startswith(("#", "**", "__"))
+    if marked or (words <= 6 and not _BULLET.match(line) and (_KEEP_SECTION.search(title) or _DROP_SECTION.search(title))):
+        return title
+    return None
+
+
+def _term_pattern(role, skills):
+    terms = {part.strip().lower() for part in _SKILL_SEPARATORS.split(skills or "") if part.strip()}
+    terms.update(word for word in re.findall(r"\w+", (role or "").lower()) if len(word) > 2 and word not in _STOP_WORDS)
+    if not terms:
+        return None
+    alternatives = "|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+    return re.compile(rf"(?<!\w)(?:{alternatives})(?!\w)", re.IGNORECASE)
+
+
+def compact_job_description(job_desc, role="", skills="", max_tokens=JOB_PROFILE_TOKENS):
+    """
+    Condenses a pasted job posting into a profile of at most `max_tokens`:
+    responsibility and requirement lines are kept, company pitch, benefits
+    and legal boilerplate are dropped, and the remaining lines are ranked by
+    section, list formatting, action verbs and mentions of the role and
+    skills. Kept lines stay in their original order under their headings.
+    Postings already within budget only have their whitespace collapsed.
+    """
+    lines = [" ".join(line.split()) for line in (job_desc or "").splitlines()]
+    normalized = "\n".join(line for line in lines if line)
+    if count_tokens(normalized) <= max_tokens:
+        return normalized
+
+    terms = _term_pattern(role, skills)
+    units, seen = [], set()
+    section, keep_section, drop_section = None, False, False
+    for line in lines:
+        if not line:
+            continue
+        title = _heading(line)
+        if title is not None:
+            section = title
+            drop_section = bool(_DROP_SECTION.search(title))
+            keep_section = not drop_section and bool(_KEEP_SECTION.search(title))
+            continue
+        if drop_section:
+            continue
+        bullet = _BULLET.match(line)
+        text = line[bullet.end():] if bullet else line
+        for sentence in ([text] if bullet else _SENTENCE.split(text)):
+            key = sentence.lower()
+            if len(sentence) < 12 or key in seen or _BOILERPLATE.search(sentence):
+                continue
+            seen.add(key)
+            score = 2 * keep_section + bool(bullet) + bool(_ACTION.search(sentence))
+            if terms is not None:
+                score += min(3, len(set(m.lower() for m in terms.findall(sentence))))
+            units.append((len(units), section, sentence, score, count_tokens(sentence) + 1))
+
+    chosen, used, headed = set(), 0, set()
+    for order, unit_section, _, _, cost in sorted(units, key=lambda unit: (-unit[3], unit[0])):
+        heading_cost = count_tokens(unit_section) + 1 if unit_section and unit_section not in headed else 0
+        if used + cost + heading_cost > max_tokens:
+            continue
+        chosen.add(order)
+        used += cost + heading_cost
+        if unit_section:
+            headed.add(unit_section)
+
+    profile, current = [], None
+    for order, unit_section, sentence, _, _ in units:
+        if order not in chosen:
+            continue
+        if unit_section != current and unit_section:
+            profile.append(f"{unit_section}:")
+        current = unit_section
+        profile.append(f"- {sentence}")
+    return "\n".join(profile) or truncate_tokens(normalized, max_tokens)
+
+
+@lru_cache(maxsize=JOB_PROFILE_CACHE_SIZE)
+def _job_profile(role, job_desc, skills, max_tokens):
+    profile = compact_job_description(job_desc, role, skills, max_tokens)
+    return profile, max(0, count_tokens(job_desc) - count_tokens(profile))
+
+
+def job_profile(role, job_desc, skills="", max_tokens=JOB_PROFILE_TOKENS):
+    """
+    The condensed job profile used in prompts in place of the full posting.
+    Memoized on its inputs, so a session's posting is compacted once no
+    matter how many question batches use it.
+    """
+    if not PROMPT_COMPACTION:
+        return job_desc
+    profile, saved = _job_profile(role or "", job_desc or "", skills or "", max_tokens)
+    if saved:
+        tokens_saved.inc(saved, part="job_description")
+    return profile
+
+
+@lru_cache(maxsize=JOB_PROFILE_CACHE_SIZE)
+def _compact_skills(skills, max_tokens):
+    items, seen, used = [], set(), 0
+    for item in _SKILL_SEPARATORS.split(skills):
+        item = " ".join(_BULLET.sub("", item).split())
+        cost = count_tokens(item) + 1
+        if not item or item.lower() in seen or used + cost > max_tokens:
+            continue
+        seen.add(item.lower())
+        items.append(item)
+        used += cost
+    compact = ", ".join(items)
+    return compact, max(0, count_tokens(skills) - count_tokens(compact))
+
+
+def compact_skills(skills, max_tokens=SKILLS_MAX_TOKENS):
+    """The skills list with duplicates removed, cut to `max_tokens` on item boundaries."""
+    if not PROMPT_COMPACTION or not skills:
+        return skills
+    compact, saved = _compact_skills(skills, max_tokens)
+    if saved:
+        tokens_saved.inc(saved, part="skills")
+    return compact
+
+
+def truncate_answer(answer, max_tokens=ANSWER_MAX_TOKENS):
+    """
+    Shortens an overlong transcribed answer, keeping its opening and its
+    conclusion (a third of the budget) and dropping the middle.
+    """
+    if not PROMPT_COMPACTION or not answer:
+        return answer
+    truncated = truncate_tokens(answer, max_tokens, tail=1 / 3)
+    if truncated is not answer:
+        tokens_saved.inc(max(0, count_tokens(answer) - count_tokens(truncated)), part="answer")
+    return truncated
+
+
+def _share(sizes, available):
+    """Splits `available` tokens between parts max-min fairly: small parts keep everything."""
+    allowed, remaining = {}, max(0, available)
+    ordered = sorted(sizes, key=sizes.get)
+    for i, name in enumerate(ordered):
+        allowed[name] = min(sizes[name], remaining // (len(ordered) - i))
+        remaining -= allowed[name]
+    return allowed
+
+
+def fit_prompt(operation, budget, build, **parts):
+    """
+    Returns `build(**parts)`, first shortening the variable `parts` (text
+    the builder inserts, such as a job profile or an answer) if the prompt
+    would exceed `budget` tokens. The fixed template is never cut; parts
+    share what is left so the largest are shortened first. A budget of 0
+    disables the limit.
+    """
+    prompt = build(**parts)
+    tokens = count_tokens(prompt)
+    if PROMPT_COMPACTION and budget and tokens > budget:
+        sizes = {name: count_tokens(text) for name, text in parts.items()}
+        # Headings a builder adds only around non-empty parts count as fixed
+        allowed = _share(sizes, budget - (tokens - sum(sizes.values())))
+        prompt = build(**{name: truncate_tokens(text, allowed[name]) for name, text in parts.items()})
+        trimmed = count_tokens(prompt)
+        logger.info(f"Shortened {operation} prompt from {tokens} to {trimmed} tokens (budget {budget})")
+        tokens_saved.inc(tokens - trimmed, part="budget")
+        tokens = trimmed
+    prompt_tokens.observe(tokens, operation=operation)
+    return prompt
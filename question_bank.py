@@ -0,0 +1,345 @@
+# question_bank.py
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from tracing import registry, span
+
+logger = logging.getLogger(__name__)
+
+# Generated questions are kept, tagged with the role and skills they were
+# written for, and served again to close profiles instead of calling the
+# model. An empty QUESTION_BANK_DB keeps the bank in-process only.
+QUESTION_BANK_ENABLED = os.getenv("QUESTION_BANK_ENABLED", "1") == "1"
+QUESTION_BANK_DB = os.getenv(
+    "QUESTION_BANK_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "question_bank.db")
+)
+# Profiles at least this similar (0-1, role and skills weighted by
+# QUESTION_BANK_ROLE_WEIGHT) share questions
+QUESTION_BANK_MIN_SIMILARITY = float(os.getenv("QUESTION_BANK_MIN_SIMILARITY", "0.6"))
+QUESTION_BANK_ROLE_WEIGHT = float(os.getenv("QUESTION_BANK_ROLE_WEIGHT", "0.5"))
+# Questions at least this similar to a stored one are treated as duplicates
+QUESTION_BANK_DEDUP_SIMILARITY = float(os.getenv("QUESTION_BANK_DEDUP_SIMILARITY", "0.8"))
+# The oldest tenth is dropped once the bank holds more questions than this
+QUESTION_BANK_SIZE = int(os.getenv("QUESTION_BANK_SIZE", "5000"))
+# How often a worker picks up questions other workers added to the same file
+QUESTION_BANK_SYNC_SECONDS = float(os.getenv("QUESTION_BANK_SYNC_SECONDS", "30"))
+
+# Hashed term features per vector; 1024 float32s is 4 KB per question
+FEATURES = 2 ** 10
+
+_TOKEN = re.compile(r"[a-z0-9+#]+")
+
+bank_lookups = registry.counter("question_bank_lookups_total", "Question bank lookups, by result")
+_LOOKUP_RESULTS = {"hits": "hit", "partial_hits": "partial", "misses": "miss"}
+
+
+def _stem(token):
+    # Plurals only: "queries" and "query" should count as the same term
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    # Keeps "c++" and "c#" whole
+    return [_stem(token) for token in _TOKEN.findall(str(text or "").lower())]
+
+
+def normalize_skills(skills):
+    parts = (" ".join(part.lower().split()) for part in str(skills or "").split(","))
+    return ", ".join(sorted(part for part in parts if part))
+
+
+_COMPANY_SUFFIXES = {"inc", "ltd", "llc", "llp", "plc", "gmbh", "corp", "corporation", "co", "company", "group"}
+
+
+def names_company(question, company):
+    """True if `question` mentions `company` by name, ignoring suffixes such as "Inc"."""
+    name = tokenize(company)
+    while len(name) > 1 and name[-1] in _COMPANY_SUFFIXES:
+        name.pop()
+    if not name:
+        return False
+    tokens = tokenize(question)
+    return any(tokens[i:i + len(name)] == name for i in range(len(tokens) - len(name) + 1))
+
+
+def profile_key(role, skills):
+    return f"{' '.join(str(role or '').lower().split())}|{normalize_skills(skills)}"
+
+
+class TfIdfIndex:
+    """
+    Unit-length TF-IDF vectors of short texts over hashed term features, in
+    one dense matrix. Term counts are kept per row; the matrix is rebuilt
+    with current document frequencies on the first query after an add.
+    """
+
+    def __init__(self, features=FEATURES):
+        self.features = features
+        self._rows = []
+        self._df = np.zeros(features, dtype=np.float64)
+        self._matrix = None
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _counts(self, tokens):
+        columns = np.fromiter((zlib.crc32(token.encode("utf-8")) % self.features for token in tokens),
+                              dtype=np.int64, count=len(tokens))
+        columns, counts = np.unique(columns, return_counts=True)
+        return columns, 1.0 + np.log(counts)
+
+    def _idf(self):
+        return np.log((1.0 + len(self._rows)) / (1.0 + self._df)) + 1.0
+
+    def add(self, tokens):
+        """Adds a text's tokens as the next row; returns its row number."""
+        columns, weights = self._counts(tokens)
+        self._rows.append((columns, weights))
+        self._df[columns] += 1
+        self._matrix = None
+        return len(self._rows) - 1
+
+    def vector(self, tokens):
+        """A unit query vector comparable with the rows (zero if `tokens` is empty)."""
+        vector = np.zeros(self.features, dtype=np.float32)
+        columns, weights = self._counts(tokens)
+        vector[columns] = weights * self._idf()[columns]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def matrix(self):
+        if self._matrix is None:
+            idf = self._idf().astype(np.float32)
+            matrix = np.zeros((len(self._rows), self.features), dtype=np.float32)
+            for row, (columns, weights) in enumerate(self._rows):
+                matrix[row, columns] = weights * idf[columns]
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            self._matrix = matrix / np.where(norms > 0, norms, 1)
+        return self._matrix
+
+    def similarity(self, tokens):
+        """Cosine similarity of `tokens` to every row."""
+        return self.matrix() @ self.vector(tokens)
+
+
+class QuestionBank:
+    """
+    Persistent bank of generated interview questions with a similarity
+    index over the role and skills they were generated for. `find` serves
+    questions stored for the closest profiles; `add` stores new ones,
+    skipping near-duplicates of questions already in the bank. Rows live in
+    SQLite and are indexed in memory, so lookups never touch the disk.
+    """
+
+    def __init__(self, db_path=QUESTION_BANK_DB, min_similarity=QUESTION_BANK_MIN_SIMILARITY,
+                 role_weight=QUESTION_BANK_ROLE_WEIGHT, dedup_similarity=QUESTION_BANK_DEDUP_SIMILARITY,
+                 max_questions=QUESTION_BANK_SIZE, sync_interval=QUESTION_BANK_SYNC_SECONDS):
+        self.min_similarity = min_similarity
+        self.role_weight = role_weight
+        self.dedup_similarity = dedup_similarity
+        self.max_questions = max_questions
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "hits": 0, "partial_hits": 0, "misses": 0, "added": 0, "duplicates": 0,
+                       "company_specific": 0}
+        self._db = sqlite3.connect(db_path or ":memory:", check_same_thread=False, timeout=10)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS bank_profiles ("
+            "id INTEGER PRIMARY KEY, key TEXT UNIQUE NOT NULL, role TEXT NOT NULL, skills TEXT NOT NULL, "
+            "created REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS bank_questions ("
+            "id INTEGER PRIMARY KEY, profile_id INTEGER NOT NULL, question TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._db.commit()
+        with self._lock:
+            self._reset()
+            self._sync()
+
+    def _reset(self):
+        self._roles = TfIdfIndex()
+        self._skills = TfIdfIndex()
+        self._questions = TfIdfIndex()
+        self._profile_rows = {}
+        self._profile_questions = []
+        self._texts = []
+        self._seen = set()
+        self._last_profile_id = 0
+        self._last_question_id = 0
+
+    def _index_profile(self, profile_id, role, skills):
+        self._profile_rows[profile_id] = self._roles.add(tokenize(role))
+        self._skills.add(tokenize(skills))
+        self._profile_questions.append([])
+
+    def _sync(self):
+        """Indexes rows added to the database since the last sync, by this or another worker."""
+        for profile_id, key, role, skills in self._db.execute(
+            "SELECT id, key, role, skills FROM bank_profiles WHERE id > ? ORDER BY id", (self._last_profile_id,)
+        ).fetchall():
+            if profile_id not in self._profile_rows:
+                self._index_profile(profile_id, role, skills)
+            self._last_profile_id = profile_id
+        for question_id, profile_id, question in self._db.execute(
+            "SELECT id, profile_id, question FROM bank_questions WHERE id > ? ORDER BY id", (self._last_question_id,)
+        ).fetchall():
+            self._last_question_id = question_id
+            if profile_id not in self._profile_rows:
+                # Added by another worker after the profiles were read, or
+                # left pointing at a profile another worker evicted
+                profile = self._db.execute(
+                    "SELECT role, skills FROM bank_profiles WHERE id = ?", (profile_id,)
+                ).fetchone()
+                if profile is None:
+                    continue
+                self._index_profile(profile_id, *profile)
+            row = self._questions.add(tokenize(question))
+            self._texts.append(question)
+            self._seen.add(question.lower())
+            self._profile_questions[self._profile_rows[profile_id]].append(row)
+        self._synced = time.monotonic()
+
+    def find(self, role, skills, count, asked=(), limit=None):
+        """
+        Returns stored questions for the profiles closest to `role` and
+        `skills` (at least `min_similarity` alike), best match first,
+        leaving out near-duplicates of the `asked` questions. A lookup that
+        finds `count` is a hit; up to `limit` (default `count`) are returned.
+        """
+        with self._lock, span("question_bank_find"):
+            if time.monotonic() - self._synced >= self.sync_interval:
+                self._sync()
+            self._stats["lookups"] += 1
+            questions = []
+            if len(self._roles) and count > 0:
+                similarity = (self.role_weight * self._roles.similarity(tokenize(role))
+                              + (1 - self.role_weight) * self._skills.similarity(tokenize(normalize_skills(skills))))
+                order = np.argsort(-similarity, kind="stable")
+                candidates = [row for profile in order[similarity[order] >= self.min_similarity]
+                              for row in self._profile_questions[profile]]
+                if candidates and asked:
+                    asked_vectors = np.stack([self._questions.vector(tokenize(question)) for question in asked])
+                    closest = (self._questions.matrix()[candidates] @ asked_vectors.T).max(axis=1)
+                    asked_lower = {question.lower() for question in asked}
+                    candidates = [row for row, score in zip(candidates, closest)
+                                  if score < self.dedup_similarity and self._texts[row].lower() not in asked_lower]
+                questions = [self._texts[row] for row in candidates[:limit or count]]
+
+            result = "hits" if questions and len(questions) >= count else "partial_hits" if questions else "misses"
+            self._stats[result] += 1
+        bank_lookups.inc(result=_LOOKUP_RESULTS[result])
+        return questions
+
+    def add(self, role, skills, questions, company=""):
+        """
+        Stores model-generated questions for a profile; returns how many
+        were new. Profiles are shared across companies, so questions that
+        name the interview's `company` are not stored.
+        """
+        now = time.time()
+        key = profile_key(role, skills)
+        with self._lock, span("question_bank_add"):
+            self._sync()
+            added, vectors = [], []
+            for question in questions:
+                question = " ".join(str(question or "").split())
+                tokens = tokenize(question)
+                if not tokens:
+                    continue
+                if names_company(question, company):
+                    self._stats["company_specific"] += 1
+                    continue
+                vector = self._questions.vector(tokens)
+                # Near-duplicates of stored questions, or of others in this batch
+                duplicate = (
+                    question.lower() in self._seen
+                    or any(float(vector @ other) >= self.dedup_similarity for other in vectors)
+                    or (len(self._questions) > 0 and self._questions.similarity(tokens).max() >= self.dedup_similarity)
+                )
+                if duplicate:
+                    self._stats["duplicates"] += 1
+                    continue
+                added.append(question)
+                vectors.append(vector)
+            if not added:
+                return 0
+
+            # Not taken from the in-memory map: another worker may have added
+            # the same profile since the last sync, or evicted it
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO bank_profiles (key, role, skills, created) VALUES (?, ?, ?, ?)",
+                (key, " ".join(str(role or "").split()), normalize_skills(skills), now),
+            )
+            profile_id = cursor.lastrowid if cursor.rowcount == 1 else self._db.execute(
+                "SELECT id FROM bank_profiles WHERE key = ?", (key,)
+            ).fetchone()[0]
+            self._db.executemany(
+                "INSERT INTO bank_questions (profile_id, question, created) VALUES (?, ?, ?)",
+                [(profile_id, question, now) for question in added],
+            )
+            self._db.commit()
+            self._sync()
+            self._stats["added"] += len(added)
+            if len(self._questions) > self.max_questions:
+                self._evict()
+        return len(added)
+
+    def _evict(self):
+        keep = int(self.max_questions * 0.9)
+        self._db.execute(
+            "DELETE FROM bank_questions WHERE id NOT IN (SELECT id FROM bank_questions ORDER BY id DESC LIMIT ?)",
+            (keep,),
+        )
+        self._db.execute("DELETE FROM bank_profiles WHERE id NOT IN (SELECT DISTINCT profile_id FROM bank_questions)")
+        self._db.commit()
+        logger.info(f"Question bank full, kept the newest {keep} questions")
+        self._reset()
+        self._sync()
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM bank_questions")
+            self._db.execute("DELETE FROM bank_profiles")
+            self._db.commit()
+            self._reset()
+            self._sync()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._questions)
+            stats["profiles"] = len(self._roles)
+            stats["hit_rate"] = stats["hits"] / stats["lookups"] if stats["lookups"] else 0.0
+        return stats
+
+
+_bank = None
+_bank_lock = threading.Lock()
+
+
+def get_question_bank():
+    """
+    Returns the process-wide question bank shared by the Flask API and the
+    Streamlit app.
+    """
+    global _bank
+    if _bank is None:
+        with _bank_lock:
+            if _bank is None:
+                _bank = QuestionBank()
+                logger.info(f"Question bank ready ({_bank.stats()['size']} questions, "
+                            f"db={QUESTION_BANK_DB or 'memory only'})")
+    return _bank
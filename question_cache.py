@@ -0,0 +1,156 @@
+# question_cache.py
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Defaults can be overridden per deployment; an empty QUESTION_CACHE_DB keeps
+# the cache in-process only
+QUESTION_CACHE_SIZE = int(os.getenv("QUESTION_CACHE_SIZE", "256"))
+QUESTION_CACHE_TTL = float(os.getenv("QUESTION_CACHE_TTL", str(24 * 60 * 60)))
+QUESTION_CACHE_DB = os.getenv("QUESTION_CACHE_DB", "")
+QUESTION_CACHE_DB_SIZE = int(os.getenv("QUESTION_CACHE_DB_SIZE", "10000"))
+
+
+def _normalize(value):
+    return " ".join(str(value or "").lower().split())
+
+
+def _normalize_skills(skills):
+    # "Python, ML" and "ml,python" describe the same profile
+    parts = [_normalize(part) for part in str(skills or "").split(",")]
+    return sorted(part for part in parts if part)
+
+
+def cache_key(company, role, job_desc, skills):
+    """
+    Returns a content hash of the question prompt inputs. Case, whitespace
+    and skill order do not change the key.
+    """
+    payload = json.dumps(
+        [_normalize(company), _normalize(role), _normalize(job_desc), _normalize_skills(skills)],
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class QuestionCache:
+    """
+    Two-tier cache for generated interview questions: an in-process LRU in
+    front of an optional SQLite table. Both tiers honour the same TTL and
+    evict the least recently used entries once they are full.
+    """
+
+    def __init__(self, max_entries=QUESTION_CACHE_SIZE, ttl=QUESTION_CACHE_TTL,
+                 db_path=None, max_db_entries=QUESTION_CACHE_DB_SIZE):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_db_entries = max_db_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS question_cache ("
+                "key TEXT PRIMARY KEY, questions TEXT NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def get(self, key):
+        """Returns the cached questions for `key`, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created, questions = entry
+                if now - created < self.ttl:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    self._stats["memory_hits"] += 1
+                    return list(questions)
+                del self._entries[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT questions, created FROM question_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and now - row[1] < self.ttl:
+                    self._db.execute("UPDATE question_cache SET accessed = ? WHERE key = ?", (now, key))
+                    self._db.commit()
+                    questions = json.loads(row[0])
+                    self._remember(key, row[1], questions)
+                    self._stats["hits"] += 1
+                    self._stats["disk_hits"] += 1
+                    return list(questions)
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key, questions):
+        now = time.time()
+        questions = list(questions)
+        with self._lock:
+            self._remember(key, now, questions)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO question_cache (key, questions, created, accessed) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(questions), now, now),
+                )
+                self._db.execute("DELETE FROM question_cache WHERE created < ?", (now - self.ttl,))
+                self._db.execute(
+                    "DELETE FROM question_cache WHERE key NOT IN "
+                    "(SELECT key FROM question_cache ORDER BY accessed DESC LIMIT ?)",
+                    (self.max_db_entries,),
+                )
+                self._db.commit()
+
+    def _remember(self, key, created, questions):
+        self._entries[key] = (created, questions)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM question_cache")
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_question_cache():
+    """
+    Returns the process-wide question cache shared by the Flask API and the
+    Streamlit app.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = QuestionCache(db_path=QUESTION_CACHE_DB or None)
+                logger.info(f"Question cache ready (size={QUESTION_CACHE_SIZE}, ttl={QUESTION_CACHE_TTL:.0f}s, "
+                            f"db={QUESTION_CACHE_DB or 'memory only'})")
+    return _cache
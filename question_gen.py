@@ -1,12 +1,23 @@
 # question_gen.py
-import google.generativeai as genai
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from llm_client import get_client
+from question_cache import get_question_cache, cache_key
+from question_bank import QUESTION_BANK_ENABLED, get_question_bank
+from question_plan import INTERVIEW_QUESTION_COUNT
+from prompt_budget import QUESTION_PROMPT_TOKENS, fit_prompt, job_profile, compact_skills
 
-genai.configure(api_key="Place Your Own Key Here")
-model = genai.GenerativeModel("gemini-2.0-flash")
-def generate_prompt(company, role, job_desc, skills):
-    return f"""
+logger = logging.getLogger(__name__)
+
+model = get_client()
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="questions")
+
+def generate_prompt(company, role, job_desc, skills, count=INTERVIEW_QUESTION_COUNT, asked=(), history=()):
+    skills = compact_skills(skills)
+    def build(job_desc, history):
+        prompt = f"""
 You are an experienced interviewer at {company} for the role of {role}.
-Generate 5 diverse interview questions based on the following job description and required skills.
+Generate {count} diverse interview questions based on the following job description and required skills.
 
 Job Description:
 {job_desc}
@@ -15,21 +26,80 @@ Skills: {skills}
 
 Questions should be a mix of behavioral and technical.
 """
+        if asked:
+            prompt += "\nQuestions already asked in this interview (do not repeat them):\n"
+            prompt += "\n".join(f"- {question}" for question in asked) + "\n"
+        if history:
+            prompt += "\nThe candidate's answers so far:\n" + history + "\n"
+            prompt += "Where it helps, follow up on something specific the candidate said.\n"
+        return prompt
+
+    history_text = "\n".join(f"Q: {question}\nA: {answer}" for question, answer in history)
+    return fit_prompt("questions", QUESTION_PROMPT_TOKENS, build,
+                      job_desc=job_profile(role, job_desc, skills), history=history_text)
 
 
-def generate_questions_with_gemini(prompt: str):
+def generate_questions_with_gemini(prompt: str, count=INTERVIEW_QUESTION_COUNT, asked=()):
+    """
+    Returns (questions, complete), where `complete` is true only for a full
+    set written by the model; canned questions must not be cached or banked.
+    """
     # MOCK: Replace this with actual Gemini 2.0 Flash API call
     # Example response structure
-    return [
+    pool = [
         "Can you describe a challenging project you worked on and how you handled it?",
         "How would you optimize a Python-based web service for performance?",
         "What does good teamwork mean to you in a software development context?",
         "Can you explain the difference between supervised and unsupervised learning?",
-        "How do you prioritize tasks when working on multiple projects?"
+        "How do you prioritize tasks when working on multiple projects?",
+        "Tell me about a time you received critical feedback and what you did with it.",
+        "How would you design a system to process millions of events per day?",
+        "Describe a decision you made with incomplete information.",
+        "How do you approach testing code you did not write?",
+        "What would you do in your first month in this role?",
     ]
+    return [question for question in pool if question not in asked][:count], False
 
 
-def get_interview_questions(company, role, job_desc, skills):
-    prompt = generate_prompt(company, role, job_desc, skills)
-    questions = generate_questions_with_gemini(prompt)
+def get_interview_questions(company, role, job_desc, skills, fresh=False,
+                            count=INTERVIEW_QUESTION_COUNT, asked=(), history=()):
+    """
+    Returns up to `count` new questions. The first batch of a session comes
+    from the same cache as the Flask API, so identical job postings skip
+    generation; after that, questions the API stored in the question bank
+    for a similar role and skills are used before generating any.
+    """
+    cache = get_question_cache()
+    key = cache_key(company, role, job_desc, skills)
+    if not fresh and not asked:
+        questions = cache.get(key)
+        if questions:
+            return questions[:count]
+
+    questions, complete = [], False
+    if QUESTION_BANK_ENABLED and not fresh and not history:
+        try:
+            questions = get_question_bank().find(role, skills, count, asked)
+        except Exception as e:
+            logger.warning(f"Question bank lookup failed, generating instead: {str(e)}")
+    if len(questions) < count:
+        exclude = list(asked) + questions
+        prompt = generate_prompt(company, role, job_desc, skills, count - len(questions), exclude, history)
+        generated, complete = generate_questions_with_gemini(prompt, count - len(questions), exclude)
+        questions = questions + generated
+    # The cache is shared with the Flask API, so as there, only complete
+    # model output is stored, never canned or padded questions
+    if complete and not asked and not history:
+        cache.set(key, questions)
     return questions
+
+
+def submit_interview_questions(company, role, job_desc, skills, fresh=False,
+                               count=INTERVIEW_QUESTION_COUNT, asked=(), history=()):
+    """
+    Starts question generation in the background and returns its future,
+    so a Streamlit rerun that interrupts the wait can pick up the same
+    request instead of starting another one.
+    """
+    return _executor.submit(get_interview_questions, company, role, job_desc, skills, fresh,
+                            count, tuple(asked), tuple(history))
@@ -0,0 +1,225 @@
+# question_parser.py
+
+import json
+import logging
+import os
+import re
+from importlib import metadata
+
+from tracing import registry
+
+logger = logging.getLogger(__name__)
+
+
+def _sdk_supports_structured_output():
+    # response_mime_type and response_schema need google-generativeai 0.7+;
+    # older releases reject the whole request
+    try:
+        version = metadata.version("google-generativeai")
+    except metadata.PackageNotFoundError:
+        return True
+    return tuple(int(part) for part in re.findall(r"\d+", version)[:2]) >= (0, 7)
+
+
+QUESTION_COUNT = 5
+# Ask the model for JSON matching QUESTIONS_SCHEMA instead of a numbered list
+STRUCTURED_OUTPUT = os.getenv("QUESTIONS_STRUCTURED_OUTPUT", "1") == "1"
+if STRUCTURED_OUTPUT and not _sdk_supports_structured_output():
+    logger.warning("google-generativeai is older than 0.7; asking for numbered questions instead of JSON")
+    STRUCTURED_OUTPUT = False
+# Re-ask the model once for questions missing from a short reply
+REPAIR_MISSING = os.getenv("QUESTIONS_REPAIR", "1") == "1"
+# Shorter lines are headings or noise, not questions
+MIN_QUESTION_LENGTH = 10
+
+QUESTIONS_SCHEMA = {
+    "type": "object",
+    "properties": {"questions": {"type": "array", "items": {"type": "string"}}},
+    "required": ["questions"],
+}
+
+parse_outcomes = registry.counter("question_parse_total", "Question replies parsed, by format and outcome")
+
+# A list marker at the start of a line: "1.", "2)", "Q3:", "**Question 4:**",
+# "### 5." or a bullet. Group 1 or 2 is set for numbered items; a number
+# alone on its line ("Question 3") heads the question on the next line.
+_MARKER = re.compile(
+    r"""^\s*(?:\#{1,6}\s*)?(?:\*\*)?
+    (?:
+        (?:q(?:uestion)?\s*)?(\d{1,2})(?:\*\*)?\s*[.):\-]   # 1.  1)  Q1:  Question 1 -
+      | q(?:uestion)?\s*(\d{1,2})(?:\*\*)?(?=\s|$)(?!\s*[.):\-])  # Question 1 What...
+      | [-*•](?=\s)                                     # - * bullets
+    )(?:\*\*)?\s*""",
+    re.IGNORECASE | re.VERBOSE,
+)
+# A short bold or colon-terminated category label ahead of the question,
+# e.g. "**Behavioral:** Tell me about..." or "Technical -"
+_LABEL = re.compile(r"^(?:\*\*[^*?]{1,40}?\*\*\s*[:\-]?|[A-Z][\w /&]{0,30}:)\s+(?=\S)")
+_FENCE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.IGNORECASE)
+# Emphasis, quotes and list punctuation around an item
+_QUOTES = " \t\"“”,"
+_WRAPPERS = _QUOTES + "*_"
+# A complete JSON string literal; group 2 is set when it is an object key
+_STRING = re.compile(r'"((?:[^"\\\n]|\\.)*)"(\s*:)?')
+
+
+def _clean(text):
+    text = text.strip(_QUOTES)
+    if text.startswith("**") or ":" in text[:42]:
+        text = _LABEL.sub("", text, count=1)
+    return " ".join(text.strip(_WRAPPERS).split())
+
+
+def _json_string(literal):
+    try:
+        return json.loads(f'"{literal}"')
+    except ValueError:
+        return literal
+
+
+def _is_label(text):
+    """A line like "**Technical**" or "Behavioral:" that introduces the question on the next line."""
+    return "?" not in text and (text.endswith(":") or (text.startswith("**") and text.endswith("**"))) and len(text) < 60
+
+
+def _unique(questions, existing=()):
+    seen = {q.lower() for q in existing}
+    result = []
+    for question in questions:
+        key = question.lower()
+        if len(question) >= MIN_QUESTION_LENGTH and key not in seen:
+            seen.add(key)
+            result.append(question)
+    return result
+
+
+def parse_questions_json(text):
+    """
+    Parses a structured reply: {"questions": [...]} or a bare list, of
+    strings or {"question": ...} objects, optionally in a code fence.
+    Raises ValueError if the reply is not valid JSON of that shape.
+    """
+    data = json.loads(_FENCE.sub("", text))
+    if isinstance(data, dict):
+        data = data.get("questions")
+    if not isinstance(data, list):
+        raise ValueError("Expected a list of questions")
+    questions = []
+    for item in data:
+        if isinstance(item, dict):
+            item = item.get("question") or item.get("text")
+        if isinstance(item, str):
+            questions.append(_clean(item))
+    return _unique(questions)
+
+
+def parse_questions_text(text):
+    """
+    Single-pass parser for free-text replies. Collects numbered items,
+    bulleted items and bare lines ending in "?" as it goes, and returns
+    numbered items when there are any, else bullets, else bare questions.
+    Handles Markdown emphasis, category labels, headings, wrapped lines
+    and questions placed on the line after their label.
+    """
+    numbered, bulleted, bare = [], [], []
+    current = None  # the list item still open for continuation lines
+
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line:
+            current = None
+            continue
+
+        match = _MARKER.match(line)
+        if match:
+            target = numbered if match.group(1) or match.group(2) else bulleted
+            if target is bulleted and numbered and raw[:1].isspace():
+                # Indented bullets under a numbered item are commentary on it
+                continue
+            target.append(line[match.end():])
+            current = target
+            continue
+
+        if current is not None:
+            previous = current[-1]
+            if not previous or _is_label(previous):
+                current[-1] = line
+                continue
+            if not previous.rstrip("*\"").endswith(("?", ".", "!")):
+                current[-1] = f"{previous} {line}"
+                continue
+        current = None
+        if line.rstrip(_WRAPPERS).endswith("?"):
+            bare.append(line)
+
+    for items in (numbered, bulleted, bare):
+        questions = _unique(_clean(item) for item in items)
+        if questions:
+            return questions
+    return []
+
+
+def extract_questions(text, count=QUESTION_COUNT):
+    """
+    Returns (questions, format) for a model reply, trying JSON first when it
+    looks like JSON and the text parser otherwise or on failure. At most
+    `count` questions are returned; there may be fewer.
+    """
+    stripped = text.strip()
+    if stripped.startswith(("{", "[", "```")):
+        try:
+            questions = parse_questions_json(stripped)
+            parse_outcomes.inc(format="json", outcome="complete" if len(questions) >= count else "short")
+            return questions[:count], "json"
+        except ValueError as e:
+            # Truncated or malformed JSON: keep every complete string value
+            # that reads like a sentence (not a key or an enum like "technical")
+            logger.info(f"Structured question reply did not parse ({str(e)}), salvaging strings")
+            strings = (_json_string(s) for s, key in _STRING.findall(stripped) if not key and " " in s)
+            questions = _unique(_clean(s) for s in strings)
+            if questions:
+                parse_outcomes.inc(format="json", outcome="salvaged")
+                return questions[:count], "json"
+
+    questions = parse_questions_text(stripped)
+    parse_outcomes.inc(format="text", outcome="complete" if len(questions) >= count else "short")
+    return questions[:count], "text"
+
+
+def merge_questions(questions, extra, count=QUESTION_COUNT, asked=()):
+    """
+    Appends the questions from `extra` that are not already in `questions`
+    or `asked` (earlier in the interview), up to `count` in total.
+    """
+    return (questions + _unique(extra, existing=list(asked) + questions))[:count]
+
+
+def format_instructions(count=QUESTION_COUNT, structured=STRUCTURED_OUTPUT):
+    if structured:
+        return (f'Return ONLY a JSON object of the form {{"questions": ["...", "..."]}} '
+                f"with exactly {count} questions.")
+    lines = "\n".join(f"    {i}. [Question {i}]" for i in range(1, count + 1))
+    return f"Format your response as follows (return ONLY the {count} questions, one per line):\n{lines}"
+
+
+def generation_options(structured=STRUCTURED_OUTPUT):
+    """Extra generate_content arguments for a question request."""
+    if not structured:
+        return {}
+    return {"generation_config": {"response_mime_type": "application/json", "response_schema": QUESTIONS_SCHEMA}}
+
+
+def repair_prompt(prompt, questions, missing, structured=STRUCTURED_OUTPUT):
+    """
+    A follow-up prompt asking only for the `missing` questions, listing the
+    ones already accepted so they are not repeated.
+    """
+    asked = "\n".join(f"- {q}" for q in questions) or "- (none)"
+    return f"""{prompt}
+
+The following questions have already been chosen:
+{asked}
+
+Instead of the full set, generate only {missing} more question(s), different from these.
+{format_instructions(missing, structured)}
+"""
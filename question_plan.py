@@ -0,0 +1,46 @@
+# question_plan.py
+
+import os
+
+# Interview length, shared by the Flask API and the Streamlit app. Questions
+# are generated in small batches as the candidate progresses, so the first
+# one is ready sooner and an interview abandoned early never pays for the rest
+INTERVIEW_QUESTION_COUNT = int(os.getenv("INTERVIEW_QUESTION_COUNT", "5"))
+MAX_QUESTION_COUNT = int(os.getenv("MAX_QUESTION_COUNT", "20"))
+QUESTION_BATCH_SIZE = int(os.getenv("QUESTION_BATCH_SIZE", "2"))
+# Generated questions kept ready beyond the one being answered; the next
+# batch starts when fewer are left
+QUESTION_LOOKAHEAD = int(os.getenv("QUESTION_LOOKAHEAD", "1"))
+# Let later batches follow up on the candidate's earlier answers
+ADAPTIVE_QUESTIONS = os.getenv("ADAPTIVE_QUESTIONS", "0") == "1"
+
+
+def question_count(requested=None):
+    """The number of questions for a session, clamped to 1..MAX_QUESTION_COUNT."""
+    try:
+        count = int(requested) if requested else INTERVIEW_QUESTION_COUNT
+    except (TypeError, ValueError):
+        count = INTERVIEW_QUESTION_COUNT
+    return max(1, min(count, MAX_QUESTION_COUNT))
+
+
+def next_batch_size(generated, count, index):
+    """
+    How many questions to generate now for a session with `generated`
+    questions out of `count`, currently on question `index`. Zero while
+    enough are ready ahead of the candidate.
+    """
+    if generated >= count:
+        return 0
+    if generated and generated - index - 1 >= QUESTION_LOOKAHEAD:
+        return 0
+    return min(QUESTION_BATCH_SIZE, count - generated)
+
+
+def answer_history(questions, answers, limit=3, max_chars=500):
+    """
+    The most recent (question, answer) pairs for an adaptive follow-up
+    prompt, with long answers cut to `max_chars`.
+    """
+    pairs = [(q, a) for q, a in zip(questions, answers) if a]
+    return [(q, a if len(a) <= max_chars else a[:max_chars] + "...") for q, a in pairs[-limit:]]
@@ -0,0 +1,251 @@
+# rate_limit.py
+
+import contextvars
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+
+from tracing import registry
+
+logger = logging.getLogger(__name__)
+
+# Per-client budget for expensive endpoints (model and transcription calls):
+# RATE_LIMIT_RATE tokens per second, bursts up to RATE_LIMIT_BURST
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMIT_RATE = float(os.getenv("RATE_LIMIT_RATE", "0.5"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "20"))
+# "memory" keeps buckets in-process; "sqlite" shares them between workers
+# on one host through RATE_LIMIT_DB
+RATE_LIMIT_STORE = os.getenv("RATE_LIMIT_STORE", "memory")
+RATE_LIMIT_DB = os.getenv("RATE_LIMIT_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "rate_limits.db"))
+# Use the first X-Forwarded-For address as the client behind a reverse proxy
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "0") == "1"
+# Buckets idle this long are full again and can be forgotten
+BUCKET_IDLE_SECONDS = RATE_LIMIT_BURST / RATE_LIMIT_RATE if RATE_LIMIT_RATE > 0 else 3600
+
+ANONYMOUS = "anonymous"
+
+queue_depth = registry.gauge("scheduler_queue_depth", "Calls waiting for a slot, by pool")
+queue_wait = registry.histogram("scheduler_wait_seconds", "Time calls waited for a slot, by pool")
+
+_client = contextvars.ContextVar("rate_limit_client", default=ANONYMOUS)
+
+
+def current_client():
+    """The client the current request or job runs for (a session or IP key)."""
+    return _client.get()
+
+
+def set_client(client):
+    return _client.set(client or ANONYMOUS)
+
+
+def run_as(client, fn, *args, **kwargs):
+    """Calls `fn` with `client` as the current client, e.g. on a worker thread."""
+    token = _client.set(client or ANONYMOUS)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        _client.reset(token)
+
+
+class MemoryBucketStore:
+    """In-process token buckets, one per key."""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._next_prune = time.monotonic() + BUCKET_IDLE_SECONDS
+
+    def take(self, key, cost, rate, burst):
+        """
+        Takes `cost` tokens from `key`'s bucket. Returns 0 if they were
+        available, else the seconds until they will be (nothing is taken).
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= cost:
+                self._buckets[key] = (tokens - cost, now)
+                retry_after = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                retry_after = (cost - tokens) / rate if rate > 0 else float("inf")
+            if now >= self._next_prune:
+                cutoff = now - BUCKET_IDLE_SECONDS
+                self._buckets = {k: v for k, v in self._buckets.items() if v[1] >= cutoff}
+                self._next_prune = now + BUCKET_IDLE_SECONDS
+        return retry_after
+
+
+class SQLiteBucketStore:
+    """
+    Token buckets in a SQLite table, so all workers on a host draw from the
+    same budget. Each take is one IMMEDIATE transaction.
+    """
+
+    def __init__(self, path=RATE_LIMIT_DB):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+        self._next_prune = time.time() + BUCKET_IDLE_SECONDS
+
+    def take(self, key, cost, rate, burst):
+        # Wall-clock time: monotonic clocks are not comparable across processes
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute("SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+                tokens, updated = row if row else (burst, now)
+                tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+                if tokens >= cost:
+                    tokens -= cost
+                    retry_after = 0.0
+                else:
+                    retry_after = (cost - tokens) / rate if rate > 0 else float("inf")
+                self._db.execute(
+                    "INSERT INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                    (key, tokens, now),
+                )
+                if now >= self._next_prune:
+                    self._db.execute("DELETE FROM rate_buckets WHERE updated < ?", (now - BUCKET_IDLE_SECONDS,))
+                    self._next_prune = now + BUCKET_IDLE_SECONDS
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return retry_after
+
+
+STORES = {"memory": MemoryBucketStore, "sqlite": SQLiteBucketStore}
+
+
+class RateLimiter:
+    """
+    Per-client token bucket limiter. `store` is any object with
+    `take(key, cost, rate, burst) -> retry_after`, so buckets can live in a
+    shared service (e.g. Redis) for multi-host deployments.
+    """
+
+    def __init__(self, store, rate=RATE_LIMIT_RATE, burst=RATE_LIMIT_BURST):
+        self.store = store
+        self.rate = rate
+        self.burst = burst
+
+    def check(self, client, cost=1):
+        """Returns 0 if `client` may proceed, else the seconds to wait before retrying."""
+        if cost > self.burst:
+            # Could never be granted; charge a full bucket instead
+            cost = self.burst
+        try:
+            return self.store.take(client, cost, self.rate, self.burst)
+        except Exception as e:
+            # Never turn a broken limiter into an outage
+            logger.error(f"Rate limit store failed, allowing request: {str(e)}")
+            return 0.0
+
+
+def retry_after_header(seconds):
+    return str(max(1, math.ceil(seconds)))
+
+
+class _Waiter:
+    def __init__(self):
+        self.event = threading.Event()
+        self.granted = False
+
+
+class FairScheduler:
+    """
+    Hands out a fixed number of concurrent slots. While all are busy,
+    callers queue per client and freed slots go to the queued clients in
+    turn, one call each, so a client with many queued calls cannot starve
+    one with a single call.
+    """
+
+    def __init__(self, name, slots):
+        self.name = name
+        self.slots = slots
+        self._free = slots
+        self._queues = OrderedDict()
+        self._waiting = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, client=None, timeout=None):
+        """Waits up to `timeout` seconds for a slot. Returns False if none freed up."""
+        client = client or current_client()
+        started = time.monotonic()
+        with self._lock:
+            if self._free > 0 and not self._queues:
+                self._free -= 1
+                queue_wait.observe(0.0, pool=self.name)
+                return True
+            waiter = _Waiter()
+            self._queues.setdefault(client, deque()).append(waiter)
+            self._waiting += 1
+            queue_depth.set(self._waiting, pool=self.name)
+
+        waiter.event.wait(timeout)
+        with self._lock:
+            if not waiter.granted:
+                queue = self._queues.get(client)
+                queue.remove(waiter)
+                if not queue:
+                    del self._queues[client]
+                self._waiting -= 1
+                queue_depth.set(self._waiting, pool=self.name)
+                return False
+        queue_wait.observe(time.monotonic() - started, pool=self.name)
+        return True
+
+    def release(self):
+        with self._lock:
+            if not self._queues:
+                self._free += 1
+                return
+            # Hand the slot straight to the client at the front of the rotation
+            client, queue = next(iter(self._queues.items()))
+            waiter = queue.popleft()
+            if queue:
+                self._queues.move_to_end(client)
+            else:
+                del self._queues[client]
+            self._waiting -= 1
+            queue_depth.set(self._waiting, pool=self.name)
+            waiter.granted = True
+            waiter.event.set()
+
+    def stats(self):
+        with self._lock:
+            return {"slots": self.slots, "busy": self.slots - self._free, "waiting": self._waiting,
+                    "clients_waiting": len(self._queues)}
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Returns the process-wide limiter using the store selected by RATE_LIMIT_STORE."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                if RATE_LIMIT_STORE not in STORES:
+                    raise ValueError(f"Unknown RATE_LIMIT_STORE {RATE_LIMIT_STORE!r}")
+                _limiter = RateLimiter(STORES[RATE_LIMIT_STORE]())
+                logger.info(f"Rate limiter ready (store={RATE_LIMIT_STORE}, rate={RATE_LIMIT_RATE}/s, "
+                            f"burst={RATE_LIMIT_BURST:.0f})")
+    return _limiter
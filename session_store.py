@@ -0,0 +1,292 @@
+# session_store.py
+
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from question_plan import INTERVIEW_QUESTION_COUNT
+
+logger = logging.getLogger(__name__)
+
+# "sqlite" (default) persists to SESSION_DB; "memory" keeps sessions in-process
+SESSION_STORE = os.getenv("SESSION_STORE", "sqlite")
+SESSION_DB = os.getenv("SESSION_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "sessions.db"))
+# Write-behind: dirty sessions are flushed together at most this often
+SESSION_FLUSH_INTERVAL = float(os.getenv("SESSION_FLUSH_INTERVAL", "0.5"))
+SESSION_FLUSH_BATCH = int(os.getenv("SESSION_FLUSH_BATCH", "100"))
+
+
+def new_session(company="", role="", job_desc="", skills="", question_count=INTERVIEW_QUESTION_COUNT, adaptive=False):
+    now = time.time()
+    return {
+        "id": uuid.uuid4().hex,
+        "company": company,
+        "role": role,
+        "jobDescription": job_desc,
+        "skills": skills,
+        # Questions are generated in batches up to questionCount as the
+        # interview progresses
+        "questionCount": question_count,
+        "adaptive": adaptive,
+        "questions": [],
+        "answers": [],
+        "feedback": [],
+        "currentQuestionIndex": 0,
+        "complete": False,
+        "created": now,
+        "updated": now,
+    }
+
+
+def _set_at(values, index, value):
+    while len(values) <= index:
+        values.append(None)
+    values[index] = value
+
+
+class SessionStore:
+    """
+    Interview state keyed by session id, shared by the Flask API and the
+    Streamlit app. Implementations must be safe to call from many threads.
+    """
+
+    def __init__(self):
+        # Serializes read-modify-write updates within this process
+        self._update_lock = threading.Lock()
+
+    def get(self, session_id):
+        raise NotImplementedError
+
+    def put(self, session):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+    def _modify(self, session_id, change):
+        """Applies `change` (session -> session) to a stored session. Returns the result or None."""
+        with self._update_lock:
+            session = self.get(session_id)
+            if session is None:
+                return None
+            session = change(session)
+            self.put(session)
+            return session
+
+    def create(self, company="", role="", job_desc="", skills="", question_count=INTERVIEW_QUESTION_COUNT, adaptive=False):
+        session = new_session(company, role, job_desc, skills, question_count, adaptive)
+        self.put(session)
+        return session
+
+    def update(self, session_id, **fields):
+        """Merges `fields` into a session. Returns the updated session or None."""
+        updated = time.time()
+        # Each replay gets its own copy, so callers can't alter a queued change
+        encoded = json.dumps(fields)
+
+        def change(session):
+            session.update(json.loads(encoded))
+            session["updated"] = updated
+            return session
+
+        return self._modify(session_id, change)
+
+    def extend_questions(self, session_id, questions):
+        """
+        Appends newly generated questions, skipping any already asked and
+        stopping at the session's questionCount. Returns the updated session or None.
+        """
+        updated = time.time()
+
+        def change(session):
+            count = session.get("questionCount") or len(session["questions"]) + len(questions)
+            for question in questions:
+                if len(session["questions"]) >= count:
+                    break
+                if question not in session["questions"]:
+                    session["questions"].append(question)
+            session["updated"] = updated
+            return session
+
+        return self._modify(session_id, change)
+
+    def save_answer(self, session_id, index, answer=None, feedback=None):
+        """Records the answer and/or feedback for question `index`."""
+        updated = time.time()
+
+        def change(session):
+            if answer is not None:
+                _set_at(session["answers"], index, answer)
+            if feedback is not None:
+                _set_at(session["feedback"], index, feedback)
+            session["updated"] = updated
+            return session
+
+        return self._modify(session_id, change)
+
+
+class MemorySessionStore(SessionStore):
+    def __init__(self):
+        super().__init__()
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return json.loads(json.dumps(session)) if session is not None else None
+
+    def put(self, session):
+        with self._lock:
+            self._sessions[session["id"]] = json.loads(json.dumps(session))
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    SQLite-backed store with write-behind batching, safe to share between
+    worker processes. Writes are queued in memory as per-field changes and
+    return immediately; a background thread replays them onto the current
+    rows inside one `BEGIN IMMEDIATE` transaction every `flush_interval`
+    seconds, so concurrent workers merge rather than overwrite each other.
+    Reads apply this process's queued changes to the stored row; another
+    process's writes become visible once it flushes.
+    """
+
+    def __init__(self, path=SESSION_DB, flush_interval=SESSION_FLUSH_INTERVAL, flush_batch=SESSION_FLUSH_BATCH):
+        super().__init__()
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        # Transactions are managed explicitly so the flush can take the
+        # write lock before reading the rows it merges into
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "id TEXT PRIMARY KEY, data TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        self._db_lock = threading.Lock()
+        # Session id -> changes not yet written, oldest first. Every change
+        # is idempotent, so replaying one already committed is harmless.
+        self._dirty = {}
+        # Batch being written; still applied for readers until committed
+        self._flushing = {}
+        self._dirty_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._flusher = threading.Thread(target=self._flush_loop, name="session-flush", daemon=True)
+        self._flusher.start()
+
+    def _read(self, session_id):
+        with self._db_lock:
+            row = self._db.execute("SELECT data FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get(self, session_id):
+        # Take the queued changes before reading the row: if a flush commits
+        # in between, they are applied twice, which leaves the same result
+        with self._dirty_lock:
+            changes = self._flushing.get(session_id, []) + self._dirty.get(session_id, [])
+        session = self._read(session_id)
+        for change in changes:
+            session = change(session)
+        return session
+
+    def _queue(self, session_id, change):
+        with self._dirty_lock:
+            self._dirty.setdefault(session_id, []).append(change)
+            pending = len(self._dirty)
+        if pending >= self.flush_batch:
+            self._wake.set()
+
+    def put(self, session):
+        document = json.dumps(session)
+        self._queue(session["id"], lambda _: json.loads(document))
+
+    def _modify(self, session_id, change):
+        with self._update_lock:
+            session = self.get(session_id)
+            if session is None:
+                return None
+            self._queue(session_id, lambda stored: change(stored) if stored is not None else None)
+            return change(session)
+
+    def flush(self):
+        with self._flush_lock:
+            with self._dirty_lock:
+                batch, self._dirty = self._dirty, {}
+                self._flushing = batch
+            if not batch:
+                return
+            try:
+                with self._db_lock:
+                    self._db.execute("BEGIN IMMEDIATE")
+                    try:
+                        for sid, changes in batch.items():
+                            row = self._db.execute("SELECT data FROM sessions WHERE id = ?", (sid,)).fetchone()
+                            session = json.loads(row[0]) if row else None
+                            for change in changes:
+                                session = change(session)
+                            if session is None:
+                                continue
+                            self._db.execute(
+                                "INSERT INTO sessions (id, data, updated) VALUES (?, ?, ?) "
+                                "ON CONFLICT(id) DO UPDATE SET data = excluded.data, updated = excluded.updated",
+                                (sid, json.dumps(session), session["updated"]),
+                            )
+                        self._db.execute("COMMIT")
+                    except BaseException:
+                        self._db.execute("ROLLBACK")
+                        raise
+            except sqlite3.Error as e:
+                logger.error(f"Session flush failed, will retry: {str(e)}")
+                with self._dirty_lock:
+                    # Requeue ahead of changes that arrived during the failed flush
+                    for sid, changes in batch.items():
+                        self._dirty[sid] = changes + self._dirty.get(sid, [])
+            finally:
+                with self._dirty_lock:
+                    self._flushing = {}
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        self._flusher.join(timeout=5)
+        self.flush()
+        with self._db_lock:
+            self._db.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_session_store():
+    """Returns the process-wide session store selected by SESSION_STORE."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if SESSION_STORE == "memory":
+                    _store = MemorySessionStore()
+                else:
+                    _store = SQLiteSessionStore()
+                # Pending write-behind batches must reach disk on exit
+                atexit.register(_store.close)
+                logger.info(f"Session store ready ({SESSION_STORE})")
+    return _store
@@ -0,0 +1,64 @@
+# singleflight.py
+
+import hashlib
+import json
+import threading
+from concurrent.futures import Future
+
+
+def request_key(prompt, options=None):
+    """
+    A hash of a model request: the prompt with whitespace collapsed (so
+    indentation differences between callers do not matter) and its
+    generation options.
+    """
+    payload = json.dumps([" ".join(prompt.split()), options or {}], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key. The first caller runs the
+    function; callers arriving while it is running wait for it and receive
+    the same result, or the same exception. Nothing is kept once the call
+    finishes, so this is not a cache: a later call runs again.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "shared": 0}
+
+    def do(self, key, fn, timeout=None):
+        """
+        Returns (result, shared): `fn()`'s result, and whether it came from
+        another caller's call. Followers wait up to `timeout` seconds.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self._stats["calls"] += 1
+            else:
+                self._stats["shared"] += 1
+        if not leader:
+            return future.result(timeout=timeout), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls)
+        return stats
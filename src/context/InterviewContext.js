@@ -1,9 +1,31 @@
-import React, { createContext, useState, useContext } from 'react';
+import React, { createContext, useState, useContext, useEffect, useRef } from 'react';
 import axios from 'axios';
 
 // API URL - change this to your Flask server URL
 const API_BASE_URL = 'http://localhost:5000/api';
 
+// localStorage key holding the id of the interview in progress
+const SESSION_STORAGE_KEY = 'interviewSessionId';
+
+// Interview length when the candidate does not choose one; the server
+// clamps it to its own maximum
+const DEFAULT_QUESTION_COUNT = 5;
+
+// Requests over the server's per-client rate limit are retried once after
+// its Retry-After delay, when that is short enough to wait for
+const MAX_RETRY_AFTER_SECONDS = 30;
+
+axios.interceptors.response.use(null, async (error) => {
+  const { config, response } = error;
+  const retryAfter = Number(response?.headers?.['retry-after']);
+  if (response?.status === 429 && config && !config.rateLimitRetried && retryAfter <= MAX_RETRY_AFTER_SECONDS) {
+    config.rateLimitRetried = true;
+    await new Promise((resolve) => setTimeout(resolve, retryAfter * 1000));
+    return axios(config);
+  }
+  return Promise.reject(error);
+});
+
 const InterviewContext = createContext();
 
 export const useInterview = () => useContext(InterviewContext);
@@ -14,13 +36,77 @@ export const InterviewProvider = ({ children }) => {
   const [jobDescription, setJobDescription] = useState('');
   const [skills, setSkills] = useState('');
   const [questions, setQuestions] = useState([]);
+  // Questions are generated in batches, so fewer than questionCount may be loaded
+  const [questionCount, setQuestionCount] = useState(DEFAULT_QUESTION_COUNT);
+  const [adaptive, setAdaptive] = useState(false);
   const [currentQuestionIndex, setCurrentQuestionIndex] = useState(0);
   const [answers, setAnswers] = useState([]);
   const [feedback, setFeedback] = useState([]);
+  // Local answer metrics (pace, fillers, STAR coverage), ready before the feedback
+  const [answerMetrics, setAnswerMetrics] = useState([]);
   const [isLoading, setIsLoading] = useState(false);
   const [isComplete, setIsComplete] = useState(false);
   const [error, setError] = useState(null);
   const [apiWarning, setApiWarning] = useState(null);
+  const [sessionId, setSessionId] = useState(() => localStorage.getItem(SESSION_STORAGE_KEY));
+  // Incremental transcription: the open stream and the chain of chunk uploads
+  const transcriptionStreamRef = useRef(null);
+  const chunkUploadsRef = useRef(Promise.resolve());
+
+  // Name the session on every request so rate limits apply per interview
+  // rather than to everyone behind the same network address
+  useEffect(() => {
+    if (sessionId) {
+      axios.defaults.headers.common['X-Session-Id'] = sessionId;
+    } else {
+      delete axios.defaults.headers.common['X-Session-Id'];
+    }
+  }, [sessionId]);
+
+  // Restore an interview left in progress (e.g. after a page reload)
+  useEffect(() => {
+    if (!sessionId || questions.length) return;
+    
+    axios.get(`${API_BASE_URL}/sessions/${sessionId}`)
+      .then(response => {
+        const session = response.data;
+        console.log("Restored interview session:", session.id);
+        setCompany(session.company);
+        setRole(session.role);
+        setJobDescription(session.jobDescription);
+        setSkills(session.skills);
+        setQuestions(session.questions);
+        setQuestionCount(session.questionCount || session.questions.length);
+        setAdaptive(Boolean(session.adaptive));
+        setAnswers(session.answers);
+        setFeedback(session.feedback);
+        setCurrentQuestionIndex(session.currentQuestionIndex);
+        setIsComplete(session.complete);
+      })
+      .catch(error => {
+        console.warn("Could not restore interview session:", error);
+        localStorage.removeItem(SESSION_STORAGE_KEY);
+        setSessionId(null);
+      });
+    // Only runs for the session id found at startup
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, []);
+
+  const rememberSession = (id) => {
+    setSessionId(id);
+    if (id) {
+      localStorage.setItem(SESSION_STORAGE_KEY, id);
+    } else {
+      localStorage.removeItem(SESSION_STORAGE_KEY);
+    }
+  };
+
+  // Record progress on the server so the interview can be resumed later
+  const updateSession = (fields) => {
+    if (!sessionId) return;
+    axios.patch(`${API_BASE_URL}/sessions/${sessionId}`, fields)
+      .catch(error => console.warn("Could not save interview progress:", error));
+  };
 
   // Check if the API is running
   const checkApiStatus = async () => {
@@ -52,17 +138,22 @@ export const InterviewProvider = ({ children }) => {
         company,
         role,
         jobDescription,
-        skills
+        skills,
+        questionCount,
+        adaptive
       });
       
       const response = await axios.post(`${API_BASE_URL}/questions`, {
         company,
         role,
         jobDescription,
-        skills
+        skills,
+        questionCount,
+        adaptive
       });
       
       console.log("API Response:", response.data);
+      rememberSession(response.data.sessionId);
       
       // Check for warnings
       if (response.data.warning) {
@@ -72,6 +163,7 @@ export const InterviewProvider = ({ children }) => {
       
       if (response.data.questions && response.data.questions.length > 0) {
         setQuestions(response.data.questions);
+        setQuestionCount(response.data.questionCount || response.data.questions.length);
       } else {
         throw new Error("No questions received from API");
       }
@@ -99,14 +191,16 @@ export const InterviewProvider = ({ children }) => {
         'Do you have any questions about the company or the role?'
       ];
       setQuestions(defaultQuestions);
+      setQuestionCount(defaultQuestions.length);
       console.log("Using default questions due to error");
     } finally {
       setIsLoading(false);
     }
   };
 
-  // Transcribe audio to text
-  const transcribeAudio = async (audioBlob) => {
+  // Transcribe audio to text. `question` and `duration` (seconds) let the
+  // server return the answer's metrics with the transcription
+  const transcribeAudio = async (audioBlob, { question, duration } = {}) => {
     setIsLoading(true);
     
     try {
@@ -119,6 +213,8 @@ export const InterviewProvider = ({ children }) => {
       // Create FormData object to send audio file
       const formData = new FormData();
       formData.append('audio', audioBlob, 'recording.webm');
+      if (question) formData.append('question', question);
+      if (duration) formData.append('duration', duration);
       
       console.log("Sending audio for transcription...");
       
@@ -131,7 +227,7 @@ export const InterviewProvider = ({ children }) => {
       console.log("Transcription API Response:", response.data);
       
       if (response.data.transcription) {
-        return response.data.transcription;
+        return { transcription: response.data.transcription, metrics: response.data.metrics || null };
       } else {
         throw new Error("No transcription received from API");
       }
@@ -146,18 +242,130 @@ export const InterviewProvider = ({ children }) => {
       }
       
       setError(`Failed to transcribe audio: ${errorMsg}`);
-      return "Error transcribing audio. Please try again.";
+      return { transcription: "Error transcribing audio. Please try again.", metrics: null };
     } finally {
       setIsLoading(false);
     }
   };
 
+  // Open a transcription stream when recording starts; failures fall back to a single upload
+  const startTranscriptionStream = async () => {
+    transcriptionStreamRef.current = null;
+    chunkUploadsRef.current = Promise.resolve();
+    try {
+      const response = await axios.post(`${API_BASE_URL}/transcribe/stream`);
+      transcriptionStreamRef.current = response.data.streamId;
+    } catch (error) {
+      console.warn("Could not open a transcription stream, will upload after recording:", error);
+    }
+  };
+
+  // Upload a timesliced chunk while the candidate is still speaking.
+  // Uploads are chained so they reach the server in recording order.
+  const sendAudioChunk = (chunk, segment) => {
+    const streamId = transcriptionStreamRef.current;
+    if (!streamId) return;
+    
+    chunkUploadsRef.current = chunkUploadsRef.current.then(async () => {
+      if (transcriptionStreamRef.current !== streamId) return;
+      try {
+        await axios.post(`${API_BASE_URL}/transcribe/stream/${streamId}/chunk`, chunk, {
+          params: { segment },
+          headers: { 'Content-Type': 'application/octet-stream' }
+        });
+      } catch (error) {
+        console.warn("Chunk upload failed, will upload after recording:", error);
+        transcriptionStreamRef.current = null;
+      }
+    });
+  };
+
+  // Collect the transcript of a stream, and its metrics, once recording has stopped
+  const finishTranscriptionStream = async ({ question, duration } = {}) => {
+    await chunkUploadsRef.current;
+    const streamId = transcriptionStreamRef.current;
+    transcriptionStreamRef.current = null;
+    if (!streamId) {
+      throw new Error("No transcription stream");
+    }
+    
+    const response = await axios.post(`${API_BASE_URL}/transcribe/stream/${streamId}/finish`, { question, duration });
+    if (!response.data.transcription) {
+      throw new Error("No transcription received from stream");
+    }
+    return { transcription: response.data.transcription, metrics: response.data.metrics || null };
+  };
+
+  // Stream feedback over Server-Sent Events, calling onChunk with the text so far
+  const streamFeedback = async (question, answer, onChunk) => {
+    const response = await fetch(`${API_BASE_URL}/feedback/stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        'Accept': 'text/event-stream'
+      },
+      body: JSON.stringify({ question, answer, role, skills, sessionId, index: currentQuestionIndex })
+    });
+    
+    if (!response.ok || !response.body) {
+      throw new Error(`Streaming not available (status ${response.status})`);
+    }
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let text = '';
+    
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      
+      buffer += decoder.decode(value, { stream: true });
+      // Events are separated by a blank line; keep any partial event for the next read
+      const events = buffer.split('\n\n');
+      buffer = events.pop();
+      
+      for (const event of events) {
+        const data = event
+          .split('\n')
+          .filter(line => line.startsWith('data:'))
+          .map(line => line.slice(5).trim())
+          .join('');
+        if (!data) continue;
+        
+        const payload = JSON.parse(data);
+        if (payload.warning) {
+          setApiWarning(payload.warning);
+          console.warn("API Warning:", payload.warning);
+        }
+        if (payload.chunk) {
+          text += payload.chunk;
+          onChunk(text);
+        }
+      }
+    }
+    
+    if (!text) {
+      throw new Error("No feedback received from stream");
+    }
+    return text;
+  };
+
   // Get feedback from Gemini API
-  const getFeedback = async (question, answer) => {
+  const getFeedback = async (question, answer, onChunk) => {
     setIsLoading(true);
     setError(null);
     setApiWarning(null);
     
+    // Prefer the streamed response so the first tokens render immediately
+    if (onChunk) {
+      try {
+        return await streamFeedback(question, answer, onChunk);
+      } catch (error) {
+        console.warn("Streaming feedback failed, falling back to a single request:", error);
+      }
+    }
+    
     try {
       console.log("Sending feedback request with data:", {
         question,
@@ -170,7 +378,9 @@ export const InterviewProvider = ({ children }) => {
         question,
         answer,
         role,
-        skills
+        skills,
+        sessionId,
+        index: currentQuestionIndex
       });
       
       console.log("Feedback API Response:", response.data);
@@ -216,19 +426,58 @@ Please try again later or continue with the next question.
     }
   };
 
+  // Transcribe a recording made of one or more self-contained segments
+  const transcribeSegments = async (segments, { question, duration } = {}) => {
+    if (segments.length === 1) {
+      return transcribeAudio(segments[0], { question, duration });
+    }
+    const texts = [];
+    for (const segment of segments) {
+      texts.push((await transcribeAudio(segment)).transcription);
+    }
+    const transcription = texts.join(' ');
+    // Metrics are only meaningful for the whole answer
+    let metrics = null;
+    try {
+      const response = await axios.post(`${API_BASE_URL}/metrics`, {
+        items: [{ question, answer: transcription, duration }]
+      });
+      metrics = response.data.results[0];
+    } catch (error) {
+      console.warn("Could not compute answer metrics:", error);
+    }
+    return { transcription, metrics };
+  };
+
   // Process the answer and get feedback
-  const processAnswer = async (audioBlob) => {
+  // `audio` is a Blob or the array of segment Blobs from useChunkedRecorder,
+  // `duration` the recording length in seconds. Optional callbacks let the
+  // page show the transcription, its metrics and streamed feedback early
+  const processAnswer = async (audio, { duration, onTranscription, onFeedbackChunk } = {}) => {
     if (!questions.length || currentQuestionIndex >= questions.length) return;
     
     const currentQuestion = questions[currentQuestionIndex];
     console.log("Processing answer for question:", currentQuestion);
     
-    // Transcribe audio
-    const transcription = await transcribeAudio(audioBlob);
+    // Transcribe audio - most of it was already transcribed while recording
+    let result;
+    try {
+      result = await finishTranscriptionStream({ question: currentQuestion, duration });
+    } catch (error) {
+      console.warn("Incremental transcription unavailable, uploading the recording:", error);
+      result = await transcribeSegments(Array.isArray(audio) ? audio : [audio], { question: currentQuestion, duration });
+    }
+    const { transcription, metrics } = result;
     console.log("Transcription:", transcription);
+    const newMetrics = [...answerMetrics];
+    newMetrics[currentQuestionIndex] = metrics;
+    setAnswerMetrics(newMetrics);
+    if (onTranscription) {
+      onTranscription(transcription, metrics);
+    }
     
     // Get feedback
-    const answerFeedback = await getFeedback(currentQuestion, transcription);
+    const answerFeedback = await getFeedback(currentQuestion, transcription, onFeedbackChunk);
     console.log("Feedback:", answerFeedback);
     
     // Update state
@@ -240,20 +489,48 @@ Please try again later or continue with the next question.
     newFeedback[currentQuestionIndex] = answerFeedback;
     setFeedback(newFeedback);
     
-    return { transcription, feedback: answerFeedback };
+    return { transcription, metrics, feedback: answerFeedback };
+  };
+
+  // Load questions generated since the interview started. The server waits
+  // until at least `needed` exist (or it has no more to ask).
+  const loadMoreQuestions = async (needed) => {
+    if (!sessionId) return questions;
+    try {
+      const response = await axios.post(`${API_BASE_URL}/sessions/${sessionId}/questions`, { needed });
+      setQuestions(response.data.questions);
+      setQuestionCount(response.data.questionCount);
+      return response.data.questions;
+    } catch (error) {
+      console.warn("Could not load more questions:", error);
+      return questions;
+    }
   };
 
   // Move to next question
-  const nextQuestion = () => {
+  const nextQuestion = async () => {
     console.log("Moving to next question. Current index:", currentQuestionIndex);
-    if (currentQuestionIndex < questions.length - 1) {
-      setCurrentQuestionIndex(prev => {
-        console.log("New question index:", prev + 1);
-        return prev + 1;
-      });
+    const next = currentQuestionIndex + 1;
+    let available = questions;
+    if (next < questionCount && next >= available.length) {
+      // The next batch is normally loaded by now; wait for it if not
+      setIsLoading(true);
+      available = await loadMoreQuestions(next + 1);
+      setIsLoading(false);
+    }
+    
+    if (next < available.length) {
+      console.log("New question index:", next);
+      setCurrentQuestionIndex(next);
+      updateSession({ currentQuestionIndex: next });
+      // On the last loaded question: pick up the batch the server starts generating now
+      if (next === available.length - 1 && available.length < questionCount) {
+        loadMoreQuestions(available.length + 1);
+      }
     } else {
       console.log("Interview complete");
       setIsComplete(true);
+      updateSession({ complete: true });
     }
   };
 
@@ -264,9 +541,11 @@ Please try again later or continue with the next question.
     setCurrentQuestionIndex(0);
     setAnswers([]);
     setFeedback([]);
+    setAnswerMetrics([]);
     setIsComplete(false);
     setError(null);
     setApiWarning(null);
+    rememberSession(null);
   };
 
   const value = {
@@ -278,15 +557,23 @@ Please try again later or continue with the next question.
     setJobDescription,
     skills,
     setSkills,
+    questionCount,
+    setQuestionCount,
+    adaptive,
+    setAdaptive,
     questions,
     currentQuestionIndex,
     answers,
     feedback,
+    answerMetrics,
     isLoading,
     isComplete,
     error,
     apiWarning,
+    sessionId,
     generateQuestions,
+    startTranscriptionStream,
+    sendAudioChunk,
     processAnswer,
     nextQuestion,
     resetInterview
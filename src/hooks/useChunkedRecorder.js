@@ -0,0 +1,118 @@
+import { useRef, useState, useCallback, useEffect } from 'react';
+
+// Seconds of audio per uploaded chunk, and per self-contained segment.
+// Each segment is a complete recording the backend can transcribe on its own,
+// so only the last one is still pending when the candidate presses stop.
+const DEFAULT_TIMESLICE_MS = 1000;
+const DEFAULT_SEGMENT_MS = 15000;
+
+// Records audio with MediaRecorder, handing out timesliced chunks while
+// recording is in progress. Status values match react-media-recorder.
+const useChunkedRecorder = ({
+  onStart,
+  onChunk,
+  onStop,
+  timeslice = DEFAULT_TIMESLICE_MS,
+  segmentDuration = DEFAULT_SEGMENT_MS
+} = {}) => {
+  const [status, setStatus] = useState('idle');
+  const [error, setError] = useState(null);
+  const streamRef = useRef(null);
+  const recorderRef = useRef(null);
+  const rotateTimerRef = useRef(null);
+  const segmentsRef = useRef([]);
+  const stoppingRef = useRef(false);
+  const startedAtRef = useRef(0);
+
+  // Keep the latest callbacks without restarting the recorder
+  const callbacksRef = useRef({ onStart, onChunk, onStop });
+  callbacksRef.current = { onStart, onChunk, onStop };
+
+  const startSegment = useCallback(() => {
+    const segment = segmentsRef.current.length;
+    const parts = [];
+    segmentsRef.current.push(parts);
+
+    const recorder = new MediaRecorder(streamRef.current);
+    recorder.ondataavailable = (event) => {
+      if (event.data && event.data.size > 0) {
+        parts.push(event.data);
+        if (callbacksRef.current.onChunk) {
+          callbacksRef.current.onChunk(event.data, segment);
+        }
+      }
+    };
+    recorder.onstop = () => {
+      if (!stoppingRef.current) {
+        // Rotation: the segment's last chunk has been delivered, start the next
+        startSegment();
+        return;
+      }
+      // Final segment flushed - hand back every segment as its own blob,
+      // with the recording length in seconds
+      const type = recorder.mimeType || 'audio/webm';
+      const blobs = segmentsRef.current
+        .filter(segmentParts => segmentParts.length)
+        .map(segmentParts => new Blob(segmentParts, { type }));
+      streamRef.current.getTracks().forEach(track => track.stop());
+      streamRef.current = null;
+      setStatus('stopped');
+      if (callbacksRef.current.onStop) {
+        callbacksRef.current.onStop(blobs, (Date.now() - startedAtRef.current) / 1000);
+      }
+    };
+    recorder.start(timeslice);
+    recorderRef.current = recorder;
+  }, [timeslice]);
+
+  const startRecording = useCallback(async () => {
+    setError(null);
+    setStatus('acquiring_media');
+    try {
+      streamRef.current = await navigator.mediaDevices.getUserMedia({ audio: true });
+    } catch (err) {
+      console.error('Could not access the microphone:', err);
+      setError(err);
+      setStatus('idle');
+      return;
+    }
+
+    segmentsRef.current = [];
+    stoppingRef.current = false;
+    if (callbacksRef.current.onStart) {
+      await callbacksRef.current.onStart();
+    }
+    startSegment();
+    startedAtRef.current = Date.now();
+    setStatus('recording');
+
+    // Restart the recorder periodically so each segment has its own header
+    rotateTimerRef.current = setInterval(() => {
+      if (recorderRef.current.state !== 'inactive') {
+        recorderRef.current.stop();
+      }
+    }, segmentDuration);
+  }, [startSegment, segmentDuration]);
+
+  const stopRecording = useCallback(() => {
+    clearInterval(rotateTimerRef.current);
+    if (!recorderRef.current) return;
+    // If a rotation is in flight its onstop sees the flag and finishes up
+    stoppingRef.current = true;
+    if (recorderRef.current.state !== 'inactive') {
+      recorderRef.current.stop();
+    }
+  }, []);
+
+  // Release the microphone if the page unmounts mid-recording
+  useEffect(() => () => {
+    clearInterval(rotateTimerRef.current);
+    if (streamRef.current) {
+      streamRef.current.getTracks().forEach(track => track.stop());
+    }
+  }, []);
+
+  return { status, error, startRecording, stopRecording };
+};
+
+export default useChunkedRecorder;
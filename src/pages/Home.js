@@ -10,7 +10,9 @@ import {
   Grid,
   Alert,
   Fade,
-  Grow
+  Grow,
+  FormControlLabel,
+  Checkbox
 } from '@mui/material';
 import { WorkOutline, Person, Description, Code } from '@mui/icons-material';
 import { useInterview } from '../context/InterviewContext';
@@ -22,10 +24,18 @@ const Home = () => {
     role, setRole,
     jobDescription, setJobDescription,
     skills, setSkills,
+    questionCount, setQuestionCount,
+    adaptive, setAdaptive,
+    questions,
+    isComplete,
+    sessionId,
     generateQuestions,
     resetInterview
   } = useInterview();
 
+  // A restored session that still has unanswered questions
+  const canResume = Boolean(sessionId && questions.length && !isComplete);
+
   const [error, setError] = useState('');
 
   const handleSubmit = async (e) => {
@@ -76,6 +86,21 @@ const Home = () => {
             </Box>
           </Fade>
 
+          {canResume && (
+            <Box mb={3}>
+              <Alert
+                severity="info"
+                action={
+                  <Button color="inherit" size="small" onClick={() => navigate('/interview')}>
+                    Resume
+                  </Button>
+                }
+              >
+                You have an interview in progress{company ? ` for ${role} at ${company}` : ''}.
+              </Alert>
+            </Box>
+          )}
+
           <form onSubmit={handleSubmit}>
             <Grid container spacing={3}>
               <Grid item xs={12} md={6}>
@@ -101,6 +126,25 @@ const Home = () => {
                   onChange={(e) => setRole(e.target.value)}
                   margin="normal"
                 />
+                <TextField
+                  fullWidth
+                  label="Number of Questions"
+                  type="number"
+                  variant="outlined"
+                  value={questionCount}
+                  onChange={(e) => setQuestionCount(Math.max(1, parseInt(e.target.value, 10) || 1))}
+                  inputProps={{ min: 1, max: 20 }}
+                  margin="normal"
+                />
+                <FormControlLabel
+                  control={
+                    <Checkbox
+                      checked={adaptive}
+                      onChange={(e) => setAdaptive(e.target.checked)}
+                    />
+                  }
+                  label="Adapt follow-up questions to my answers"
+                />
               </Grid>
               
               <Grid item xs={12} md={6}>
@@ -22,7 +22,6 @@ import {
   Skeleton
 } from '@mui/material';
 import Webcam from 'react-webcam';
-import { useReactMediaRecorder } from 'react-media-recorder';
 import { 
   Mic, 
   Stop, 
@@ -32,6 +31,7 @@ import {
   Refresh
 } from '@mui/icons-material';
 import { useInterview } from '../context/InterviewContext';
+import useChunkedRecorder from '../hooks/useChunkedRecorder';
 import ReactMarkdown from 'react-markdown';
 
 const Interview = () => {
@@ -39,6 +39,7 @@ const Interview = () => {
   const webcamRef = useRef(null);
   const [transcription, setTranscription] = useState('');
   const [currentFeedback, setCurrentFeedback] = useState('');
+  const [metrics, setMetrics] = useState(null);
   const [canProceed, setCanProceed] = useState(false);
   const [activeStep, setActiveStep] = useState(0);
   const [isLoading, setIsLoading] = useState(false);
@@ -48,26 +49,30 @@ const Interview = () => {
     company,
     role,
     questions,
+    questionCount,
     currentQuestionIndex,
     answers,
     feedback,
+    answerMetrics,
     isComplete,
     error: contextError,
     apiWarning,
+    startTranscriptionStream,
+    sendAudioChunk,
     processAnswer,
     nextQuestion,
     resetInterview
   } = useInterview();
 
+  // Audio is uploaded in chunks while recording so the transcript is ready soon after stop
   const { 
     status,
     startRecording,
-    stopRecording,
-    mediaBlobUrl
-  } = useReactMediaRecorder({
-    audio: true,
-    video: false,
-    onStop: (blobUrl, blob) => handleRecordingStop(blob)
+    stopRecording
+  } = useChunkedRecorder({
+    onStart: startTranscriptionStream,
+    onChunk: sendAudioChunk,
+    onStop: (segments, duration) => handleRecordingStop(segments, duration)
   });
 
   // Redirect to home if no questions available
@@ -90,24 +95,36 @@ const Interview = () => {
     } else {
       setCurrentFeedback('');
     }
+    setMetrics(answerMetrics[currentQuestionIndex] || null);
     
     setCanProceed(!!feedback[currentQuestionIndex]);
     setActiveStep(feedback[currentQuestionIndex] ? 2 : 0);
-  }, [currentQuestionIndex, answers, feedback]);
+  }, [currentQuestionIndex, answers, feedback, answerMetrics]);
 
   // Handle recording stop and process the audio
-  const handleRecordingStop = async (blob) => {
+  const handleRecordingStop = async (segments, duration) => {
     setIsLoading(true);
     setError('');
     
     try {
-      // Process the recorded audio
-      const result = await processAnswer(blob);
+      // Process the recorded audio, showing feedback as it streams in
+      const result = await processAnswer(segments, {
+        duration,
+        onTranscription: (text, answerMetrics) => {
+          setTranscription(text);
+          setMetrics(answerMetrics);
+        },
+        onFeedbackChunk: (text) => {
+          setCurrentFeedback(text);
+          setActiveStep(2);
+          setIsLoading(false);
+        }
+      });
       console.log("Result from processAnswer:", result);
       
       // Set transcription and feedback for current question
-      setTranscription(answers[currentQuestionIndex] || '');
-      setCurrentFeedback(feedback[currentQuestionIndex] || '');
+      setTranscription(result?.transcription || '');
+      setCurrentFeedback(result?.feedback || '');
       
       setCanProceed(true);
       setActiveStep(2); // Move to feedback step
@@ -120,9 +137,10 @@ const Interview = () => {
   };
 
   // Handle clicking "Next Question" button
-  const handleNextQuestion = () => {
+  const handleNextQuestion = async () => {
     console.log("Handling next question click");
-    nextQuestion();
+    setCanProceed(false);
+    await nextQuestion();
     setActiveStep(0); // Reset to question step
   };
 
@@ -168,7 +186,7 @@ const Interview = () => {
                 </Button>
                 
                 <Chip 
-                  label={`Question ${currentQuestionIndex + 1} of ${questions.length}`}
+                  label={`Question ${currentQuestionIndex + 1} of ${questionCount}`}
                   color="primary"
                   variant="filled"
                 />
@@ -387,6 +405,36 @@ const Interview = () => {
                             </Typography>
                           </CardContent>
                         </Card>
+                        
+                        {/* Local metrics arrive with the transcription, before the feedback */}
+                        {metrics && (
+                          <Box sx={{ display: 'flex', flexWrap: 'wrap', gap: 1 }}>
+                            {metrics.wordsPerMinute !== null && (
+                              <Chip
+                                label={`${Math.round(metrics.wordsPerMinute)} words/min (${metrics.pace})`}
+                                color={metrics.pace === 'good' ? 'success' : 'warning'}
+                                variant="outlined"
+                              />
+                            )}
+                            <Chip
+                              label={`${metrics.fillerCount} filler word${metrics.fillerCount === 1 ? '' : 's'}`}
+                              color={metrics.fillersPer100Words <= 3 ? 'success' : 'warning'}
+                              variant="outlined"
+                            />
+                            <Chip
+                              label={`${metrics.wordCount} words (${metrics.targetWords[0]}-${metrics.targetWords[1]} suggested)`}
+                              color={metrics.length === 'ok' ? 'success' : 'warning'}
+                              variant="outlined"
+                            />
+                            {metrics.behavioral && (
+                              <Chip
+                                label={`STAR: ${Object.keys(metrics.star).filter(part => metrics.star[part]).map(part => part[0].toUpperCase()).join('') || 'none'}`}
+                                color={metrics.starCoverage === 1 ? 'success' : 'warning'}
+                                variant="outlined"
+                              />
+                            )}
+                          </Box>
+                        )}
                       </Box>
                     </Fade>
                   )}
@@ -408,7 +456,7 @@ const Interview = () => {
                         
                         {/* Next question button */}
                         <Box sx={{ display: 'flex', justifyContent: 'flex-end', mt: 3 }}>
-                          {currentQuestionIndex < questions.length - 1 ? (
+                          {currentQuestionIndex < questionCount - 1 ? (
                             <Button
                               variant="contained"
                               color="primary"
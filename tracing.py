@@ -0,0 +1,214 @@
+# tracing.py
+
+import contextvars
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Optional JSON-lines file receiving one record per finished trace
+TRACE_LOG = os.getenv("TRACE_LOG", "")
+# Fraction of requests whose payload is logged (at DEBUG level only)
+PAYLOAD_LOG_SAMPLE_RATE = float(os.getenv("PAYLOAD_LOG_SAMPLE_RATE", "0.01"))
+
+# Latency buckets in seconds, sized for LLM and transcription round trips
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    inner = ",".join(f'{name}="{str(value).replace(chr(34), chr(39))}"' for name, value in pairs)
+    return "{" + inner + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def render(self):
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (bucket_counts, count, total) in sorted(self._series.items()):
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    lines.append(f"{self.name}_bucket{_format_labels(key, [('le', bound)])} {bucket_count}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {count}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {total:.6f}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds the process's metrics and renders them in Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, help_text, *args):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, *args)
+            return metric
+
+    def counter(self, name, help_text):
+        return self._get_or_create(Counter, name, help_text)
+
+    def gauge(self, name, help_text):
+        return self._get_or_create(Gauge, name, help_text)
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, help_text, buckets)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+span_duration = registry.histogram("span_duration_seconds", "Duration of instrumented hot-path spans")
+span_errors = registry.counter("span_errors_total", "Spans that ended with an exception")
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_trace_log_lock = threading.Lock()
+
+
+class Trace:
+    def __init__(self, name):
+        self.id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.spans = []
+
+    def to_dict(self, **attrs):
+        return {
+            "trace_id": self.id,
+            "name": self.name,
+            "start": self.started,
+            "duration_ms": round((time.perf_counter() - self._start) * 1000, 3),
+            "spans": self.spans,
+            **attrs,
+        }
+
+
+def start_trace(name):
+    """Starts a trace for the current request or rerun and makes it current."""
+    trace = Trace(name)
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def finish_trace(trace, **attrs):
+    """Ends a trace, appending it to TRACE_LOG when configured."""
+    _current_trace.set(None)
+    if not TRACE_LOG or trace is None:
+        return
+    line = json.dumps(trace.to_dict(**attrs), default=str)
+    try:
+        with _trace_log_lock, open(TRACE_LOG, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    except OSError as e:
+        logger.warning(f"Could not write trace log: {str(e)}")
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Times a block, recording it in the span histogram and on the current
+    trace (if any).
+    """
+    started = time.perf_counter()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = type(e).__name__
+        span_errors.inc(span=name)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        span_duration.observe(elapsed, span=name)
+        trace = _current_trace.get()
+        if trace is not None:
+            record = {"name": name, "duration_ms": round(elapsed * 1000, 3), **attrs}
+            if error:
+                record["error"] = error
+            trace.spans.append(record)
+
+
+def log_payload(log, message, payload):
+    """
+    Logs a request payload at DEBUG level for a sample of requests only, so
+    full job descriptions and answers stay out of normal logs.
+    """
+    if log.isEnabledFor(logging.DEBUG) and random.random() < PAYLOAD_LOG_SAMPLE_RATE:
+        log.debug(f"{message}: {payload}")
@@ -1,40 +1,597 @@
 # transcriber.py
 
 import requests
+from requests.adapters import HTTPAdapter
+import io
 import tempfile
 import os
+import time
+import uuid
+import shutil
+import queue
+import logging
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from tracing import span
+from audio_preprocess import preprocess_audio
+from rate_limit import FairScheduler, current_client, run_as
 
-def transcribe_audio(file):
-    """
-    Takes an audio file and transcribes it using AssemblyAI's free API.
-    """
-    # Save the audio file temporarily
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-        tmp.write(file.read())
-        tmp_path = tmp.name
-
-    # Upload to AssemblyAI
-    upload_url = "https://api.assemblyai.com/v2/upload"
-    headers = {"authorization": "Place Your Own Key Here"}
-    
-    with open(tmp_path, "rb") as f:
-        response = requests.post(upload_url, headers=headers, data=f)
-    upload_url = response.json()["upload_url"]
-    
-    # Transcribe
-    transcript_url = "https://api.assemblyai.com/v2/transcript"
-    json = {"audio_url": upload_url}
-    response = requests.post(transcript_url, json=json, headers=headers)
-    transcript_id = response.json()["id"]
-    
-    # Get transcription
-    polling_url = f"https://api.assemblyai.com/v2/transcript/{transcript_id}"
+logger = logging.getLogger(__name__)
+
+# Backend selection: "assemblyai" uploads to the remote API, "whisper" runs a
+# local faster-whisper model on the CPU (optional dependency)
+TRANSCRIBE_BACKEND = os.getenv("TRANSCRIBE_BACKEND", "assemblyai")
+
+# Decode, trim silence and re-encode uploads before transcribing them
+AUDIO_PREPROCESS = os.getenv("AUDIO_PREPROCESS", "1") == "1"
+
+# Provider settings - the base URL can point at a local stub for testing
+ASSEMBLYAI_BASE_URL = os.getenv("ASSEMBLYAI_BASE_URL", "https://api.assemblyai.com").rstrip("/")
+ASSEMBLYAI_API_KEY = os.getenv("ASSEMBLYAI_API_KEY", "Place Your Own Key Here")
+
+# Polling schedule: start fast, back off exponentially, never exceed the deadline
+POLL_INITIAL_DELAY = float(os.getenv("TRANSCRIBE_POLL_INITIAL_DELAY", "0.5"))
+POLL_MAX_DELAY = float(os.getenv("TRANSCRIBE_POLL_MAX_DELAY", "5"))
+POLL_BACKOFF = 1.5
+TRANSCRIBE_TIMEOUT = float(os.getenv("TRANSCRIBE_TIMEOUT", "120"))
+
+# (connect, read) timeout applied to every provider HTTP call
+HTTP_TIMEOUT = (5, 60)
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+# Connections kept open to the provider; request threads share the pool
+HTTP_POOL_SIZE = int(os.getenv("TRANSCRIBE_HTTP_POOL_SIZE", "32"))
+
+# Local engine settings: a small int8-quantized model, with workers sized so
+# that concurrent transcriptions together use every core once
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base.en")
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+WHISPER_CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", str(min(4, os.cpu_count() or 1))))
+WHISPER_WORKERS = int(os.getenv("WHISPER_WORKERS", str(max(1, (os.cpu_count() or 1) // WHISPER_CPU_THREADS))))
+WHISPER_BEAM_SIZE = int(os.getenv("WHISPER_BEAM_SIZE", "1"))
+
+# Provider calls in flight at once across requests and jobs; queued calls
+# are served round-robin per client and give up after the queue timeout
+TRANSCRIBE_CONCURRENCY = int(os.getenv("TRANSCRIBE_CONCURRENCY", "8"))
+TRANSCRIBE_QUEUE_TIMEOUT = float(os.getenv("TRANSCRIBE_QUEUE_TIMEOUT", "30"))
+
+# Background jobs
+TRANSCRIBE_WORKERS = int(os.getenv("TRANSCRIBE_WORKERS", "4"))
+JOB_RETENTION_SECONDS = 600
+SPOOL_MAX_MEMORY = 1024 * 1024
+
+# Incremental transcription: audio arrives in pieces while the candidate speaks.
+# Each open segment holds a worker while its upload waits for more audio.
+STREAM_WORKERS = int(os.getenv("TRANSCRIBE_STREAM_WORKERS", "32"))
+STREAM_IDLE_TIMEOUT = float(os.getenv("TRANSCRIBE_STREAM_IDLE_TIMEOUT", "30"))
+STREAM_MAX_BYTES = int(os.getenv("TRANSCRIBE_STREAM_MAX_BYTES", str(25 * 1024 * 1024)))
+
+
+class TranscriptionError(Exception):
+    """Raised when the provider reports a failed transcript."""
+
+
+class TranscriptionTimeout(TranscriptionError):
+    """Raised when a transcript is not ready before the deadline."""
+
+
+class StreamTooLarge(TranscriptionError):
+    """Raised when a chunked upload grows past STREAM_MAX_BYTES."""
+
+
+class TranscriptionBusy(TranscriptionError):
+    """Raised when no transcription slot frees up within TRANSCRIBE_QUEUE_TIMEOUT."""
+
+
+class TranscriptionUnavailable(TranscriptionBusy):
+    """Raised for new work once shutdown() has stopped accepting it."""
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Returns the shared HTTP session so connections to the provider are reused.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update({"authorization": ASSEMBLYAI_API_KEY})
+                _session = session
+    return _session
+
+
+def iter_chunks(file, chunk_size=UPLOAD_CHUNK_SIZE):
+    """
+    Yields a file-like object in fixed-size chunks without buffering it whole.
+    """
     while True:
-        polling_response = requests.get(polling_url, headers=headers)
-        if polling_response.json()["status"] == "completed":
-            text = polling_response.json()["text"]
+        chunk = file.read(chunk_size)
+        if not chunk:
             break
-    
-    # Clean up
-    os.unlink(tmp_path)
-    return text
+        yield chunk
+
+
+def upload_audio(file, chunk_size=UPLOAD_CHUNK_SIZE):
+    """
+    Streams an audio file to AssemblyAI and returns the hosted upload URL.
+    Accepts raw bytes, any readable file-like object (e.g. a Werkzeug
+    FileStorage or the buffer from st.audio_input) or an iterator of byte
+    chunks that may still be arriving.
+    """
+    if isinstance(file, (bytes, bytearray)):
+        # Already in memory - send as-is with a Content-Length
+        body = file
+    elif hasattr(file, "read"):
+        # Chunked transfer encoding straight from the source stream
+        body = iter_chunks(file, chunk_size)
+    else:
+        # Chunks are sent as they are yielded
+        body = file
+
+    response = get_session().post(f"{ASSEMBLYAI_BASE_URL}/v2/upload", data=body, timeout=HTTP_TIMEOUT)
+    response.raise_for_status()
+    return response.json()["upload_url"]
+
+
+def request_transcript(audio_url):
+    """
+    Starts a transcript job for an uploaded file and returns its id.
+    """
+    response = get_session().post(
+        f"{ASSEMBLYAI_BASE_URL}/v2/transcript",
+        json={"audio_url": audio_url},
+        timeout=HTTP_TIMEOUT,
+    )
+    response.raise_for_status()
+    return response.json()["id"]
+
+
+def wait_for_transcript(transcript_id, timeout=TRANSCRIBE_TIMEOUT):
+    """
+    Polls a transcript job with exponential backoff until it completes,
+    fails, or the deadline passes.
+    """
+    polling_url = f"{ASSEMBLYAI_BASE_URL}/v2/transcript/{transcript_id}"
+    deadline = time.monotonic() + timeout
+    delay = POLL_INITIAL_DELAY
+
+    while True:
+        response = get_session().get(polling_url, timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+        result = response.json()
+        status = result.get("status")
+
+        if status == "completed":
+            return result.get("text") or ""
+        if status == "error":
+            logger.warning(f"Transcript {transcript_id} failed: {result.get('error')}")
+            raise TranscriptionError(result.get("error") or "Transcription failed")
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TranscriptionTimeout(f"Transcript {transcript_id} not ready after {timeout:.0f}s (status: {status})")
+        time.sleep(min(delay, remaining))
+        delay = min(delay * POLL_BACKOFF, POLL_MAX_DELAY)
+
+
+# Transcription backends
+
+class AssemblyAIBackend:
+    """Remote transcription: upload to AssemblyAI, then poll for the transcript."""
+
+    name = "assemblyai"
+
+    def transcribe(self, file, timeout=TRANSCRIBE_TIMEOUT):
+        with span("upload"):
+            audio_url = upload_audio(file)
+        return self.transcribe_received(audio_url, timeout=timeout)
+
+    def receive_chunks(self, chunks):
+        # The upload is already under way while later chunks arrive
+        with span("upload"):
+            return upload_audio(chunks)
+
+    def transcribe_received(self, audio_url, timeout=TRANSCRIBE_TIMEOUT):
+        with span("transcription_request"):
+            transcript_id = request_transcript(audio_url)
+        with span("transcription_poll"):
+            return wait_for_transcript(transcript_id, timeout=timeout)
+
+
+class WhisperBackend:
+    """
+    Local CPU transcription with faster-whisper. The model is loaded once and
+    shared; at most `workers` transcriptions run at a time, each on
+    `cpu_threads` cores, so a burst of requests queues instead of
+    oversubscribing the CPU.
+    """
+
+    name = "whisper"
+
+    def __init__(self, model_name=WHISPER_MODEL, compute_type=WHISPER_COMPUTE_TYPE,
+                 cpu_threads=WHISPER_CPU_THREADS, workers=WHISPER_WORKERS):
+        from faster_whisper import WhisperModel
+
+        self.workers = workers
+        self._model = WhisperModel(
+            model_name, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads, num_workers=workers
+        )
+        self._slots = threading.BoundedSemaphore(workers)
+
+    def transcribe(self, file, timeout=TRANSCRIBE_TIMEOUT):
+        if isinstance(file, (bytes, bytearray)):
+            file = io.BytesIO(file)
+        # `timeout` bounds the wait for a free worker, not the decode itself
+        if not self._slots.acquire(timeout=timeout):
+            raise TranscriptionTimeout(f"No local transcription worker free after {timeout:.0f}s")
+        try:
+            with span("local_transcribe"):
+                segments, info = self._model.transcribe(file, beam_size=WHISPER_BEAM_SIZE, vad_filter=True)
+                # Segments decode lazily, so consume them while holding the slot
+                return " ".join(segment.text.strip() for segment in segments).strip()
+        except TranscriptionError:
+            raise
+        except Exception as e:
+            raise TranscriptionError(f"Local transcription failed: {str(e)}") from e
+        finally:
+            self._slots.release()
+
+    def receive_chunks(self, chunks):
+        # Decoding needs the whole container, so collect the segment first
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+        try:
+            for chunk in chunks:
+                spool.write(chunk)
+        except BaseException:
+            spool.close()
+            raise
+        spool.seek(0)
+        return spool
+
+    def transcribe_received(self, spool, timeout=TRANSCRIBE_TIMEOUT):
+        try:
+            return self.transcribe(spool, timeout=timeout)
+        finally:
+            spool.close()
+
+
+BACKENDS = {"assemblyai": AssemblyAIBackend, "whisper": WhisperBackend}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+_scheduler = FairScheduler("transcription", TRANSCRIBE_CONCURRENCY)
+
+
+def get_backend():
+    """
+    Returns the process-wide transcription backend selected by
+    TRANSCRIBE_BACKEND, loading it (and any local model) on first use.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if TRANSCRIBE_BACKEND not in BACKENDS:
+                    raise ValueError(f"Unknown TRANSCRIBE_BACKEND {TRANSCRIBE_BACKEND!r}")
+                _backend = BACKENDS[TRANSCRIBE_BACKEND]()
+                logger.info(f"Transcription backend ready ({TRANSCRIBE_BACKEND})")
+    return _backend
+
+
+def transcribe_recording(file, timeout=TRANSCRIBE_TIMEOUT, preprocess=AUDIO_PREPROCESS):
+    """
+    Takes an audio file and transcribes it with the configured backend.
+    Returns (text, recording), where recording is the ProcessedAudio with
+    its duration and speech time, or None without `preprocess`. With
+    `preprocess`, silent or too-short recordings raise AudioRejected before
+    anything is uploaded.
+    """
+    recording = None
+    if preprocess:
+        with span("preprocess"):
+            recording = preprocess_audio(file)
+            file = recording.data
+    with span("transcribe_queue"):
+        if not _scheduler.acquire(current_client(), TRANSCRIBE_QUEUE_TIMEOUT):
+            raise TranscriptionBusy(f"No transcription slot free after {TRANSCRIBE_QUEUE_TIMEOUT:.0f}s")
+    try:
+        return get_backend().transcribe(file, timeout=timeout), recording
+    finally:
+        _scheduler.release()
+
+
+def transcribe_audio(file, timeout=TRANSCRIBE_TIMEOUT, preprocess=AUDIO_PREPROCESS):
+    """Takes an audio file and returns its transcript (see transcribe_recording)."""
+    return transcribe_recording(file, timeout, preprocess)[0]
+
+
+# Background transcription jobs
+
+_executor = ThreadPoolExecutor(max_workers=TRANSCRIBE_WORKERS, thread_name_prefix="transcribe")
+_jobs = {}
+_jobs_lock = threading.Lock()
+_accepting = True
+
+
+class _Job:
+    def __init__(self, job_id):
+        self.id = job_id
+        self.status = "queued"
+        self.created = time.monotonic()
+        self.future = None
+
+
+def _prune_jobs():
+    cutoff = time.monotonic() - JOB_RETENTION_SECONDS
+    with _jobs_lock:
+        for job_id in [j.id for j in _jobs.values() if j.created < cutoff and j.future.done()]:
+            del _jobs[job_id]
+
+
+def _submit(executor, fn, *args):
+    """Submits to a worker pool, or raises TranscriptionUnavailable once shutdown has begun."""
+    if not _accepting:
+        raise TranscriptionUnavailable("Server is shutting down")
+    try:
+        return executor.submit(fn, *args)
+    except RuntimeError:
+        # shutdown() closed the pool between the check and the submit
+        if _accepting:
+            raise
+        raise TranscriptionUnavailable("Server is shutting down") from None
+
+
+def _run_job(job, spool):
+    job.status = "processing"
+    try:
+        return transcribe_recording(spool)
+    finally:
+        spool.close()
+
+
+def submit_transcription(file):
+    """
+    Queues an audio file for transcription on the worker pool and returns a
+    job id. The file is spooled first because request-scoped streams close
+    once the request returns.
+    """
+    if not _accepting:
+        raise TranscriptionUnavailable("Server is shutting down")
+    _prune_jobs()
+
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    job = _Job(uuid.uuid4().hex)
+    try:
+        if isinstance(file, (bytes, bytearray)):
+            spool.write(file)
+        else:
+            shutil.copyfileobj(file, spool, UPLOAD_CHUNK_SIZE)
+        spool.seek(0)
+        # The job counts against the submitting client's share of the pool
+        job.future = _submit(_executor, run_as, current_client(), _run_job, job, spool)
+    except Exception:
+        # The worker owns the spool only once the job is queued
+        spool.close()
+        raise
+
+    with _jobs_lock:
+        _jobs[job.id] = job
+    return job.id
+
+
+def get_transcription_job(job_id, wait=0):
+    """
+    Returns the state of a transcription job, optionally blocking up to
+    `wait` seconds for it to finish. Returns None for unknown ids.
+    """
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+    if job is None:
+        return None
+
+    if wait > 0:
+        # Long-poll: block until the job settles or the wait runs out
+        try:
+            job.future.result(timeout=wait)
+        except Exception:
+            pass
+
+    if not job.future.done():
+        return {"jobId": job.id, "status": job.status}
+
+    error = job.future.exception()
+    if error is not None:
+        return {"jobId": job.id, "status": "error", "error": str(error)}
+    text, recording = job.future.result()
+    result = {"jobId": job.id, "status": "completed", "transcription": text}
+    if recording is not None and recording.duration is not None:
+        result.update(duration=recording.duration, speechSeconds=recording.speech_seconds)
+    return result
+
+
+# Incremental transcription streams
+
+_stream_executor = ThreadPoolExecutor(max_workers=STREAM_WORKERS, thread_name_prefix="transcribe-stream")
+_streams = {}
+_streams_lock = threading.Lock()
+_END = object()
+
+
+class _Segment:
+    """
+    One self-contained recording within a stream. Its chunks are forwarded
+    to the provider upload as they arrive, and transcription starts as soon
+    as the segment is closed.
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.future = None
+
+    def chunks(self):
+        while True:
+            try:
+                chunk = self.queue.get(timeout=STREAM_IDLE_TIMEOUT)
+            except queue.Empty:
+                raise TranscriptionTimeout(f"No audio received for {STREAM_IDLE_TIMEOUT:.0f}s")
+            if chunk is _END:
+                return
+            yield chunk
+
+    def close(self):
+        self.queue.put(_END)
+
+
+class _Stream:
+    def __init__(self, stream_id, client):
+        self.id = stream_id
+        # Chunk uploads may not name the session; segments run as the opener
+        self.client = client
+        self.created = time.monotonic()
+        self.segments = []
+        self.received = 0
+        self.lock = threading.Lock()
+
+
+def _transcribe_segment(segment):
+    chunks = segment.chunks()
+    # Only start transcribing once there is audio to send
+    first = next(chunks, None)
+    if first is None:
+        return ""
+    backend = get_backend()
+    # Receiving waits on the candidate's microphone, so it runs on the stream
+    # pool without a transcription slot; only the provider work that follows
+    # shares the slots with whole uploads
+    audio = backend.receive_chunks(itertools.chain([first], chunks))
+    with span("transcribe_queue"):
+        acquired = _scheduler.acquire(current_client(), TRANSCRIBE_QUEUE_TIMEOUT)
+    if not acquired:
+        if hasattr(audio, "close"):
+            audio.close()
+        raise TranscriptionBusy(f"No transcription slot free after {TRANSCRIBE_QUEUE_TIMEOUT:.0f}s")
+    try:
+        return backend.transcribe_received(audio)
+    finally:
+        _scheduler.release()
+
+
+def _prune_streams():
+    # Abandoned streams end on their own once the idle timeout fails the upload
+    cutoff = time.monotonic() - JOB_RETENTION_SECONDS
+    with _streams_lock:
+        for stream_id in [
+            s.id for s in _streams.values()
+            if s.created < cutoff and all(seg.future.done() for seg in s.segments)
+        ]:
+            del _streams[stream_id]
+
+
+def start_stream():
+    """
+    Opens an incremental transcription stream and returns its id. Audio is
+    then sent with `append_chunk` while recording and collected with
+    `finish_stream` once the candidate stops.
+    """
+    if not _accepting:
+        raise TranscriptionUnavailable("Server is shutting down")
+    _prune_streams()
+    stream = _Stream(uuid.uuid4().hex, current_client())
+    with _streams_lock:
+        _streams[stream.id] = stream
+    return stream.id
+
+
+def append_chunk(stream_id, chunk, segment=0):
+    """
+    Adds the next piece of audio to a stream. Chunks of one segment are
+    consecutive slices of a single recording; moving on to the next segment
+    index closes the previous one so it is transcribed while the candidate
+    keeps talking. Returns the bytes received so far, or None for unknown ids.
+    """
+    with _streams_lock:
+        stream = _streams.get(stream_id)
+    if stream is None:
+        return None
+
+    with stream.lock:
+        if stream.received + len(chunk) > STREAM_MAX_BYTES:
+            raise StreamTooLarge(f"Stream exceeds {STREAM_MAX_BYTES} bytes")
+        current = len(stream.segments) - 1
+        if segment < current or segment > current + 1:
+            raise ValueError(f"Expected segment {max(current, 0)} or {current + 1}, got {segment}")
+        if segment == current + 1:
+            new_segment = _Segment()
+            new_segment.future = _submit(_stream_executor, run_as, stream.client, _transcribe_segment, new_segment)
+            if stream.segments:
+                stream.segments[-1].close()
+            stream.segments.append(new_segment)
+        if chunk:
+            stream.segments[-1].queue.put(bytes(chunk))
+        stream.received += len(chunk)
+        return stream.received
+
+
+def finish_stream(stream_id, timeout=TRANSCRIBE_TIMEOUT):
+    """
+    Closes a stream and returns the transcript of all its segments, in
+    order. Returns None for unknown ids.
+    """
+    with _streams_lock:
+        stream = _streams.pop(stream_id, None)
+    if stream is None:
+        return None
+
+    with stream.lock:
+        if stream.segments:
+            stream.segments[-1].close()
+        segments = list(stream.segments)
+    if not stream.received:
+        raise TranscriptionError("No audio received")
+
+    deadline = time.monotonic() + timeout
+    texts = []
+    for segment in segments:
+        try:
+            text = segment.future.result(timeout=max(0, deadline - time.monotonic()))
+        except FutureTimeout:
+            raise TranscriptionTimeout(f"Stream {stream_id} not transcribed after {timeout:.0f}s")
+        if text:
+            texts.append(text)
+    return " ".join(texts)
+
+
+def transcription_stats():
+    """Returns worker pool and job counts for health checks."""
+    with _jobs_lock:
+        pending = sum(1 for job in _jobs.values() if not job.future.done())
+        tracked = len(_jobs)
+    with _streams_lock:
+        streams = len(_streams)
+    return {
+        "workers": TRANSCRIBE_WORKERS,
+        "pending_jobs": pending,
+        "tracked_jobs": tracked,
+        "open_streams": streams,
+        "queued": _scheduler.stats()["waiting"],
+        "accepting": _accepting,
+    }
+
+
+def shutdown(wait=True):
+    """Stops accepting jobs and, if `wait`, lets queued transcriptions finish."""
+    global _accepting
+    _accepting = False
+    _executor.shutdown(wait=wait, cancel_futures=not wait)
+    _stream_executor.shutdown(wait=wait, cancel_futures=not wait)